@@ -0,0 +1,19 @@
+from .harness import (
+    Benchmark,
+    BenchmarkResult,
+    Comparison,
+    compare,
+    load_results,
+    measure,
+    write_results,
+)
+
+__all__ = [
+    "Benchmark",
+    "BenchmarkResult",
+    "Comparison",
+    "compare",
+    "load_results",
+    "measure",
+    "write_results",
+]
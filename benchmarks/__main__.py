@@ -0,0 +1,102 @@
+"""
+Offline micro-benchmarks for the harness hot paths.
+
+    uv run python -m benchmarks                    # run and compare to baseline
+    uv run python -m benchmarks -k grader          # only matching benchmarks
+    uv run python -m benchmarks --save-baseline    # record a new baseline
+    uv run python -m benchmarks --check            # fail without a baseline
+
+Exits with status 1 when a benchmark is slower than the baseline by more than
+``--tolerance``. Benchmarks without a baseline (or a missing baseline file)
+are reported with a warning; under ``--check`` they fail the run as well.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+from . import bench_agent_loop, bench_datasets, bench_graders, bench_prompts, bench_tools
+from .harness import (
+    DEFAULT_REPEAT,
+    DEFAULT_TOLERANCE,
+    DEFAULT_WARMUP,
+    compare,
+    format_report,
+    load_results,
+    measure,
+    write_results,
+)
+
+
+SUITES = (bench_agent_loop, bench_tools, bench_prompts, bench_datasets, bench_graders)
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[1])
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results to --baseline")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit with status 1 when the baseline is missing or lacks a benchmark",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="allowed slowdown as a fraction of the baseline median (default %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rl-task-bench-") as workdir:
+        for suite in SUITES:
+            for benchmark in suite.benchmarks(Path(workdir)):
+                if args.filter not in benchmark.name:
+                    continue
+                print(f"running {benchmark.name} ...", file=sys.stderr, flush=True)
+                results.append(measure(benchmark, repeat=args.repeat, warmup=args.warmup))
+
+    if args.output:
+        write_results(args.output, results)
+    if args.save_baseline:
+        write_results(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+
+    if args.save_baseline:
+        baseline = {}
+    elif args.baseline.exists():
+        baseline = load_results(args.baseline)
+    else:
+        baseline = {}
+        print(
+            f"warning: no baseline at {args.baseline}, so nothing was compared; "
+            "record one with --save-baseline on the reference machine",
+            file=sys.stderr,
+        )
+    comparisons = compare(results, baseline, tolerance=args.tolerance)
+    print(format_report(comparisons, results))
+    status = 0
+    unchecked = [comparison.name for comparison in comparisons if comparison.baseline_s is None]
+    if unchecked and not args.save_baseline:
+        if baseline:
+            print(f"warning: {len(unchecked)} benchmark(s) have no baseline: {', '.join(unchecked)}", file=sys.stderr)
+        if args.check:
+            status = 1
+    regressions = [comparison.name for comparison in comparisons if comparison.regressed]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+from itertools import count
+from pathlib import Path
+from typing import Any
+
+from anthropic.types import Message
+
+from main import run_agent_loop, sandboxed_python_expression_tool, submit_answer_tool
+from tasks.arithmetic_expression.tools import build_tools
+from utils.fake_anthropic import FakeMessagesTransport, Reply, ToolCall, fake_client, submit
+
+from .harness import Benchmark
+
+
+STEPS = 10
+LARGE_RESULT_BYTES = 64 * 1024
+
+
+def _script(calls_per_step: int, expression: str) -> list[Reply]:
+    step = Reply(
+        tool_calls=[ToolCall("python_expression", {"expression": expression})] * calls_per_step
+    )
+    return [step] * (STEPS - 1) + [submit(42)]
+
+
+class _ScriptedMessages:
+    def __init__(self, replies: list[Message]) -> None:
+        self._replies = replies
+
+    async def create(self, *, messages: list[Any], **_: Any) -> Message:
+        turn = sum(1 for message in messages if message["role"] == "assistant")
+        return self._replies[turn]
+
+
+class _ScriptedClient:
+    """
+    Returns pre-parsed messages with no HTTP or SDK work, so timings isolate
+    the agent loop itself.
+    """
+
+    def __init__(self, script: list[Reply]) -> None:
+        ids = count(1)
+        replies = []
+        for reply in script:
+            content = [
+                {"type": "tool_use", "id": f"toolu_{next(ids)}", "name": call.name, "input": call.input}
+                for call in reply.tool_calls
+            ]
+            replies.append(
+                Message.model_validate(
+                    {
+                        "id": f"msg_{next(ids)}",
+                        "type": "message",
+                        "role": "assistant",
+                        "model": "fake",
+                        "content": content,
+                        "stop_reason": "tool_use",
+                        "usage": {"input_tokens": 0, "output_tokens": 0},
+                    }
+                )
+            )
+        self.messages = _ScriptedMessages(replies)
+
+
+def _large_result_tool(expression: str) -> dict[str, Any]:
+    return {"result": "7" * LARGE_RESULT_BYTES, "error": None}
+
+
+def _episode(client: Any, handlers: dict[str, Any]) -> Any:
+    async def run() -> None:
+        answer = await run_agent_loop(
+            prompt="benchmark",
+            tools=build_tools(),
+            tool_handlers=handlers,
+            max_steps=STEPS,
+            verbose=False,
+            client=client,
+        )
+        assert answer == 42, answer
+
+    return run
+
+
+def benchmarks(workdir: Path) -> list[Benchmark]:
+    cheap_handlers = {"python_expression": sandboxed_python_expression_tool, "submit_answer": submit_answer_tool}
+    large_handlers = {"python_expression": _large_result_tool, "submit_answer": submit_answer_tool}
+    payload = {"result": "7" * (1024 * 1024), "error": None}
+    return [
+        Benchmark(
+            "agent_loop.stub_client.1_call_per_step",
+            _episode(_ScriptedClient(_script(1, "print(1)")), cheap_handlers),
+            ops=STEPS,
+        ),
+        Benchmark(
+            "agent_loop.stub_client.8_calls_64KB_results",
+            _episode(_ScriptedClient(_script(8, "print(1)")), large_handlers),
+            ops=STEPS,
+        ),
+        Benchmark(
+            "agent_loop.fake_api.1_call_per_step",
+            _episode(fake_client(FakeMessagesTransport(_script(1, "print(1)"))), cheap_handlers),
+            ops=STEPS,
+        ),
+        Benchmark(
+            "agent_loop.fake_api.8_calls_64KB_results",
+            _episode(fake_client(FakeMessagesTransport(_script(8, "print(1)"))), large_handlers),
+            ops=STEPS,
+        ),
+        Benchmark("tool_result.json_dumps.1MB", lambda: json.dumps(payload)),
+    ]
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+
+from tasks.dataset_cleaning_csv.dataset import summarize_clean_rows, summarize_pipelines
+from tasks.dataset_cleaning_csv.rules import compile_rules
+from tasks.dataset_cleaning_csv.task import DatasetCleaningCSVTask
+from tasks.number_frequency.dataset import NumberDataset, load_number_dataset
+from tasks.number_frequency.task import NumberFrequencyTask
+from tasks.results.conditions import compile_condition
+from tasks.results.matches import MatchStore
+from tasks.results.task import TeamAwayLossTask
+from tasks.results.variants import generate_variants
+from utils.answer_cache import AnswerCache
+
+from .bench_prompts import write_matches_csv
+from .harness import Benchmark
+
+
+NUMBER_DATASET_SIZES = (100_000, 1_000_000)
+TARGETS = 100
+MATCH_ROWS = 100_000
+CUSTOMER_ROWS = 100_000
+CLEANING_VARIANTS = [
+    (f"keep score >= {threshold}", "coerce score float", *extra, "select id, name, score", "average score")
+    for threshold in range(5)
+    for extra in ((), ('keep status == "active"', "dedupe name"))
+]
+VARIANTS = 1_000
+CONDITION_VARIANTS = (
+    "away_win | (home_win & total_goals >= 4)",
+    "draw & round > 10 | (away_win & goal_difference <= -2)",
+    "~home_win & (home_goals + 1 >= away_goals) & season >= 2025",
+)
+
+
+def write_customers_csv(path: Path, count: int) -> Path:
+    """
+    Raw export in the layout of ``tasks/dataset_cleaning_csv/data/raw_customers.csv``;
+    every third row is inactive and every seventh has no score.
+    """
+    lines = ["id,name,status,score"]
+    for index in range(count):
+        status = "inactive" if index % 3 == 0 else "active"
+        score = "" if index % 7 == 0 else f"{index % 100}.5"
+        lines.append(f'{index},"Customer, {index}",{status},{score}')
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def write_numbers_json(path: Path, count: int, *, seed: int = 0) -> Path:
+    rng = random.Random(seed)
+    path.write_text(json.dumps([rng.randint(0, 999) for _ in range(count)]), encoding="utf-8")
+    return path
+
+
+def benchmarks(workdir: Path) -> list[Benchmark]:
+    items = []
+    for size in NUMBER_DATASET_SIZES:
+        path = write_numbers_json(workdir / f"numbers_{size}.json", size)
+
+        def parse(path: Path = path) -> None:
+            NumberDataset.from_file(path)
+
+        def answer_targets(path: Path = path) -> None:
+            # Fresh dataset each run, so the index build is part of the time.
+            dataset = NumberDataset.from_file(path)
+            for target in range(TARGETS):
+                dataset.expected_answer(target)
+
+        items.append(Benchmark(f"number_frequency.parse.{size}_ints", parse, ops=size))
+        items.append(Benchmark(f"number_frequency.{TARGETS}_answers.{size}_ints", answer_targets, ops=TARGETS))
+
+    cached = write_numbers_json(workdir / "numbers_cached.json", NUMBER_DATASET_SIZES[-1])
+    load_number_dataset(cached).index
+
+    def cached_answer() -> None:
+        load_number_dataset(cached).expected_answer(7)
+
+    items.append(Benchmark("number_frequency.cached_answer", cached_answer))
+    items.extend(_match_benchmarks(workdir))
+
+    customers = write_customers_csv(workdir / f"customers_{CUSTOMER_ROWS}.csv", CUSTOMER_ROWS)
+    items.append(
+        Benchmark(
+            f"dataset_cleaning_csv.summarize.{CUSTOMER_ROWS}_rows",
+            lambda: summarize_clean_rows(customers),
+            ops=CUSTOMER_ROWS,
+        )
+    )
+    pipelines = [compile_rules(rules) for rules in CLEANING_VARIANTS]
+    items.append(
+        Benchmark(
+            f"dataset_cleaning_csv.summarize_{len(pipelines)}_variants.{CUSTOMER_ROWS}_rows",
+            lambda: summarize_pipelines(customers, pipelines),
+            ops=CUSTOMER_ROWS * len(pipelines),
+        )
+    )
+    items.append(_worker_start_benchmark(workdir, customers, cached))
+    return items
+
+
+def _worker_start_benchmark(workdir: Path, customers: Path, numbers: Path) -> Benchmark:
+    """
+    Building one task of each kind in a fresh worker whose answers another
+    process already wrote to the disk cache: no dataset is parsed.
+    """
+    directory = workdir / "answer_cache"
+    matches = workdir / f"matches_store_{MATCH_ROWS}.csv"
+    output = workdir / "cleaned_customers.csv"
+
+    def start() -> None:
+        # A new cache each run has nothing in memory, like a new process.
+        cache = AnswerCache(directory)
+        TeamAwayLossTask(csv_path=matches, answer_cache=cache)
+        DatasetCleaningCSVTask(input_path=str(customers), output_path=str(output), answer_cache=cache)
+        NumberFrequencyTask(dataset_path=str(numbers), target=7, answer_cache=cache)
+
+    start()
+    return Benchmark("answer_cache.worker_start.3_tasks", start, ops=3)
+
+
+def _match_benchmarks(workdir: Path) -> list[Benchmark]:
+    path = write_matches_csv(workdir / f"matches_store_{MATCH_ROWS}.csv", MATCH_ROWS)
+    expressions = [expression for _, expression in TeamAwayLossTask.conditions]
+
+    def load() -> None:
+        MatchStore.from_csv(path)
+
+    store = MatchStore.from_csv(path)
+    for expression in (*expressions, *CONDITION_VARIANTS):
+        compile_condition(expression).mask(store)
+
+    def evaluate() -> None:
+        # Group masks are already built, as for every task after the first.
+        for expression in (*expressions, *CONDITION_VARIANTS):
+            compile_condition(expression).mask(store)
+
+    def variants() -> None:
+        generate_variants(VARIANTS, seed=0)
+
+    return [
+        Benchmark(f"results.match_store.load.{MATCH_ROWS}_rows", load, ops=MATCH_ROWS),
+        Benchmark(f"results.generate_variants.{VARIANTS}", variants, ops=VARIANTS),
+        Benchmark(
+            f"results.conditions.{MATCH_ROWS}_rows",
+            evaluate,
+            ops=len(expressions) + len(CONDITION_VARIANTS),
+        ),
+    ]
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import csv
+import json
+import random
+from pathlib import Path
+
+from tasks.arithmetic_expression.grader import verify as verify_arithmetic
+from tasks.cuda_kernel.grader import verify as verify_cuda_kernel
+from tasks.data_cleaning.grader import verify as verify_data_cleaning
+from tasks.dataset_cleaning_csv.dataset import iter_clean_rows, summarize_clean_rows
+from tasks.dataset_cleaning_csv.grader import verify as verify_dataset_cleaning_csv
+from tasks.ml_paper_technique.grader import verify as verify_ml_paper_technique
+from tasks.number_frequency.grader import verify as verify_number_frequency
+from tasks.results.grader import ExpectedMatches
+from tasks.results.grader import verify as verify_results
+
+from .bench_datasets import write_customers_csv
+from .harness import Benchmark
+
+
+LIST_SIZE = 1_000_000
+ROW_COUNT = 100_000
+
+
+def _passes(verify, *args, **kwargs):
+    def run() -> None:
+        assert verify(*args, **kwargs)
+
+    return run
+
+
+def benchmarks(workdir: Path) -> list[Benchmark]:
+    rng = random.Random(0)
+
+    big_int = 7**50_000
+    numbers = [rng.randrange(-1000, 1000) for _ in range(LIST_SIZE)]
+    floats = [rng.random() for _ in range(LIST_SIZE)]
+
+    matches = [
+        {
+            "date": f"{index % 28 + 1:02d}.09.2025 в 14:00",
+            "home": f"ФК ОТБОР {index % 40}",
+            "result": f"{index % 5}:{index % 3}",
+            "away": f"ФК ОТБОР {(index + 1) % 40}",
+            "round": f"Кръг {index % 30 + 1}",
+            "season": "2025/2026",
+        }
+        for index in range(ROW_COUNT)
+    ]
+    shuffled_matches = [dict(match) for match in matches]
+    rng.shuffle(shuffled_matches)
+    expected_matches = ExpectedMatches(matches)
+    # Every 100th row altered, swapped or wrong so grading has to diagnose it.
+    graded_matches = [dict(match) for match in shuffled_matches]
+    for index in range(0, ROW_COUNT, 100):
+        match = graded_matches[index]
+        if index % 300 == 0:
+            match["home"] = match["home"].lower() + "."
+        elif index % 300 == 100:
+            match["home"], match["away"] = match["away"], match["home"]
+        else:
+            match["result"] = "9:9"
+
+    positions = list(range(0, LIST_SIZE, 3))
+    frequency = {"number": 7, "count": len(positions), "positions": positions}
+    frequency_path = workdir / "frequency.json"
+    frequency_path.write_text(json.dumps(frequency))
+
+    csv_lines = ["id,name,score"] + [f"{index},name {index},{index % 100}" for index in range(ROW_COUNT)]
+    expected_csv = "\n".join(csv_lines)
+    cleaned_path = workdir / "cleaned.csv"
+    cleaned_path.write_text(expected_csv + "\n")
+    average = sum(index % 100 for index in range(ROW_COUNT)) / ROW_COUNT
+
+    # Streamed: the expected rows are re-read from the raw export alongside
+    # the output. DatasetCleaningCSVTask.verify reads only the output and
+    # compares its digest (see verify_digest).
+    customers_path = write_customers_csv(workdir / "customers.csv", ROW_COUNT)
+    customers = summarize_clean_rows(customers_path)
+    customers_cleaned_path = workdir / "customers_cleaned.csv"
+    with open(customers_cleaned_path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(iter_clean_rows(customers_path))
+
+    def verify_streamed() -> None:
+        assert verify_dataset_cleaning_csv(
+            {"rows_kept": customers.rows_kept, "average_score": customers.average_score},
+            expected_rows=customers.rows_kept,
+            expected_average=customers.average_score,
+            cleaned_path=customers_cleaned_path,
+            expected_csv=iter_clean_rows(customers_path),
+            expected_digest=customers.digest,
+        )
+
+    def verify_digest() -> None:
+        assert verify_dataset_cleaning_csv(
+            {"rows_kept": customers.rows_kept, "average_score": customers.average_score},
+            expected_rows=customers.rows_kept,
+            expected_average=customers.average_score,
+            cleaned_path=customers_cleaned_path,
+            expected_digest=customers.digest,
+        )
+
+    kernel_path = workdir / "kernel.cu"
+    body = "    out[i] = a[i] + b[i];\n" * 40_000
+    kernel_path.write_text(
+        "__global__ void vector_add(const float* a, const float* b, float* out, int n) {\n"
+        "    int i = blockIdx.x * blockDim.x + threadIdx.x;\n"
+        f"{body}}}\n"
+    )
+
+    return [
+        Benchmark("grader.arithmetic_expression.50k_digit_int", _passes(verify_arithmetic, big_int, 7**50_000)),
+        Benchmark(
+            "grader.data_cleaning.1M_ints",
+            _passes(verify_data_cleaning, list(numbers), numbers),
+            ops=LIST_SIZE,
+        ),
+        Benchmark(
+            "grader.ml_paper_technique.1M_floats",
+            _passes(verify_ml_paper_technique, list(floats), floats),
+            ops=LIST_SIZE,
+        ),
+        Benchmark(
+            "grader.results.100k_matches",
+            _passes(verify_results, shuffled_matches, matches),
+            ops=ROW_COUNT,
+        ),
+        Benchmark(
+            "grader.results.100k_matches_indexed",
+            _passes(expected_matches.matches, shuffled_matches),
+            ops=ROW_COUNT,
+        ),
+        Benchmark("grader.results.grade_100k_matches", lambda: expected_matches.grade(graded_matches), ops=ROW_COUNT),
+        Benchmark(
+            "grader.number_frequency.333k_positions",
+            _passes(
+                verify_number_frequency,
+                {**frequency, "positions": list(positions)},
+                frequency,
+                output_path=str(frequency_path),
+            ),
+            ops=len(positions),
+        ),
+        Benchmark(
+            "grader.dataset_cleaning_csv.100k_rows",
+            _passes(
+                verify_dataset_cleaning_csv,
+                {"rows_kept": ROW_COUNT, "average_score": average},
+                expected_rows=ROW_COUNT,
+                expected_average=average,
+                cleaned_path=cleaned_path,
+                expected_csv=expected_csv,
+            ),
+            ops=ROW_COUNT,
+        ),
+        Benchmark("grader.dataset_cleaning_csv.100k_rows_streamed", verify_streamed, ops=ROW_COUNT),
+        Benchmark("grader.dataset_cleaning_csv.100k_rows_digest", verify_digest, ops=ROW_COUNT),
+        Benchmark(
+            "grader.cuda_kernel.1MB_source",
+            _passes(
+                verify_cuda_kernel,
+                {"file_path": str(kernel_path), "summary": "vector_add kernel"},
+                kernel_path=kernel_path,
+                required_function="vector_add",
+            ),
+        ),
+    ]
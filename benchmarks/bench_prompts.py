@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import csv
+import random
+from pathlib import Path
+
+from tasks.results.task import TeamAwayLossTask
+
+from .harness import Benchmark
+
+
+DATASET_SIZES = (1_000, 10_000, 100_000)
+SHARD_TOKENS = 8_000
+HEADER = ["Първенство", "Сезон", "Кръг", "Дата", "Домакин", "Резултат", "Гост", "Назначения", "Доклади", "", "Файл"]
+
+
+def write_matches_csv(path: Path, rows: int, *, seed: int = 0) -> Path:
+    """
+    Synthetic export in the layout of ``tasks/results/data/combined_matches.csv``.
+    """
+    rng = random.Random(seed)
+    teams = [f"ФК ОТБОР {index} (Мъже)" for index in range(40)]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for index in range(rows):
+            home, away = rng.sample(teams, 2)
+            result = f"{rng.randint(0, 6)}:{rng.randint(0, 6)}" if rng.random() > 0.05 else ""
+            writer.writerow(
+                [
+                    "БОГ София Юг",
+                    "2025/2026",
+                    f"Кръг {index % 30 + 1}",
+                    f"{index % 28 + 1:02d}.09.2025 в 14:00",
+                    home,
+                    result,
+                    away,
+                    "Назначения",
+                    "",
+                    "",
+                    "bench.xlsx",
+                ]
+            )
+    return path
+
+
+def benchmarks(workdir: Path) -> list[Benchmark]:
+    items = []
+    for size in DATASET_SIZES:
+        path = write_matches_csv(workdir / f"matches_{size}.csv", size)
+        task = TeamAwayLossTask(csv_path=path)
+
+        def render(task: TeamAwayLossTask = task) -> None:
+            task.invalidate_prompt()
+            task.rendered_prompt
+
+        def render_shards(path: Path = path) -> None:
+            for shard in TeamAwayLossTask(csv_path=path, shard_tokens=SHARD_TOKENS).shard_tasks():
+                shard.rendered_prompt
+
+        items.append(Benchmark(f"results.render_prompt.{size}_rows", render, ops=size))
+        items.append(Benchmark(f"results.render_shard_prompts.{size}_rows", render_shards, ops=size))
+    return items
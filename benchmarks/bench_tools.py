@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+from main import sandboxed_python_expression_tool
+from utils.sandbox import PythonSandbox
+
+from .harness import Benchmark
+
+
+CALLS = 64
+EXPRESSION = "print(sum(range(1000)))"
+
+
+def benchmarks(workdir: Path) -> list[Benchmark]:
+    # A private pool, so the warm-up run starts its workers and teardown
+    # stops them without touching the process-wide default sandbox.
+    sandbox = PythonSandbox(size=8)
+
+    async def sandboxed() -> None:
+        results = await asyncio.gather(*(sandbox.run(EXPRESSION) for _ in range(CALLS)))
+        assert all(result["error"] is None for result in results), results
+
+    async def sequential() -> None:
+        # The tool handler the tasks register, one call at a time.
+        for _ in range(CALLS):
+            result = await sandboxed_python_expression_tool(EXPRESSION)
+            assert result["error"] is None, result
+
+    return [
+        Benchmark("python_expression.sandboxed_tool_sequential", sequential, ops=CALLS),
+        Benchmark("python_expression.sandbox_8_workers", sandboxed, ops=CALLS, teardown=sandbox.close),
+    ]
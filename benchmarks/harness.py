@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import inspect
+import json
+import platform
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+
+DEFAULT_REPEAT = 7
+DEFAULT_WARMUP = 1
+DEFAULT_TOLERANCE = 0.25
+
+
+@dataclass(slots=True)
+class Benchmark:
+    """
+    One timed operation. ``run`` may be a plain or a coroutine function; all
+    repeats of a coroutine benchmark share one event loop. ``ops`` is the
+    number of logical operations (steps, calls, rows) one run performs, so
+    results are also reported per operation. ``teardown`` runs once after
+    timing.
+    """
+
+    name: str
+    run: Callable[[], Any]
+    ops: int = 1
+    teardown: Callable[[], Any] | None = None
+
+
+@dataclass(slots=True)
+class BenchmarkResult:
+    name: str
+    repeat: int
+    ops: int
+    median_s: float
+    mean_s: float
+    min_s: float
+    stdev_s: float
+
+    @property
+    def per_op_s(self) -> float:
+        return self.median_s / self.ops
+
+    @classmethod
+    def from_timings(cls, name: str, ops: int, timings: list[float]) -> BenchmarkResult:
+        return cls(
+            name=name,
+            repeat=len(timings),
+            ops=ops,
+            median_s=statistics.median(timings),
+            mean_s=statistics.fmean(timings),
+            min_s=min(timings),
+            stdev_s=statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        )
+
+
+@dataclass(slots=True)
+class Comparison:
+    name: str
+    current_s: float
+    baseline_s: float | None
+    regressed: bool
+
+    @property
+    def ratio(self) -> float | None:
+        if not self.baseline_s:
+            return None
+        return self.current_s / self.baseline_s
+
+
+def measure(
+    benchmark: Benchmark,
+    *,
+    repeat: int = DEFAULT_REPEAT,
+    warmup: int = DEFAULT_WARMUP,
+) -> BenchmarkResult:
+    try:
+        if inspect.iscoroutinefunction(benchmark.run):
+            timings = asyncio.run(_time_async(benchmark.run, repeat, warmup))
+        else:
+            timings = _time_sync(benchmark.run, repeat, warmup)
+    finally:
+        if benchmark.teardown is not None:
+            benchmark.teardown()
+    return BenchmarkResult.from_timings(benchmark.name, benchmark.ops, timings)
+
+
+def _time_sync(run: Callable[[], Any], repeat: int, warmup: int) -> list[float]:
+    for _ in range(warmup):
+        run()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def _time_async(run: Callable[[], Any], repeat: int, warmup: int) -> list[float]:
+    for _ in range(warmup):
+        await run()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def write_results(path: str | Path, results: list[BenchmarkResult]) -> None:
+    """
+    Write results as JSON keyed by benchmark name, together with enough
+    environment details to tell whether two files are comparable.
+    """
+    document = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": {
+            result.name: {**asdict(result), "per_op_s": result.per_op_s} for result in results
+        },
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+
+
+def load_results(path: str | Path) -> dict[str, dict[str, Any]]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))["results"]
+
+
+def compare(
+    results: list[BenchmarkResult],
+    baseline: dict[str, dict[str, Any]],
+    *,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[Comparison]:
+    """
+    Compare medians against the baseline; a benchmark regresses when it is
+    more than ``tolerance`` (a fraction) slower. Benchmarks missing from the
+    baseline are reported but never flagged.
+    """
+    comparisons = []
+    for result in results:
+        entry = baseline.get(result.name)
+        baseline_s = entry["median_s"] if entry else None
+        regressed = baseline_s is not None and result.median_s > baseline_s * (1 + tolerance)
+        comparisons.append(Comparison(result.name, result.median_s, baseline_s, regressed))
+    return comparisons
+
+
+def format_report(comparisons: list[Comparison], results: list[BenchmarkResult]) -> str:
+    per_op = {result.name: result for result in results}
+    width = max((len(comparison.name) for comparison in comparisons), default=10)
+    lines = [f"{'benchmark':<{width}}  {'median':>10}  {'per op':>10}  {'baseline':>10}  change"]
+    for comparison in comparisons:
+        result = per_op[comparison.name]
+        baseline = _format_seconds(comparison.baseline_s) if comparison.baseline_s else "-"
+        ratio = comparison.ratio
+        change = "-" if ratio is None else f"{(ratio - 1) * 100:+.1f}%"
+        if comparison.regressed:
+            change += "  REGRESSION"
+        lines.append(
+            f"{comparison.name:<{width}}  {_format_seconds(result.median_s):>10}  "
+            f"{_format_seconds(result.per_op_s):>10}  {baseline:>10}  {change}"
+        )
+    return "\n".join(lines)
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    if seconds >= 1e-6:
+        return f"{seconds * 1e6:.1f}us"
+    return f"{seconds * 1e9:.1f}ns"
@@ -1,19 +1,35 @@
 import asyncio
 import json
+import time
 from collections.abc import Callable
-from contextlib import redirect_stdout
-from io import StringIO
-from typing import Any, TypedDict
+from typing import Any, NotRequired, TypedDict
 
 from anthropic import AsyncAnthropic
-from anthropic.types import MessageParam, ToolUnionParam
+from anthropic.types import Message, MessageParam, TextBlockParam, ToolUnionParam, ToolUseBlock
+
+from utils.client_pool import AnthropicClientPool
+from utils.handlers import call_handler
+from utils.history import CompactionPolicy, compact_history
+from utils.metrics import EpisodeMetrics, StepMetrics, ToolMetrics
+from utils.prompt_caching import (
+    CacheStats,
+    cached_system,
+    cached_tools,
+    with_history_breakpoint,
+)
+from utils.rate_limiter import AdaptiveRateLimiter, RequestTiming
+from utils.response_cache import ResponseCache, canonical_request_key
+from utils.sandbox import get_default_sandbox
+from utils.token_estimation import estimate_payload_tokens
 
 MAX_TOKENS = 6000
+TOOL_TIMEOUT_SECONDS = 60.0
 
 
 class PythonExpressionToolResult(TypedDict):
     result: Any
     error: str | None
+    stderr: NotRequired[str]
 
 
 class SubmitAnswerToolResult(TypedDict):
@@ -21,21 +37,13 @@ class SubmitAnswerToolResult(TypedDict):
     submitted: bool
 
 
-def python_expression_tool(expression: str) -> PythonExpressionToolResult:
+async def sandboxed_python_expression_tool(expression: str) -> PythonExpressionToolResult:
     """
-    Tool that evaluates Python expressions using exec.
-    Use print(...) to emit output; stdout will be captured and returned.
+    Tool that evaluates Python expressions in a pooled worker process with a
+    timeout and CPU/memory limits, without blocking the event loop.
+    stdout and stderr of the call are captured separately and returned.
     """
-    try:
-        namespace = {}
-        stdout = StringIO()
-        with redirect_stdout(stdout):
-            exec(expression, namespace, namespace)
-        return {"result": stdout.getvalue(), "error": None}
-    except KeyboardInterrupt:
-        raise
-    except Exception as e:
-        return {"result": None, "error": str(e)}
+    return await get_default_sandbox().run(expression)
 
 
 def submit_answer_tool(answer: Any) -> SubmitAnswerToolResult:
@@ -45,107 +53,328 @@ def submit_answer_tool(answer: Any) -> SubmitAnswerToolResult:
     return {"answer": answer, "submitted": True}
 
 
+async def _run_tool(
+    handler: Callable[..., Any],
+    tool_name: str,
+    tool_input: Any,
+    timeout: float | None,
+) -> tuple[Any, float]:
+    """
+    Call a single tool handler, bounded by its own timeout. Coroutine handlers
+    are awaited and handlers marked ``@blocking`` run in a worker thread.
+    Returns the result together with the call's duration in seconds.
+    """
+    started_at = time.perf_counter()
+    result = await _call_tool(handler, tool_name, tool_input, timeout)
+    return result, time.perf_counter() - started_at
+
+
+async def _call_tool(
+    handler: Callable[..., Any],
+    tool_name: str,
+    tool_input: Any,
+    timeout: float | None,
+) -> Any:
+    try:
+        async with asyncio.timeout(timeout):
+            if tool_name == "python_expression":
+                assert isinstance(tool_input, dict) and "expression" in tool_input
+                return await call_handler(handler, tool_input["expression"])
+            if tool_name == "submit_answer":
+                assert isinstance(tool_input, dict) and "answer" in tool_input
+                return await call_handler(handler, tool_input["answer"])
+            # Generic handler call
+            if isinstance(tool_input, dict):
+                return await call_handler(handler, **tool_input)
+            return await call_handler(handler, tool_input)
+    except TimeoutError:
+        return {"error": f"Tool {tool_name} timed out after {timeout}s"}
+
+
+async def _cancel_tasks(tasks: list[asyncio.Future[Any]]) -> None:
+    """
+    Cancel ``tasks`` and wait until they have finished.
+    """
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class _StreamedResponse:
+    """
+    The parts of a raw response the rate limiter reads, for a streamed request.
+    """
+
+    def __init__(self, headers: Any, message: Message) -> None:
+        self.headers = headers
+        self.message = message
+
+    def parse(self) -> Message:
+        return self.message
+
+
+async def _stream_message(
+    client: AsyncAnthropic,
+    params: dict[str, Any],
+    on_tool_use: Callable[[ToolUseBlock], None],
+    verbose: bool,
+) -> _StreamedResponse:
+    """
+    Stream one response, printing text as it arrives and handing every
+    tool_use block to ``on_tool_use`` as soon as its input is complete.
+    """
+    async with client.messages.stream(**params) as stream:
+        async for event in stream:
+            if event.type == "content_block_start" and event.content_block.type == "text":
+                if verbose:
+                    print("Assistant: ", end="", flush=True)
+            elif event.type == "text":
+                if verbose:
+                    print(event.text, end="", flush=True)
+            elif event.type == "content_block_stop":
+                if event.content_block.type == "tool_use":
+                    on_tool_use(event.content_block)
+                elif verbose and event.content_block.type == "text":
+                    print()
+        message = await stream.get_final_message()
+        return _StreamedResponse(stream.response.headers, message)
+
+
 async def run_agent_loop(
-    prompt: str,
+    prompt: str | list[TextBlockParam],
     tools: list[ToolUnionParam],
     tool_handlers: dict[str, Callable[..., Any]],
     max_steps: int = 20,
     model: str = "claude-haiku-4-5",
     verbose: bool = True,
+    rate_limiter: AdaptiveRateLimiter | None = None,
+    client: AsyncAnthropic | None = None,
+    system: str | list[TextBlockParam] | None = None,
+    cache_prompt: bool = False,
+    cache_stats: CacheStats | None = None,
+    tool_timeout: float | None = TOOL_TIMEOUT_SECONDS,
+    response_cache: ResponseCache | None = None,
+    metrics: EpisodeMetrics | None = None,
+    stream: bool = False,
+    compaction: CompactionPolicy | None = None,
 ) -> Any | None:
     """
     Runs an agent loop with the given prompt and tools.
 
     Args:
-        prompt: The initial prompt for the agent
+        prompt: The initial prompt for the agent, either plain text or text
+            blocks (blocks may carry their own cache_control breakpoint)
         tools: List of tool definitions for Anthropic API
         tool_handlers: Dictionary mapping tool names to their handler functions
         max_steps: Maximum number of steps before stopping (default 5)
         model: The Anthropic model to use
         verbose: Whether to print detailed output (default True)
+        rate_limiter: Optional limiter shared between episodes that paces every
+            messages.create call and retries rate-limit errors
+        client: Optional shared client (or a stand-in exposing the same
+            messages API); a fresh AsyncAnthropic is created when omitted
+        system: Optional system prompt
+        cache_prompt: Place prompt-caching breakpoints on the tool definitions,
+            the system prompt and the newest message of the conversation
+        cache_stats: Optional accumulator for cache hits and misses, which
+            may be shared between episodes
+        tool_timeout: Per-call timeout in seconds for tool handlers; the tool
+            calls of one step run concurrently (None disables the timeout)
+        response_cache: Optional record/replay cache of API responses keyed by
+            a hash of model, system, tools and messages
+        metrics: Optional accumulator that receives per-step API latency,
+            rate-limit waits, token usage, stop reason and tool timings
+        stream: Stream responses, printing text as it arrives and starting
+            each tool call as soon as its tool_use block is complete, while
+            the model is still generating later blocks
+        compaction: Optional policy that excerpts, drops superseded or cuts
+            older steps from the history sent to the model, keeping per-step
+            input tokens flat; the full transcript is kept locally
 
     Returns:
         The submitted answer if submit_answer was called, otherwise None
     """
-    client = AsyncAnthropic()
+    if client is None:
+        client = AsyncAnthropic()
+    if rate_limiter is not None:
+        # The limiter owns retries so it can see every 429 and its headers.
+        client = client.with_options(max_retries=0)
     messages: list[MessageParam] = [{"role": "user", "content": prompt}]
 
+    # Tools, then system, then messages form the cached prefix, in that order.
+    request_params: dict[str, Any] = {
+        "model": model,
+        "max_tokens": MAX_TOKENS,
+        "tools": cached_tools(tools) if cache_prompt else tools,
+    }
+    if system is not None:
+        request_params["system"] = cached_system(system) if cache_prompt else system
+    if cache_stats is None:
+        cache_stats = CacheStats()
+    if metrics is None:
+        metrics = EpisodeMetrics()
+
     for step in range(max_steps):
         if verbose:
             print(f"\n=== Step {step + 1}/{max_steps} ===")
 
-        response = await client.messages.create(
-            model=model, max_tokens=MAX_TOKENS, tools=tools, messages=messages
-        )
-
-        assert response.stop_reason in ["max_tokens", "tool_use", "end_turn"], (
-            f"unsupported stop_reason {response.stop_reason}"
-        )
-        if response.stop_reason == "max_tokens":
-            print(
-                f"Model reached max_tokens limit {MAX_TOKENS}. Increase "
-                "MAX_TOKENS, simplify your task, or update the code to provide "
-                "a message back to the model when it exceeds MAX_TOKENS."
+        response = None
+        timing = RequestTiming()
+        started_at = time.perf_counter()
+        # Tool calls started while the response was still streaming, by id.
+        early_calls: dict[str, asyncio.Future[tuple[Any, float]]] = {}
+        first_tool_at: float | None = None
+
+        def start_tool(block: ToolUseBlock) -> None:
+            nonlocal first_tool_at
+            if block.name in tool_handlers and block.id not in early_calls:
+                if first_tool_at is None:
+                    first_tool_at = time.perf_counter()
+                early_calls[block.id] = asyncio.ensure_future(
+                    _run_tool(tool_handlers[block.name], block.name, block.input, tool_timeout)
+                )
+
+        history = compact_history(messages, compaction) if compaction is not None else messages
+        if response_cache is not None:
+            cache_key = canonical_request_key(
+                model=model, system=system, tools=tools, messages=history
             )
-
-        # Track if we need to continue
-        has_tool_use = False
-        tool_results = []
-        submitted_answer = None
-
-        # Process the response
-        for content in response.content:
-            if content.type == "text":
-                if verbose:
-                    print(f"Assistant: {content.text}")
-            elif content.type == "tool_use":
-                has_tool_use = True
-                tool_name = content.name
-
-                if tool_name in tool_handlers:
-                    if verbose:
-                        print(f"Using tool: {tool_name}")
-
-                    # Extract arguments based on tool
-                    handler = tool_handlers[tool_name]
-                    tool_input = content.input
-
-                    # Call the appropriate tool handler
-                    if tool_name == "python_expression":
-                        assert (
-                            isinstance(tool_input, dict) and "expression" in tool_input
-                        )
-                        if verbose:
-                            print("\nInput:")
-                            print("```")
-                            for line in tool_input["expression"].split("\n"):
-                                print(f"{line}")
-                            print("```")
-                        result = handler(tool_input["expression"])
-                        if verbose:
-                            print("\nOutput:")
-                            print("```")
-                            print(result)
-                            print("```")
-                    elif tool_name == "submit_answer":
-                        assert isinstance(tool_input, dict) and "answer" in tool_input
-                        result = handler(tool_input["answer"])
-                        submitted_answer = result["answer"]
+            response = response_cache.lookup(cache_key)
+        from_response_cache = response is not None
+
+        streamed = stream and response is None
+
+        pending: list[asyncio.Future[tuple[Any, float]]] = []
+        try:
+            if response is None:
+                request_messages = with_history_breakpoint(history) if cache_prompt else history
+                if stream:
+                    async def request() -> _StreamedResponse:
+                        try:
+                            return await _stream_message(
+                                client, {**request_params, "messages": request_messages}, start_tool, verbose
+                            )
+                        except BaseException:
+                            # A retry streams the response again, so the tool calls
+                            # this attempt started must not outlive it.
+                            calls = list(early_calls.values())
+                            early_calls.clear()
+                            await _cancel_tasks(calls)
+                            raise
+                else:
+                    request = lambda: client.messages.with_raw_response.create(
+                        **request_params, messages=request_messages
+                    )
+                if rate_limiter is None:
+                    if stream:
+                        response = (await request()).parse()
                     else:
-                        # Generic handler call
-                        result = (
-                            handler(**tool_input)
-                            if isinstance(tool_input, dict)
-                            else handler(tool_input)
+                        response = await client.messages.create(
+                            **request_params, messages=request_messages
                         )
-
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content.id,
-                            "content": json.dumps(result),
-                        }
+                    timing.attempts = 1
+                    timing.request_seconds = time.perf_counter() - started_at
+                else:
+                    response = await rate_limiter.call(
+                        request,
+                        input_tokens=estimate_payload_tokens([request_params, request_messages]),
+                        timing=timing,
                     )
+                if response_cache is not None:
+                    response_cache.store(cache_key, response)
+
+            step_metrics = StepMetrics(
+                step=step + 1,
+                api_seconds=timing.request_seconds,
+                rate_limit_wait_seconds=timing.queued_seconds,
+                attempts=timing.attempts,
+                from_response_cache=from_response_cache,
+                stop_reason=response.stop_reason,
+            )
+            step_metrics.record_usage(response.usage)
+            metrics.steps.append(step_metrics)
+            cache_stats.record(response.usage)
+            if verbose and cache_prompt:
+                usage = response.usage
+                print(
+                    f"Prompt cache: read {usage.cache_read_input_tokens or 0}, "
+                    f"written {usage.cache_creation_input_tokens or 0}, "
+                    f"uncached {usage.input_tokens} input tokens"
+                )
+
+            assert response.stop_reason in ["max_tokens", "tool_use", "end_turn"], (
+                f"unsupported stop_reason {response.stop_reason}"
+            )
+            if response.stop_reason == "max_tokens":
+                print(
+                    f"Model reached max_tokens limit {MAX_TOKENS}. Increase "
+                    "MAX_TOKENS, simplify your task, or update the code to provide "
+                    "a message back to the model when it exceeds MAX_TOKENS."
+                )
+
+            # Track if we need to continue
+            has_tool_use = False
+            tool_calls = []
+            submitted_answer = None
+
+            # Process the response
+            for content in response.content:
+                if content.type == "text":
+                    # Streamed text was already printed as it arrived.
+                    if verbose and not streamed:
+                        print(f"Assistant: {content.text}")
+                elif content.type == "tool_use":
+                    has_tool_use = True
+                    tool_name = content.name
+
+                    if tool_name in tool_handlers:
+                        if verbose:
+                            print(f"Using tool: {tool_name}")
+                            if tool_name == "python_expression" and isinstance(content.input, dict):
+                                print("\nInput:")
+                                print("```")
+                                for line in str(content.input.get("expression", "")).split("\n"):
+                                    print(f"{line}")
+                                print("```")
+                        tool_calls.append(content)
+
+            # Independent tool calls of one step run concurrently; results keep
+            # the order in which the model issued the calls.
+            tools_started_at = first_tool_at or time.perf_counter()
+            for call in tool_calls:
+                task = early_calls.pop(call.id, None)
+                if task is None:
+                    task = asyncio.ensure_future(
+                        _run_tool(tool_handlers[call.name], call.name, call.input, tool_timeout)
+                    )
+                pending.append(task)
+            timed_results = await asyncio.gather(*pending)
+        except BaseException:
+            # Whatever fails (the request, a tool, or an unsupported stop
+            # reason), no tool call of this step may keep running.
+            await _cancel_tasks([*early_calls.values(), *pending])
+            raise
+        if pending:
+            step_metrics.time_to_first_tool_seconds = tools_started_at - started_at
+        step_metrics.tool_seconds = time.perf_counter() - tools_started_at
+
+        tool_results = []
+        for call, (result, seconds) in zip(tool_calls, timed_results):
+            step_metrics.tools.append(ToolMetrics(name=call.name, seconds=seconds))
+            if call.name == "python_expression" and verbose:
+                print("\nOutput:")
+                print("```")
+                print(result)
+                print("```")
+            elif call.name == "submit_answer" and isinstance(result, dict) and "answer" in result:
+                submitted_answer = result["answer"]
+            tool_results.append(
+                {
+                    "type": "tool_result",
+                    "tool_use_id": call.id,
+                    "content": json.dumps(result),
+                }
+            )
 
         # If we have tool uses, add them to the conversation
         if has_tool_use:
@@ -177,6 +406,7 @@ async def run_single_test(
     tool_handlers: dict[str, Callable[..., Any]],
     expected_answer: Any,
     verbose: bool = False,
+    client: AsyncAnthropic | None = None,
 ) -> tuple[int, bool, Any]:
     if verbose:
         print(f"\n\n{'=' * 20} RUN {run_id}/{num_runs} {'=' * 20}")
@@ -187,6 +417,7 @@ async def run_single_test(
         tool_handlers=tool_handlers,
         max_steps=5,
         verbose=verbose,
+        client=client,
     )
 
     success = result == expected_answer
@@ -227,7 +458,7 @@ async def main(concurrent: bool = True):
     ]
 
     tool_handlers = {
-        "python_expression": python_expression_tool,
+        "python_expression": sandboxed_python_expression_tool,
         "submit_answer": submit_answer_tool,
     }
 
@@ -240,33 +471,38 @@ async def main(concurrent: bool = True):
     print(f"Running {num_runs} test iterations {execution_mode}...")
     print("=" * 60)
 
-    # Create all test coroutines
-    tasks = [
-        run_single_test(
-            run_id=i + 1,
-            num_runs=num_runs,
-            prompt=prompt,
-            tools=tools,
-            tool_handlers=tool_handlers,
-            expected_answer=expected_answer,
-            verbose=False,
-        )
-        for i in range(num_runs)
-    ]
-
-    # Run concurrently or sequentially based on the flag
-    if concurrent:
-        # Process results as they complete
-        results = []
-        for coro in asyncio.as_completed(tasks):
-            result = await coro
-            results.append(result)
-    else:
-        # Run sequentially by awaiting each task in order
-        results = []
-        for task in tasks:
-            result = await task
-            results.append(result)
+    # All runs share one long-lived client so connections are reused
+    async with AnthropicClientPool() as pool:
+        client = pool.acquire()
+
+        # Create all test coroutines
+        tasks = [
+            run_single_test(
+                run_id=i + 1,
+                num_runs=num_runs,
+                prompt=prompt,
+                tools=tools,
+                tool_handlers=tool_handlers,
+                expected_answer=expected_answer,
+                verbose=False,
+                client=client,
+            )
+            for i in range(num_runs)
+        ]
+
+        # Run concurrently or sequentially based on the flag
+        if concurrent:
+            # Process results as they complete
+            results = []
+            for coro in asyncio.as_completed(tasks):
+                result = await coro
+                results.append(result)
+        else:
+            # Run sequentially by awaiting each task in order
+            results = []
+            for task in tasks:
+                result = await task
+                results.append(result)
 
     # Count successes
     successes = sum(success for _, success, _ in results)
@@ -1,4 +1,4 @@
-from .rl_task_base import RLTask, ToolHandler, EpisodeResult
+from .rl_task_base import RLTask, ToolHandler, EpisodeResult, RenderedPrompt
 from .arithmetic_expression import ArithmeticExpressionTask
 from .data_cleaning import EvenNumberCleaningTask
 from .number_frequency import NumberFrequencyTask
@@ -10,6 +10,7 @@ __all__ = [
     "RLTask",
     "ToolHandler",
     "EpisodeResult",
+    "RenderedPrompt",
     "ArithmeticExpressionTask",
     "EvenNumberCleaningTask",
     "NumberFrequencyTask",
@@ -4,7 +4,7 @@ from typing import Any
 
 from anthropic.types import ToolUnionParam
 
-from utils.prompt_loader import load_prompt
+from utils.prompt_loader import load_prompt_template
 from ..rl_task_base import RLTask, ToolHandler
 from .tools import build_tools as build_task_tools
 from .tools import build_tool_handlers as build_task_tool_handlers
@@ -30,10 +30,12 @@ class ArithmeticExpressionTask(RLTask):
         self._expression = expression
         self._expected_answer = expected_answer
         self._description = description or "Evaluate the provided arithmetic expression."
-        self._prompt_template = load_prompt("arithmetic_expression", "prompt.md")
+        self._prompt_template = load_prompt_template("arithmetic_expression", "prompt.md")
 
-    @property
-    def prompt(self) -> str:
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (self._description, self._expression)
+
+    def render_prompt(self) -> str:
         return self._prompt_template.format(
             description=self._description,
             expression=self._expression,
@@ -5,7 +5,8 @@ from typing import Any
 
 from anthropic.types import ToolUnionParam
 
-from utils.prompt_loader import load_prompt
+from utils.handlers import blocking
+from utils.prompt_loader import load_prompt_template
 from ..rl_task_base import RLTask, ToolHandler
 from .tools import build_tools as build_task_tools
 from .tools import build_tool_handlers as build_task_tool_handlers
@@ -35,14 +36,21 @@ class CudaKernelTask(RLTask):
         self._kernel_path.parent.mkdir(parents=True, exist_ok=True)
         self._operation_description = "Compute C[i] = A[i] + B[i] for float32 vectors."
         self._description = description or "Write a CUDA kernel for vector addition that supports arbitrary lengths."
-        self._prompt_template = load_prompt("cuda_kernel", "prompt.md")
+        self._prompt_template = load_prompt_template("cuda_kernel", "prompt.md")
         self._expected_answer = {
             "file_path": str(self._kernel_path),
             "function": self._kernel_function,
         }
 
-    @property
-    def prompt(self) -> str:
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (
+            self._description,
+            self._operation_description,
+            self._vector_length,
+            self._kernel_path,
+        )
+
+    def render_prompt(self) -> str:
         return self._prompt_template.format(
             description=self._description,
             operation_description=self._operation_description,
@@ -60,6 +68,7 @@ class CudaKernelTask(RLTask):
     def build_tool_handlers(self) -> dict[str, ToolHandler]:
         return build_task_tool_handlers()
 
+    @blocking
     def verify(self, result: Any) -> bool:
         return verify_result(
             result,
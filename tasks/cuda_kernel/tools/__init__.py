@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from anthropic.types import ToolUnionParam
 
-from main import python_expression_tool, submit_answer_tool
+from main import sandboxed_python_expression_tool, submit_answer_tool
 from utils.file_tools import write_text_file_tool
 from ...rl_task_base import ToolHandler
 
@@ -53,7 +53,7 @@ def build_tools() -> list[ToolUnionParam]:
 
 def build_tool_handlers() -> dict[str, ToolHandler]:
     return {
-        "python_expression": python_expression_tool,
+        "python_expression": sandboxed_python_expression_tool,
         "write_kernel_file": write_text_file_tool,
         "submit_answer": submit_answer_tool,
     }
@@ -4,7 +4,7 @@ from typing import Any, Iterable
 
 from anthropic.types import ToolUnionParam
 
-from utils.prompt_loader import load_prompt
+from utils.prompt_loader import load_prompt_template
 from ..rl_task_base import RLTask, ToolHandler
 from .tools import build_tools as build_task_tools
 from .tools import build_tool_handlers as build_task_tool_handlers
@@ -29,10 +29,12 @@ class EvenNumberCleaningTask(RLTask):
         self._numbers = list(numbers)
         self._description = description or "Clean the dataset by removing all odd numbers."
         self._expected_answer = [n for n in self._numbers if n % 2 == 0]
-        self._prompt_template = load_prompt("data_cleaning", "prompt.md")
+        self._prompt_template = load_prompt_template("data_cleaning", "prompt.md")
 
-    @property
-    def prompt(self) -> str:
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (self._description, self._numbers)
+
+    def render_prompt(self) -> str:
         return self._prompt_template.format(
             description=self._description,
             numbers=self._numbers,
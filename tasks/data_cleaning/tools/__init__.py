@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from anthropic.types import ToolUnionParam
 
-from main import python_expression_tool, submit_answer_tool
+from main import sandboxed_python_expression_tool, submit_answer_tool
 from ...rl_task_base import ToolHandler
 
 
@@ -36,7 +36,7 @@ def build_tools() -> list[ToolUnionParam]:
 
 def build_tool_handlers() -> dict[str, ToolHandler]:
     return {
-        "python_expression": python_expression_tool,
+        "python_expression": sandboxed_python_expression_tool,
         "submit_answer": submit_answer_tool,
     }
 
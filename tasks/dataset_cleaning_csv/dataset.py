@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import csv
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+
+from .rules import DEFAULT_RULES, CleaningPipeline, CleaningSummary, compile_rules
+
+
+def _read_rows(input_path: str | Path) -> Iterator[list[str]]:
+    """
+    The header, then every data row, each padded to the header's width;
+    blank lines are skipped.
+    """
+    with open(input_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        yield header
+        width = len(header)
+        for row in reader:
+            if len(row) < width:
+                if not row:
+                    continue
+                row += [""] * (width - len(row))
+            yield row
+
+
+def iter_clean_rows(input_path: str | Path, pipeline: CleaningPipeline | None = None) -> Iterator[list[str]]:
+    """
+    The header, then every row the cleaning rules keep (``DEFAULT_RULES``
+    unless a compiled ``pipeline`` is given), read from ``input_path`` one
+    row at a time.
+    """
+    rows = _read_rows(input_path)
+    run = (pipeline or compile_rules(DEFAULT_RULES)).start(next(rows))
+    yield run.output_header
+    for row in rows:
+        cleaned = run.feed(row)
+        if cleaned is not None:
+            yield cleaned
+
+
+def summarize_clean_rows(input_path: str | Path, pipeline: CleaningPipeline | None = None) -> CleaningSummary:
+    """
+    Row count, mean and digest of the cleaned CSV in one streaming pass,
+    without holding the kept rows in memory.
+    """
+    return summarize_pipelines(input_path, [pipeline or compile_rules(DEFAULT_RULES)])[0]
+
+
+def summarize_pipelines(input_path: str | Path, pipelines: Sequence[CleaningPipeline]) -> list[CleaningSummary]:
+    """
+    Summaries of many cleaning variants over the same file from a single
+    read: every row is fed to every pipeline in turn.
+    """
+    rows = _read_rows(input_path)
+    header = next(rows)
+    runs = [pipeline.start(header) for pipeline in pipelines]
+    feeds = [run.feed for run in runs]
+    for row in rows:
+        for feed in feeds:
+            feed(row)
+    return [run.summary() for run in runs]
@@ -1,70 +1,155 @@
 from __future__ import annotations
 
 import csv
+from collections.abc import Sequence
+from dataclasses import asdict
 from pathlib import Path
 from typing import Any
 
 from anthropic.types import ToolUnionParam
 
-from utils.prompt_loader import load_prompt
+from utils.answer_cache import AnswerCache, default_answer_cache
+from utils.handlers import blocking
+from utils.history import CompactionPolicy
+from utils.prompt_loader import load_prompt_template
 from ..rl_task_base import RLTask, ToolHandler
 from .tools import build_tools as build_task_tools
 from .tools import build_tool_handlers as build_task_tool_handlers
+from .dataset import iter_clean_rows, summarize_clean_rows, summarize_pipelines
+from .grader import GRADER_VERSION, first_difference
 from .grader import verify as verify_result
+from .rules import DEFAULT_RULES, CleaningSummary, compile_rules
 
 
 class DatasetCleaningCSVTask(RLTask):
     """
     Ask the agent to read a raw CSV, clean it according to predefined rules, and
     persist the cleaned data while reporting summary statistics.
+
+    The rules are declarative (see ``rules.compile_rules``); the same
+    compiled pipeline renders them into the prompt and computes the expected
+    CSV and statistics, so variants need no code of their own.
     """
 
+    # read_dataset_file returns the whole CSV, so re-reads and old results
+    # would otherwise be re-sent on every later step.
+    compaction = CompactionPolicy(superseded_tools=("read_dataset_file",))
+
+    rules: tuple[str, ...] = DEFAULT_RULES
+
     def __init__(
         self,
         *,
         input_path: str = "tasks/dataset_cleaning_csv/data/raw_customers.csv",
         output_path: str = "tasks/dataset_cleaning_csv/data/cleaned_customers.csv",
         description: str | None = None,
+        rules: Sequence[str] | None = None,
+        summary: CleaningSummary | None = None,
         model: str = "claude-haiku-4-5",
         max_steps: int = 20,
+        python_session: bool = False,
+        answer_cache: AnswerCache | None = None,
     ) -> None:
-        super().__init__(model=model, max_steps=max_steps)
+        super().__init__(model=model, max_steps=max_steps, python_session=python_session)
         self._input_path = Path(input_path).resolve()
         self._output_path = Path(output_path).resolve()
         self._output_path.parent.mkdir(parents=True, exist_ok=True)
-        self._description = description or "Clean the dataset by keeping only active rows with a score."
-        self._prompt_template = load_prompt("dataset_cleaning_csv", "prompt.md")
-        (
-            self._expected_rows,
-            self._expected_average,
-            self._expected_csv,
-        ) = self._compute_expected_outputs()
-        self._expected_answer = {
-            "rows_kept": self._expected_rows,
-            "average_score": self._expected_average,
-        }
-
-    def _compute_expected_outputs(self) -> tuple[int, float, str]:
+        if rules is not None:
+            self.rules = tuple(rules)
+        self._pipeline = compile_rules(self.rules)
+        self._description = description or (
+            "Clean the dataset by keeping only active rows with a score."
+            if self.rules == DEFAULT_RULES
+            else "Clean the dataset by applying the rules below in order."
+        )
+        self._prompt_template = load_prompt_template("dataset_cleaning_csv", "prompt.md")
+        self._answer_cache = answer_cache or default_answer_cache()
+        # A summary computed beforehand, e.g. by ``variants``, saves a read.
+        self._summary = summary or self._compute_expected_outputs()
+        self._expected_answer: dict[str, Any] = {"rows_kept": self._summary.rows_kept}
+        if self._pipeline.average is not None:
+            self._expected_answer["average_score"] = self._summary.average_score
+
+    @classmethod
+    def variants(
+        cls,
+        rule_sets: Sequence[Sequence[str]],
+        *,
+        input_path: str = "tasks/dataset_cleaning_csv/data/raw_customers.csv",
+        output_dir: str | Path,
+        **kwargs: Any,
+    ) -> list[DatasetCleaningCSVTask]:
+        """
+        One task per rule set over the same input. Rule sets missing from
+        the answer cache are all summarised from a single read of it.
+        Variant ``i`` writes to ``output_dir/cleaned_{i}.csv``.
+        """
+        cache = kwargs.get("answer_cache") or default_answer_cache()
+        rule_sets = [tuple(rules) for rules in rule_sets]
+        cached = [
+            cache.get(
+                "dataset_cleaning_csv",
+                dataset=input_path,
+                params=cls._summary_params(rules),
+                version=GRADER_VERSION,
+            )
+            for rules in rule_sets
+        ]
+        missing = [index for index, summary in enumerate(cached) if summary is None]
+        computed = summarize_pipelines(input_path, [compile_rules(rule_sets[index]) for index in missing]) if missing else []
+        for index, summary in zip(missing, computed):
+            cached[index] = asdict(summary)
+            cache.put(
+                "dataset_cleaning_csv",
+                cached[index],
+                dataset=input_path,
+                params=cls._summary_params(rule_sets[index]),
+                version=GRADER_VERSION,
+            )
+        summaries = [CleaningSummary(**summary) for summary in cached]
+        return [
+            cls(
+                input_path=input_path,
+                output_path=str(Path(output_dir) / f"cleaned_{index:04d}.csv"),
+                rules=rules,
+                summary=summary,
+                **kwargs,
+            )
+            for index, (rules, summary) in enumerate(zip(rule_sets, summaries))
+        ]
+
+    @staticmethod
+    def _summary_params(rules: tuple[str, ...]) -> dict[str, Any]:
+        return {"rules": list(rules)}
+
+    def _compute_expected_outputs(self) -> CleaningSummary:
+        # Streamed, so only the summary and digest are kept; the grader
+        # re-reads the kept rows alongside the agent's output.
+        summary = self._answer_cache.get_or_compute(
+            "dataset_cleaning_csv",
+            dataset=self._input_path,
+            params=self._summary_params(self.rules),
+            version=GRADER_VERSION,
+            compute=lambda: asdict(summarize_clean_rows(self._input_path, self._pipeline)),
+        )
+        return CleaningSummary(**summary)
+
+    def session_variables(self) -> dict[str, Any]:
         with self._input_path.open() as f:
             reader = csv.DictReader(f)
-            kept = [
-                row
-                for row in reader
-                if row["status"].strip().lower() == "active" and row["score"].strip()
-            ]
-        scores = [float(row["score"]) for row in kept]
-        average = sum(scores) / len(scores)
-        header = "id,name,status,score"
-        body = [f"{row['id']},{row['name']},{row['status']},{row['score']}" for row in kept]
-        cleaned_csv = "\n".join([header, *body])
-        return len(kept), average, cleaned_csv
+            rows = list(reader)
+        return {"header": list(reader.fieldnames or []), "rows": rows}
 
-    @property
-    def prompt(self) -> str:
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (self._description, self._input_path, self._output_path, self.rules)
+
+    def render_prompt(self) -> str:
         return self._prompt_template.format(
             description=self._description,
             input_path=self._input_path,
             output_path=self._output_path,
+            rules=self._pipeline.describe(),
+            answer_fields=" and ".join(self._expected_answer),
         )
 
     @property
@@ -77,12 +162,35 @@ class DatasetCleaningCSVTask(RLTask):
     def build_tool_handlers(self) -> dict[str, ToolHandler]:
         return build_task_tool_handlers()
 
+    @blocking
     def verify(self, result: Any) -> bool:
+        # Only the output file is read: its row digest is compared with the
+        # (cached) digest of the expected rows, so the raw export is not
+        # cleaned again on every call.
         return verify_result(
             result,
-            expected_rows=self._expected_rows,
-            expected_average=self._expected_average,
+            expected_rows=self._summary.rows_kept,
+            expected_average=self._summary.average_score,
             cleaned_path=self._output_path,
-            expected_csv=self._expected_csv,
+            expected_digest=self._summary.digest,
         )
 
+    @blocking
+    def output_difference(self) -> str | None:
+        """
+        The first row where the output file differs from the expected
+        cleaned CSV, e.g. to see why ``verify`` failed; None when the file
+        matches. Streams the raw export through the rules again.
+        """
+        if not self._output_path.exists():
+            return f"{self._output_path} does not exist."
+        difference = first_difference(self._output_path, iter_clean_rows(self._input_path, self._pipeline))
+        if difference is None:
+            return None
+        number, expected, actual = difference
+        if expected is None:
+            return f"Row {number}: unexpected extra row {actual}."
+        if actual is None:
+            return f"Row {number}: missing; expected {expected}."
+        return f"Row {number}: expected {expected}, got {actual}."
+
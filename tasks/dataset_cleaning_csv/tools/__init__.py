@@ -2,8 +2,8 @@ from __future__ import annotations
 
 from anthropic.types import ToolUnionParam
 
-from main import python_expression_tool, submit_answer_tool
-from utils.file_tools import read_text_file_tool, write_text_file_tool
+from main import sandboxed_python_expression_tool, submit_answer_tool
+from utils.file_tools import PAGED_READ_PROPERTIES, read_text_file_tool, write_text_file_tool
 from ...rl_task_base import ToolHandler
 
 
@@ -11,14 +11,15 @@ def build_tools() -> list[ToolUnionParam]:
     return [
         {
             "name": "read_dataset_file",
-            "description": "Reads the raw CSV dataset from disk",
+            "description": "Reads the raw CSV dataset from disk, whole or one page at a time",
             "input_schema": {
                 "type": "object",
                 "properties": {
                     "path": {
                         "type": "string",
                         "description": "Path to the CSV file that should be read",
-                    }
+                    },
+                    **PAGED_READ_PROPERTIES,
                 },
                 "required": ["path"],
             },
@@ -68,7 +69,7 @@ def build_tools() -> list[ToolUnionParam]:
 def build_tool_handlers() -> dict[str, ToolHandler]:
     return {
         "read_dataset_file": read_text_file_tool,
-        "python_expression": python_expression_tool,
+        "python_expression": sandboxed_python_expression_tool,
         "write_clean_file": write_text_file_tool,
         "submit_answer": submit_answer_tool,
     }
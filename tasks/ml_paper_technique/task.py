@@ -4,7 +4,7 @@ from typing import Any, Iterable
 
 from anthropic.types import ToolUnionParam
 
-from utils.prompt_loader import load_prompt
+from utils.prompt_loader import load_prompt_template
 from ..rl_task_base import RLTask, ToolHandler
 from .tools import build_tools as build_task_tools
 from .tools import build_tool_handlers as build_task_tool_handlers
@@ -34,7 +34,7 @@ class MLPaperTechniqueTask(RLTask):
         self._epsilon = epsilon
         self._technique = technique
         self._description = description or "Implement the RMSNorm technique from the referenced paper."
-        self._prompt_template = load_prompt("ml_paper_technique", "prompt.md")
+        self._prompt_template = load_prompt_template("ml_paper_technique", "prompt.md")
         self._expected_answer = self._compute_expected_answer()
 
     def _compute_expected_answer(self) -> list[float]:
@@ -42,8 +42,16 @@ class MLPaperTechniqueTask(RLTask):
         denom = (mean_square + self._epsilon) ** 0.5
         return [self._gamma * (x / denom) for x in self._vector]
 
-    @property
-    def prompt(self) -> str:
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (
+            self._description,
+            self._technique,
+            self._vector,
+            self._gamma,
+            self._epsilon,
+        )
+
+    def render_prompt(self) -> str:
         return self._prompt_template.format(
             description=self._description,
             technique=self._technique,
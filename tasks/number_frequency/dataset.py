@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import threading
+from array import array
+from collections.abc import Iterable, Iterator, MutableSequence, Sequence
+from pathlib import Path
+from typing import Any, BinaryIO
+
+
+CHUNK_BYTES = 1 << 20
+MAX_CACHED_DATASETS = 8
+
+_NOT_A_LIST = "Dataset file must contain a JSON list of integers."
+_NOT_INTEGERS = "Dataset file must contain only integers."
+_NUMBERS_NOT_INTEGERS = "numbers must contain only integers."
+
+_WHITESPACE = b" \t\r\n"
+
+
+def iter_json_int_chunks(stream: BinaryIO, *, chunk_bytes: int = CHUNK_BYTES) -> Iterator[Sequence[int]]:
+    """
+    Parse a JSON array of integers from a binary stream, yielding the values
+    a chunk at a time so neither the text nor a list of the whole array is
+    ever held in memory. Everything up to a chunk's last comma is decoded by
+    the C JSON parser and type-checked by packing it into an ``array('q')``;
+    only the tail after that comma is carried over to the next read.
+    """
+    buffer = b""
+    opened = False
+    decoded = False
+    while chunk := stream.read(chunk_bytes):
+        buffer += chunk
+        if not opened:
+            buffer = buffer.lstrip(_WHITESPACE)
+            if not buffer:
+                continue
+            if buffer[:1] != b"[":
+                raise ValueError(_NOT_A_LIST)
+            buffer = buffer[1:]
+            opened = True
+        cut = buffer.rfind(b",")
+        if cut == -1:
+            continue
+        body, buffer = buffer[:cut], buffer[cut + 1 :]
+        if not body.strip(_WHITESPACE):
+            # "[,": a comma with no value before it.
+            raise ValueError(_NOT_A_LIST)
+        yield _decode(body)
+        decoded = True
+
+    tail = buffer.rstrip(_WHITESPACE)
+    if not opened or not tail.endswith(b"]"):
+        raise ValueError(_NOT_A_LIST)
+    body = tail[:-1]
+    if not body.strip(_WHITESPACE):
+        if decoded:
+            # "[1, ]": the last comma had nothing after it.
+            raise ValueError(_NOT_A_LIST)
+        return
+    yield _decode(body)
+
+
+def _decode(body: bytes) -> Sequence[int]:
+    try:
+        values = json.loads(b"[" + body + b"]")
+    except ValueError as exc:
+        raise ValueError(_NOT_A_LIST) from exc
+    try:
+        return array("q", values)
+    except TypeError:
+        raise ValueError(_NOT_INTEGERS) from None
+    except OverflowError:
+        if not all(isinstance(value, int) for value in values):
+            raise ValueError(_NOT_INTEGERS) from None
+        return values
+
+
+class NumberDataset:
+    """
+    The integers of one dataset, stored in a typed ``array('q')`` (8 bytes a
+    value instead of a boxed int plus a list slot), with a value -> positions
+    index built on first lookup. Expected answers for any number of targets
+    then cost one dict lookup each instead of a scan of the data. Values
+    outside the 64-bit range fall back to a plain list.
+    """
+
+    def __init__(self, values: MutableSequence[int]) -> None:
+        self.values = values
+        self._positions: dict[int, array[int]] | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_numbers(cls, numbers: Iterable[int]) -> NumberDataset:
+        return cls(_collect([list(numbers)], not_integers=_NUMBERS_NOT_INTEGERS))
+
+    @classmethod
+    def from_file(cls, path: str | Path, *, chunk_bytes: int = CHUNK_BYTES) -> NumberDataset:
+        with open(path, "rb") as f:
+            return cls(_collect(iter_json_int_chunks(f, chunk_bytes=chunk_bytes)))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def index(self) -> dict[int, array[int]]:
+        with self._lock:
+            if self._positions is None:
+                positions: dict[int, array[int]] = {}
+                for position, value in enumerate(self.values):
+                    bucket = positions.get(value)
+                    if bucket is None:
+                        positions[value] = bucket = array("q")
+                    bucket.append(position)
+                self._positions = positions
+            return self._positions
+
+    def positions(self, target: int) -> list[int]:
+        return list(self.index.get(target, ()))
+
+    def count(self, target: int) -> int:
+        return len(self.index.get(target, ()))
+
+    def expected_answer(self, target: int) -> dict[str, Any]:
+        positions = self.positions(target)
+        return {"number": target, "count": len(positions), "positions": positions}
+
+
+def _collect(chunks: Iterable[Sequence[int]], *, not_integers: str = _NOT_INTEGERS) -> MutableSequence[int]:
+    values: MutableSequence[int] = array("q")
+    for chunk in chunks:
+        size = len(values)
+        try:
+            values.extend(chunk)
+        except TypeError:
+            raise ValueError(not_integers) from None
+        except OverflowError:
+            if not all(isinstance(value, int) for value in chunk):
+                raise ValueError(not_integers) from None
+            # array.extend keeps the values it appended before failing.
+            values = list(values[:size])
+            values.extend(chunk)
+    return values
+
+
+_datasets: dict[Path, tuple[tuple[int, int], NumberDataset]] = {}
+_datasets_lock = threading.Lock()
+
+
+def load_number_dataset(path: str | Path) -> NumberDataset:
+    """
+    Parse ``path`` once and share the dataset, and its index, between every
+    task instance over that file. Keyed by resolved path and validated by
+    (mtime, size), so a rewritten file is parsed afresh.
+    """
+    target = Path(path).resolve()
+    stat = target.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _datasets_lock:
+        cached = _datasets.get(target)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    dataset = NumberDataset.from_file(target)
+    with _datasets_lock:
+        if target not in _datasets and len(_datasets) >= MAX_CACHED_DATASETS:
+            del _datasets[next(iter(_datasets))]
+        _datasets[target] = (version, dataset)
+    return dataset
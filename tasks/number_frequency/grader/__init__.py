@@ -5,6 +5,10 @@ from pathlib import Path
 from typing import Any
 
 
+# Bump when expected answers change (see utils.answer_cache).
+GRADER_VERSION = 1
+
+
 def verify(result: Any, expected: dict[str, Any], *, output_path: str | None) -> bool:
     if not isinstance(result, dict):
         return False
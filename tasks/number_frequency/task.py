@@ -1,15 +1,19 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import Any, Iterable, Sequence
 
 from anthropic.types import ToolUnionParam
 
-from utils.prompt_loader import load_prompt
+from utils.answer_cache import AnswerCache, default_answer_cache
+from utils.handlers import blocking
+from utils.history import CompactionPolicy
+from utils.prompt_loader import load_prompt_template
 from ..rl_task_base import RLTask, ToolHandler
+from .dataset import NumberDataset, load_number_dataset
 from .tools import build_tools as build_task_tools
 from .tools import build_tool_handlers as build_task_tool_handlers
+from .grader import GRADER_VERSION
 from .grader import verify as verify_result
 
 
@@ -19,6 +23,9 @@ class NumberFrequencyTask(RLTask):
     count and the 0-based positions where it occurs.
     """
 
+    # read_numbers_file returns the whole dataset file.
+    compaction = CompactionPolicy(superseded_tools=("read_numbers_file",))
+
     def __init__(
         self,
         *,
@@ -29,47 +36,67 @@ class NumberFrequencyTask(RLTask):
         description: str | None = None,
         model: str = "claude-haiku-4-5",
         max_steps: int = 20,
+        python_session: bool = False,
+        answer_cache: AnswerCache | None = None,
     ) -> None:
-        super().__init__(model=model, max_steps=max_steps)
+        super().__init__(model=model, max_steps=max_steps, python_session=python_session)
         if numbers is None and dataset_path is None:
             msg = "Either numbers or dataset_path must be provided."
             raise ValueError(msg)
 
         self._numbers = list(numbers) if numbers is not None else None
-        self._resolved_numbers: list[int] | None = self._numbers
+        self._dataset: NumberDataset | None = None
         self._dataset_path = Path(dataset_path).resolve() if dataset_path else None
         self._output_path = Path(output_path).resolve() if output_path else None
         self._target = target
         self._description = description or (
             "Analyze the dataset and describe how often the target number occurs."
         )
-        self._prompt_template = load_prompt("number_frequency", "prompt.md")
+        self._prompt_template = load_prompt_template("number_frequency", "prompt.md")
+        self._answer_cache = answer_cache or default_answer_cache()
         self._expected_answer = self._build_expected_answer()
 
+    def _load_dataset(self) -> NumberDataset:
+        if self._dataset is None:
+            if self._numbers is not None:
+                self._dataset = NumberDataset.from_numbers(self._numbers)
+            elif self._dataset_path:
+                # Shared with every other task over the same file, so the
+                # file is parsed and indexed once.
+                self._dataset = load_number_dataset(self._dataset_path)
+            else:
+                raise ValueError("No dataset source defined.")
+        return self._dataset
+
     def _load_numbers(self) -> Sequence[int]:
-        if self._resolved_numbers is not None:
-            return self._resolved_numbers
-        if not self._dataset_path:
-            raise ValueError("No dataset source defined.")
-        data = json.loads(self._dataset_path.read_text())
-        if not isinstance(data, list):
-            raise ValueError("Dataset file must contain a JSON list of integers.")
-        if not all(isinstance(item, int) for item in data):
-            raise ValueError("Dataset file must contain only integers.")
-        self._resolved_numbers = list(data)
-        return self._resolved_numbers
+        return self._load_dataset().values
 
     def _build_expected_answer(self) -> dict[str, Any]:
-        numbers = self._load_numbers()
-        positions = [idx for idx, value in enumerate(numbers) if value == self._target]
-        return {
-            "number": self._target,
-            "count": len(positions),
-            "positions": positions,
-        }
+        if self._dataset_path is None:
+            return self._load_dataset().expected_answer(self._target)
+        # On a cache hit the file is not parsed at all; the tools and the
+        # session load it only when an episode asks for it.
+        return self._answer_cache.get_or_compute(
+            "number_frequency",
+            dataset=self._dataset_path,
+            params={"target": self._target},
+            version=GRADER_VERSION,
+            compute=lambda: self._load_dataset().expected_answer(self._target),
+        )
 
-    @property
-    def prompt(self) -> str:
+    def session_variables(self) -> dict[str, Any]:
+        return {"numbers": list(self._load_numbers())}
+
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (
+            self._description,
+            self._target,
+            self._dataset_path,
+            self._output_path,
+            self._numbers,
+        )
+
+    def render_prompt(self) -> str:
         if self._dataset_path:
             dataset_instructions = (
                 f"Read the dataset by calling read_numbers_file with path '{self._dataset_path}'."
@@ -80,7 +107,7 @@ class NumberFrequencyTask(RLTask):
                     "to persist the answer before calling submit_answer."
                 )
         else:
-            dataset_instructions = f"Dataset: {self._resolved_numbers}"
+            dataset_instructions = f"Dataset: {self._numbers}"
 
         return self._prompt_template.format(
             description=self._description,
@@ -105,6 +132,7 @@ class NumberFrequencyTask(RLTask):
             output_path=output_path,
         )
 
+    @blocking
     def verify(self, result: Any) -> bool:
         output_path = str(self._output_path) if self._output_path else None
         return verify_result(result, self._expected_answer, output_path=output_path)
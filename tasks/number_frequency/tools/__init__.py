@@ -2,8 +2,8 @@ from __future__ import annotations
 
 from anthropic.types import ToolUnionParam
 
-from main import python_expression_tool, submit_answer_tool
-from utils.file_tools import read_text_file_tool, write_text_file_tool
+from main import sandboxed_python_expression_tool, submit_answer_tool
+from utils.file_tools import PAGED_READ_PROPERTIES, read_text_file_tool, write_text_file_tool
 from ...rl_task_base import ToolHandler
 
 
@@ -43,14 +43,15 @@ def build_tools(
         tools.append(
             {
                 "name": "read_numbers_file",
-                "description": "Reads a dataset of numbers from disk",
+                "description": "Reads a dataset of numbers from disk, whole or one page at a time",
                 "input_schema": {
                     "type": "object",
                     "properties": {
                         "path": {
                             "type": "string",
                             "description": "Absolute or relative file path to read",
-                        }
+                        },
+                        **PAGED_READ_PROPERTIES,
                     },
                     "required": ["path"],
                 },
@@ -84,7 +85,7 @@ def build_tool_handlers(
     *, dataset_path: str | None, output_path: str | None
 ) -> dict[str, ToolHandler]:
     handlers: dict[str, ToolHandler] = {
-        "python_expression": python_expression_tool,
+        "python_expression": sandboxed_python_expression_tool,
         "submit_answer": submit_answer_tool,
     }
     if dataset_path:
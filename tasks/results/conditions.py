@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import operator
+import re
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from functools import lru_cache
+
+from .matches import MISSING, MatchStore
+
+
+# Named conditions and values usable in any expression.
+NAMED_CONDITIONS: dict[str, str] = {
+    "played": "home_goals >= 0",
+    "home_win": "home_goals > away_goals",
+    "away_win": "away_goals > home_goals",
+    "draw": "home_goals == away_goals",
+}
+NAMED_VALUES: dict[str, str] = {
+    "total_goals": "home_goals + away_goals",
+    "goal_difference": "home_goals - away_goals",
+}
+COLUMNS = (
+    "home",
+    "away",
+    "home_goals",
+    "away_goals",
+    "date",
+    "round",
+    "season",
+    "home_name_length",
+    "away_name_length",
+)
+
+_COMPARISONS: dict[str, Callable[[object, object], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<number>\d+)
+      | (?P<string>'[^']*'|"[^"]*")
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<op>>=|<=|==|!=|[<>&|~()+-])
+    )""",
+    re.VERBOSE,
+)
+
+
+class Condition(ABC):
+    """
+    A compiled match filter. ``mask(store)`` returns a bitmask of the matching
+    matches (bit ``i`` for match ``i``). Conditions combine with ``&``, ``|``
+    and ``~`` as well as inside expressions.
+    """
+
+    @abstractmethod
+    def mask(self, store: MatchStore) -> int:
+        ...
+
+    def __and__(self, other: Condition) -> Condition:
+        return _And(self, other)
+
+    def __or__(self, other: Condition) -> Condition:
+        return _Or(self, other)
+
+    def __invert__(self) -> Condition:
+        return _Not(self)
+
+
+class _And(Condition):
+    def __init__(self, left: Condition, right: Condition) -> None:
+        self.left, self.right = left, right
+
+    def mask(self, store: MatchStore) -> int:
+        left = self.left.mask(store)
+        return left & self.right.mask(store) if left else 0
+
+    def __repr__(self) -> str:
+        return f"({self.left!r} & {self.right!r})"
+
+
+class _Or(Condition):
+    def __init__(self, left: Condition, right: Condition) -> None:
+        self.left, self.right = left, right
+
+    def mask(self, store: MatchStore) -> int:
+        return self.left.mask(store) | self.right.mask(store)
+
+    def __repr__(self) -> str:
+        return f"({self.left!r} | {self.right!r})"
+
+
+class _Not(Condition):
+    def __init__(self, operand: Condition) -> None:
+        self.operand = operand
+
+    def mask(self, store: MatchStore) -> int:
+        return store.all_mask & ~self.operand.mask(store)
+
+    def __repr__(self) -> str:
+        return f"~{self.operand!r}"
+
+
+class _Value(ABC):
+    columns: tuple[str, ...] = ()
+
+    @abstractmethod
+    def value(self, row: dict[str, int], store: MatchStore) -> int | None:
+        ...
+
+
+class _Column(_Value):
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.columns = (name,)
+
+    def value(self, row: dict[str, int], store: MatchStore) -> int | None:
+        return row[self.name]
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+class _Constant(_Value):
+    def __init__(self, constant: int | str) -> None:
+        self.constant = constant
+
+    def value(self, row: dict[str, int], store: MatchStore) -> int | None:
+        # Text constants name a team and compare against its interned ID.
+        if isinstance(self.constant, str):
+            return store.team_id(self.constant)
+        return self.constant
+
+    def __repr__(self) -> str:
+        return repr(self.constant)
+
+
+class _Arithmetic(_Value):
+    def __init__(self, symbol: str, left: _Value, right: _Value) -> None:
+        self.symbol, self.left, self.right = symbol, left, right
+        self.columns = tuple(dict.fromkeys(left.columns + right.columns))
+
+    def value(self, row: dict[str, int], store: MatchStore) -> int | None:
+        left = self.left.value(row, store)
+        right = self.right.value(row, store)
+        if left is None or right is None:
+            return None
+        return left + right if self.symbol == "+" else left - right
+
+    def __repr__(self) -> str:
+        return f"({self.left!r} {self.symbol} {self.right!r})"
+
+
+class _Compare(Condition):
+    def __init__(self, symbol: str, left: _Value, right: _Value) -> None:
+        self.symbol, self.left, self.right = symbol, left, right
+        self.columns = tuple(dict.fromkeys(left.columns + right.columns))
+
+    def mask(self, store: MatchStore) -> int:
+        # Evaluated once per distinct combination of the referenced columns;
+        # one bitmask is built from the positions of the groups that hold.
+        compare = _COMPARISONS[self.symbol]
+        if not self.columns:
+            return store.all_mask if self._holds(compare, {}, store) else 0
+        groups = store.groups(self.columns)
+        return groups.mask(
+            values
+            for values in groups.values
+            if MISSING not in values and self._holds(compare, dict(zip(self.columns, values)), store)
+        )
+
+    def _holds(self, compare: Callable[[object, object], bool], row: dict[str, int], store: MatchStore) -> bool:
+        left = self.left.value(row, store)
+        right = self.right.value(row, store)
+        return left is not None and right is not None and compare(left, right)
+
+    def __repr__(self) -> str:
+        return f"{self.left!r} {self.symbol} {self.right!r}"
+
+
+@lru_cache(maxsize=None)
+def compile_condition(expression: str) -> Condition:
+    """
+    Compile a condition such as
+    ``away_win | (home_win & away_goals >= 1)``.
+
+    Columns are ``home``, ``away`` (compared against quoted team names),
+    ``home_goals``, ``away_goals``, ``date`` (YYYYMMDD), ``round``,
+    ``season`` (its first year) and ``home_name_length``/``away_name_length``
+    (characters in the team's name), plus the values in ``NAMED_VALUES`` and the
+    conditions in ``NAMED_CONDITIONS``. Comparisons bind tighter than ``&``
+    (or ``and``), which binds tighter than ``|`` (or ``or``); ``~``/``not``
+    negates. Comparisons are false for matches without the value, e.g. an
+    unplayed match.
+    """
+    parser = _Parser(expression)
+    condition = parser.condition()
+    parser.expect_end()
+    return condition
+
+
+class _Parser:
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.index = 0
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def take(self, *texts: str) -> str | None:
+        token = self.peek()
+        if token is not None and token[1] in texts:
+            self.index += 1
+            return token[1]
+        return None
+
+    def fail(self, message: str) -> ValueError:
+        return ValueError(f"{message} in condition {self.expression!r}")
+
+    def expect_end(self) -> None:
+        token = self.peek()
+        if token is not None:
+            raise self.fail(f"Unexpected {token[1]!r}")
+
+    def condition(self) -> Condition:
+        condition = self.conjunction()
+        while self.take("|", "or"):
+            condition = _Or(condition, self.conjunction())
+        return condition
+
+    def conjunction(self) -> Condition:
+        condition = self.negation()
+        while self.take("&", "and"):
+            condition = _And(condition, self.negation())
+        return condition
+
+    def negation(self) -> Condition:
+        if self.take("~", "not"):
+            return _Not(self.negation())
+        return self.primary()
+
+    def primary(self) -> Condition:
+        # A comparison may itself start with "(", e.g. "(home_goals + 1) > 2",
+        # so try it first and fall back to a grouped condition or a name.
+        start = self.index
+        try:
+            left = self.value()
+            symbol = self.take(*_COMPARISONS)
+        except ValueError:
+            symbol = None
+        if symbol is not None:
+            return _Compare(symbol, left, self.value())
+        self.index = start
+        if self.take("("):
+            condition = self.condition()
+            if not self.take(")"):
+                raise self.fail("Missing ')'")
+            return condition
+        token = self.peek()
+        if token is not None and token[0] == "name" and token[1] in NAMED_CONDITIONS:
+            self.index += 1
+            return compile_condition(NAMED_CONDITIONS[token[1]])
+        raise self.fail(f"Expected a condition at {token[1]!r}" if token else "Unexpected end")
+
+    def value(self) -> _Value:
+        value = self.term()
+        while symbol := self.take("+", "-"):
+            value = _Arithmetic(symbol, value, self.term())
+        return value
+
+    def term(self) -> _Value:
+        token = self.peek()
+        if token is None:
+            raise self.fail("Unexpected end")
+        kind, text = token
+        self.index += 1
+        if kind == "number":
+            return _Constant(int(text))
+        if kind == "string":
+            return _Constant(text[1:-1])
+        if text == "-":
+            return _Arithmetic("-", _Constant(0), self.term())
+        if text == "(":
+            value = self.value()
+            if not self.take(")"):
+                raise self.fail("Missing ')'")
+            return value
+        if kind == "name" and text in COLUMNS:
+            return _Column(text)
+        if kind == "name" and text in NAMED_VALUES:
+            parser = _Parser(NAMED_VALUES[text])
+            value = parser.value()
+            parser.expect_end()
+            return value
+        raise self.fail(f"Expected a value at {text!r}")
+
+
+def _tokenize(expression: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    end = len(expression.rstrip())
+    while position < end:
+        match = _TOKEN.match(expression, position)
+        if match is None:
+            raise ValueError(f"Cannot parse condition {expression!r} at {expression[position:]!r}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "name" and text in ("and", "or", "not"):
+            kind = "op"
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
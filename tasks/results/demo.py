@@ -2,28 +2,34 @@ from __future__ import annotations
 
 import asyncio
 
+from utils.metrics import BatchMetrics
+from utils.rate_limiter import AdaptiveRateLimiter
+from utils.token_budget import TokenBudgetPlanner
 from .task import TeamAwayLossTask
 
 
 async def run_demo() -> None:
     # Find all matches where any team was away, lost, scored at least 1 goal, and total goals > 2.5
+    # The planner starts episodes as fast as the 10,000 input tokens per
+    # minute budget allows and stops the batch at the spend cap; the limiter
+    # paces the individual requests and backs off on 429s.
     task = TeamAwayLossTask()
-    # Use longer delays to avoid rate limits (10,000 input tokens per minute)
-    # CSV content is large, so we need more time between runs
-    # First run uses most tokens (reads CSV), so longer initial delay
-    results = await task.run_batch(
-        num_runs=5, 
-        verbose=True, 
-        delay_seconds=60.0,
-        initial_delay_seconds=60.0
-    )
+    task.rate_limiter = AdaptiveRateLimiter(input_tokens_per_minute=10_000)
+    task.token_budget = TokenBudgetPlanner(input_tokens_per_minute=10_000, max_cost_usd=1.0)
+    results = await task.run_batch(num_runs=5, verbose=True, concurrency=5)
     successes = sum(1 for result in results if result.success)
 
     print("\nSummary")
     print("-------")
     print(f"Expected answer: {task.expected_answer}")
-    print(f"Pass rate: {successes}/{len(results)} ({(successes/len(results))*100:.1f}%)")
+    print(f"Pass rate: {successes}/{len(results)} ({(successes/max(1, len(results)))*100:.1f}%)")
     print("Episode outcomes:", [res.value for res in results])
+    for result in results:
+        if not result.success:
+            print(f"Run {result.run_id}:", task.grade(result.value).describe())
+    print("Prompt cache:", task.cache_stats.describe())
+    print(BatchMetrics.from_results(results).describe())
+    print("Token budget:", task.token_budget.describe())
 
 
 if __name__ == "__main__":
@@ -1,28 +1,237 @@
 from __future__ import annotations
 
+import re
+import threading
+from dataclasses import dataclass, field
+from operator import itemgetter
 from typing import Any
 
 
-def verify(result: Any, expected: list[dict[str, Any]]) -> bool:
+# Part of the answer-cache key: bump when the expected answer or how it is
+# graded changes, so cached answers are recomputed.
+GRADER_VERSION = 1
+
+# Causes an extra (unmatched) submitted row is grouped by.
+WRONG_ROW = "wrong_row"
+ALTERED_TEAM_NAME = "altered_team_name"
+SWAPPED_HOME_AWAY = "swapped_home_away"
+DUPLICATE_ROW = "duplicate_row"
+MALFORMED_ROW = "malformed_row"
+
+_NOT_NAME = re.compile(r"[\W_]+")
+
+
+@dataclass(slots=True)
+class GradeReport:
+    """
+    How a submission compares to the expected matches. ``extra`` groups the
+    submitted rows that matched nothing by cause; for altered and swapped
+    rows each entry pairs the submitted row with the expected row it most
+    likely stands for (which is then not listed in ``missing``).
+    """
+
+    passed: bool
+    submitted: int
+    expected: int
+    matched: int
+    missing: list[dict[str, Any]] = field(default_factory=list)
+    extra: dict[str, list[Any]] = field(default_factory=dict)
+
+    @property
+    def precision(self) -> float:
+        if not self.submitted:
+            return 1.0 if not self.expected else 0.0
+        return self.matched / self.submitted
+
+    @property
+    def recall(self) -> float:
+        return self.matched / self.expected if self.expected else 1.0
+
+    def describe(self) -> str:
+        text = (
+            f"{'passed' if self.passed else 'failed'}: {self.matched}/{self.expected} expected rows matched, "
+            f"precision {self.precision:.2f}, recall {self.recall:.2f}, {len(self.missing)} missing"
+        )
+        causes = ", ".join(f"{cause} {len(rows)}" for cause, rows in self.extra.items())
+        return f"{text}; extra: {causes}" if causes else text
+
+
+class ExpectedMatches:
+    """
+    The expected answer in hashed canonical form, built once per task, so
+    checking a submission costs one dict lookup per submitted row. A second
+    index with normalised team names attributes near misses to a cause.
+    """
+
+    def __init__(self, expected: list[dict[str, Any]]) -> None:
+        self.rows = expected
+        # Rows are keyed by their values in a fixed field order when every
+        # expected row has the same fields (the usual case), else by their
+        # sorted items.
+        field_sets = {frozenset(match) for match in expected}
+        self._fields = field_sets.pop() if len(field_sets) == 1 else None
+        self._values = itemgetter(*sorted(self._fields)) if self._fields else None
+        self._positions = self._index(expected)
+        self._normalised: dict[Any, list[int]] | None = None
+        self._lock = threading.Lock()
+
+    def _index(self, rows: list[dict[str, Any]]) -> dict[Any, list[int]]:
+        positions: dict[Any, list[int]] = {}
+        for position, match in enumerate(rows):
+            positions.setdefault(self._key(match), []).append(position)
+        return positions
+
+    @property
+    def normalised(self) -> dict[Any, list[int]]:
+        """
+        Positions by canonical row with normalised team names, built on the
+        first submission that needs a diagnosis.
+        """
+        with self._lock:
+            if self._normalised is None:
+                self._normalised = self._index([_normalise(match) for match in self.rows])
+            return self._normalised
+
+    def _key(self, match: Any) -> Any:
+        """
+        Canonical hashable form of a submitted row, or None for a row that
+        is not a dict of hashable values with the expected fields.
+        """
+        if not isinstance(match, dict):
+            return None
+        if self._values is not None:
+            if match.keys() != self._fields:
+                return None
+            key = self._values(match)
+        else:
+            key = tuple(sorted(match.items()))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def matches(self, result: Any) -> bool:
+        """
+        True when ``result`` holds exactly the expected rows, in any order.
+        """
+        if not isinstance(result, list) or len(result) != len(self.rows):
+            return False
+        used: dict[tuple, int] = {}
+        for match in result:
+            key = self._key(match)
+            positions = self._positions.get(key)
+            if positions is None or used.get(key, 0) == len(positions):
+                return False
+            used[key] = used.get(key, 0) + 1
+        return True
+
+    def grade(self, result: Any) -> GradeReport:
+        if not isinstance(result, list):
+            return GradeReport(
+                passed=False,
+                submitted=0,
+                expected=len(self.rows),
+                missing=list(self.rows),
+                matched=0,
+                extra={MALFORMED_ROW: [result]},
+            )
+        claimed: set[int] = set()
+        unmatched: list[Any] = []
+        for match in result:
+            position = _claim(self._positions.get(self._key(match)), claimed)
+            if position is None:
+                unmatched.append(match)
+
+        extra: dict[str, list[Any]] = {}
+        for match in unmatched:
+            cause, counterpart = self._diagnose(match, claimed)
+            entry = match if counterpart is None else {"submitted": match, "expected": self.rows[counterpart]}
+            extra.setdefault(cause, []).append(entry)
+
+        matched = len(result) - len(unmatched)
+        # Expected rows claimed by an altered or swapped submission are not
+        # listed as missing.
+        missing = [match for position, match in enumerate(self.rows) if position not in claimed]
+        return GradeReport(
+            passed=not unmatched and matched == len(self.rows),
+            submitted=len(result),
+            expected=len(self.rows),
+            matched=matched,
+            missing=missing,
+            extra=extra,
+        )
+
+    def _diagnose(self, match: Any, claimed: set[int]) -> tuple[str, int | None]:
+        key = self._key(match)
+        if key is None:
+            return MALFORMED_ROW, None
+        if key in self._positions:
+            return DUPLICATE_ROW, None
+        position = _claim(self.normalised.get(self._key(_normalise(match))), claimed)
+        if position is not None:
+            return ALTERED_TEAM_NAME, position
+        for swapped in _swapped(match):
+            position = _claim(self.normalised.get(self._key(_normalise(swapped))), claimed)
+            if position is not None:
+                return SWAPPED_HOME_AWAY, position
+        return WRONG_ROW, None
+
+
+def verify(result: Any, expected: list[dict[str, Any]] | ExpectedMatches) -> bool:
     """
     Verify that the result matches the expected answer.
-    
+
     The result should be a list of match dictionaries with the same structure
     as the expected answer. Order doesn't matter, but all matches must be present.
+    Pass an ``ExpectedMatches`` built once per task to avoid re-indexing the
+    expected answer on every call.
+    """
+    if not isinstance(expected, ExpectedMatches):
+        expected = ExpectedMatches(expected)
+    return expected.matches(result)
+
+
+def grade(result: Any, expected: list[dict[str, Any]] | ExpectedMatches) -> GradeReport:
+    if not isinstance(expected, ExpectedMatches):
+        expected = ExpectedMatches(expected)
+    return expected.grade(result)
+
+
+def _normalise(match: dict[str, Any]) -> dict[str, Any]:
+    # Team names compared without case, spacing or punctuation.
+    return {
+        **match,
+        **{name: _normalise_name(match[name]) for name in ("home", "away") if isinstance(match.get(name), str)},
+    }
+
+
+def _claim(positions: list[int] | None, claimed: set[int]) -> int | None:
+    for position in positions or ():
+        if position not in claimed:
+            claimed.add(position)
+            return position
+    return None
+
+
+def _normalise_name(name: str) -> str:
+    return _NOT_NAME.sub("", name).casefold()
+
+
+def _swapped(match: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    The row with home and away exchanged, with the score as given and reversed.
     """
-    if not isinstance(result, list):
-        return False
-    
-    if len(result) != len(expected):
-        return False
-    
-    # Convert both to sets of tuples for comparison (order doesn't matter)
-    # Sort by key to ensure consistent comparison
-    def normalize_match(match: dict[str, Any]) -> tuple:
-        return tuple(sorted(match.items()))
-    
-    result_set = {normalize_match(m) for m in result}
-    expected_set = {normalize_match(m) for m in expected}
-    
-    return result_set == expected_set
+    if "home" not in match or "away" not in match:
+        return []
+    swapped = {**match, "home": match["away"], "away": match["home"]}
+    candidates = [swapped]
+    result = match.get("result")
+    if isinstance(result, str) and result.count(":") == 1:
+        home_goals, away_goals = result.split(":")
+        candidates.append({**swapped, "result": f"{away_goals}:{home_goals}"})
+    return candidates
 
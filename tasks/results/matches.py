@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import csv
+import re
+import threading
+from array import array
+from itertools import chain, compress
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+
+# Stored for matches whose value could not be parsed; conditions never match it.
+MISSING = -(2**31)
+
+NUMERIC_COLUMNS = (
+    "home_goals",
+    "away_goals",
+    "date",
+    "round",
+    "season",
+    "home_name_length",
+    "away_name_length",
+)
+MAX_CACHED_STORES = 8
+# Column sets with at most this many distinct values keep a bitmask per value.
+MAX_GROUP_MASKS = 64
+TEAM_COLUMNS = ("home", "away")
+ROW_FIELDS = ("date", "home", "result", "away", "round", "season")
+_CSV_COLUMNS = ("Дата", "Домакин", "Резултат", "Гост", "Кръг", "Сезон")
+
+_DATE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+_INTEGER = re.compile(r"\d+")
+
+
+class _Labels:
+    """
+    Dictionary encoding of a text column: each distinct string is stored once
+    and rows hold its integer ID. With ``parse``, each distinct string is also
+    parsed once into ``parsed``.
+    """
+
+    def __init__(self, parse: Callable[[str], Any] | None = None) -> None:
+        self.labels: list[str] = []
+        self.parsed: list[Any] = []
+        self._ids: dict[str, int] = {}
+        self._parse = parse
+
+    def intern(self, text: str) -> int:
+        label_id = self._ids.get(text)
+        if label_id is None:
+            label_id = self._ids[text] = len(self.labels)
+            self.labels.append(text)
+            if self._parse is not None:
+                self.parsed.append(self._parse(text))
+        return label_id
+
+    def get(self, text: str) -> int | None:
+        return self._ids.get(text)
+
+
+class MatchStore:
+    """
+    Matches held column by column: team names interned to integer IDs, and
+    ``array('i')`` columns for home/away goals, date (YYYYMMDD), round number,
+    season (its first year) and the length of each team's name. The original cell texts are kept
+    dictionary-encoded, each distinct text parsed once, so selected matches
+    can be turned back into rows.
+
+    ``groups(columns)`` groups the matches by the distinct values of some
+    columns. It is built once per column set and holds one entry per match
+    whatever the number of distinct values. A condition is evaluated once per
+    distinct value, and only the selected groups are turned into a bitmask
+    (bit ``i`` set for match ``i``); bitmasks combine with integer
+    ``&``/``|``/``~``, which run in C over every match at once.
+    """
+
+    def __init__(self) -> None:
+        self.teams = _Labels(len)
+        self.columns: dict[str, array[int]] = {
+            name: array("i") for name in (*TEAM_COLUMNS, *NUMERIC_COLUMNS)
+        }
+        self._text = {
+            "date": _Labels(_parse_date),
+            "result": _Labels(_parse_result),
+            "round": _Labels(_first_integer),
+            "season": _Labels(_first_integer),
+        }
+        self._text_ids: dict[str, array[int]] = {name: array("I") for name in self._text}
+        self._groups: dict[tuple[str, ...], _Groups] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, path: str | Path) -> MatchStore:
+        store = cls()
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            # Cell positions of date, home, result, away, round, season.
+            cells = [header.index(name) if name in header else None for name in _CSV_COLUMNS]
+            for row in reader:
+                store.append(*(row[cell].strip() if cell is not None and cell < len(row) else "" for cell in cells))
+        return store
+
+    def append(self, date: str, home: str, result: str, away: str, round: str, season: str) -> None:
+        columns = self.columns
+        home_id = self.teams.intern(home)
+        away_id = self.teams.intern(away)
+        columns["home"].append(home_id)
+        columns["away"].append(away_id)
+        columns["home_name_length"].append(self.teams.parsed[home_id])
+        columns["away_name_length"].append(self.teams.parsed[away_id])
+        home_goals, away_goals = self._intern("result", result)
+        columns["home_goals"].append(home_goals)
+        columns["away_goals"].append(away_goals)
+        columns["date"].append(self._intern("date", date))
+        columns["round"].append(self._intern("round", round))
+        columns["season"].append(self._intern("season", season))
+        if self._groups:
+            with self._lock:
+                self._groups.clear()
+
+    def _intern(self, name: str, text: str) -> Any:
+        labels = self._text[name]
+        label_id = labels.intern(text)
+        self._text_ids[name].append(label_id)
+        return labels.parsed[label_id]
+
+    def __len__(self) -> int:
+        return len(self.columns["home"])
+
+    @property
+    def all_mask(self) -> int:
+        return (1 << len(self)) - 1
+
+    def team_id(self, name: str) -> int | None:
+        return self.teams.get(name)
+
+    def groups(self, columns: Sequence[str]) -> _Groups:
+        key = tuple(columns)
+        with self._lock:
+            cached = self._groups.get(key)
+            if cached is None:
+                cached = self._groups[key] = self._build_groups(key)
+            return cached
+
+    def _build_groups(self, columns: tuple[str, ...]) -> _Groups:
+        for name in columns:
+            if name not in self.columns:
+                raise ValueError(f"Unknown match column {name!r}")
+        groups = _Groups(len(self))
+        for position, values in enumerate(zip(*(self.columns[name] for name in columns))):
+            groups.add(position, values)
+        return groups
+
+    def texts(self) -> Iterator[tuple[str, str, str, str, str, str]]:
+        """
+        (date, home, result, away, round, season) cell texts of every match in
+        file order, without building a dict per match.
+        """
+        def labels(name: str) -> Iterator[str]:
+            return map(self._text[name].labels.__getitem__, self._text_ids[name])
+
+        teams = self.teams.labels.__getitem__
+        return zip(
+            labels("date"),
+            map(teams, self.columns["home"]),
+            labels("result"),
+            map(teams, self.columns["away"]),
+            labels("round"),
+            labels("season"),
+        )
+
+    def selected_texts(self, mask: int | None = None) -> Iterator[tuple[int, tuple[str, ...]]]:
+        """
+        (position, cell texts) of the matches selected by ``mask`` (all by default).
+        """
+        matches = enumerate(self.texts())
+        if mask is None:
+            return matches
+        return compress(matches, map("1".__eq__, format(mask, "b")[::-1]))
+
+    def row(self, position: int) -> dict[str, Any]:
+        names = self.teams.labels
+        return {
+            "date": self._label("date", position),
+            "home": names[self.columns["home"][position]],
+            "result": self._label("result", position),
+            "away": names[self.columns["away"][position]],
+            "round": self._label("round", position),
+            "season": self._label("season", position),
+        }
+
+    def _label(self, name: str, position: int) -> str:
+        return self._text[name].labels[self._text_ids[name][position]]
+
+    def rows(self, mask: int | None = None) -> list[dict[str, Any]]:
+        """
+        Materialise the matches selected by ``mask`` (all by default) in file order.
+        """
+        if mask is None:
+            return [dict(zip(ROW_FIELDS, texts)) for texts in self.texts()]
+        return [self.row(position) for position in mask_positions(mask)]
+
+
+class _Groups:
+    """
+    Matches grouped by their values of some columns, each group's positions
+    held in an ``array('I')``. ``mask`` builds the bitmask of a selection of
+    groups from the positions of the selected groups only. Column sets with
+    at most ``MAX_GROUP_MASKS`` groups (goals, rounds, ...) also keep the
+    bitmask of every group once selected, at most 8 bytes per match, so
+    re-evaluating a condition over them is a few integer ``|``.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.positions: dict[tuple[int, ...], array[int]] = {}
+        self._masks: dict[tuple[int, ...], int] | None = None
+
+    def add(self, position: int, values: tuple[int, ...]) -> None:
+        group = self.positions.get(values)
+        if group is None:
+            group = self.positions[values] = array("I")
+        group.append(position)
+
+    @property
+    def values(self) -> Iterable[tuple[int, ...]]:
+        return self.positions.keys()
+
+    def mask(self, selected: Iterable[tuple[int, ...]]) -> int:
+        """
+        Bitmask of the matches in the ``selected`` groups.
+        """
+        if len(self.positions) > MAX_GROUP_MASKS:
+            return _mask(chain.from_iterable(self.positions[values] for values in selected), self.size)
+        if self._masks is None:
+            self._masks = {}
+        mask = 0
+        for values in selected:
+            group = self._masks.get(values)
+            if group is None:
+                group = self._masks[values] = _mask(self.positions[values], self.size)
+            mask |= group
+        return mask
+
+
+_stores: dict[Path, tuple[tuple[int, int], MatchStore]] = {}
+_stores_lock = threading.Lock()
+
+
+def load_match_store(path: str | Path) -> MatchStore:
+    """
+    Load ``path`` once and share the store, and its group masks, between
+    every task over that file. Keyed by resolved path and validated by
+    (mtime, size), so a rewritten file is loaded afresh.
+    """
+    target = Path(path).resolve()
+    stat = target.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _stores_lock:
+        cached = _stores.get(target)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    store = MatchStore.from_csv(target)
+    with _stores_lock:
+        if target not in _stores and len(_stores) >= MAX_CACHED_STORES:
+            del _stores[next(iter(_stores))]
+        _stores[target] = (version, store)
+    return store
+
+
+def _mask(positions: Iterable[int], size: int) -> int:
+    packed = bytearray((size + 7) // 8)
+    for position in positions:
+        packed[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(packed, "little")
+
+
+def mask_positions(mask: int) -> Iterator[int]:
+    bits = format(mask, "b")[::-1]
+    return (match.start() for match in re.finditer("1", bits))
+
+
+def _parse_result(result: str) -> tuple[int, int]:
+    if ":" not in result:
+        return MISSING, MISSING
+    try:
+        home_goals, away_goals = map(int, result.split(":"))
+    except ValueError:
+        return MISSING, MISSING
+    return home_goals, away_goals
+
+
+def _parse_date(text: str) -> int:
+    match = _DATE.search(text)
+    if match is None:
+        return MISSING
+    day, month, year = map(int, match.groups())
+    return year * 10_000 + month * 100 + day
+
+
+def _first_integer(text: str) -> int:
+    match = _INTEGER.search(text)
+    return int(match.group()) if match else MISSING
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+
+MatchTexts = tuple[str, str, str, str, str, str]
+
+_TEAM_SYMBOLS = ("*", ".", "'", "#", "~")
+_EXTRA_VALUES = ("Назначения", "Доклади", "Е-АФЛ (1).xlsx", "-", "")
+
+
+@dataclass(slots=True, frozen=True)
+class MatchNoise:
+    """
+    Noise injected into the matches shown to the model, as the README suggests
+    for harder variants:
+
+    - ``result_separator_rate``: share of results written ``2-1`` instead of ``2:1``;
+    - ``team_symbol_rate``: share of team names with a stray symbol appended;
+    - ``extra_column``: every line carries an extra, irrelevant column.
+
+    Conditions are still evaluated on the clean data; the expected answer
+    uses the texts as shown, since those are what the model can copy.
+    """
+
+    seed: int = 0
+    result_separator_rate: float = 0.0
+    team_symbol_rate: float = 0.0
+    extra_column: bool = False
+
+    def apply(self, matches: Iterable[tuple[int, MatchTexts]]) -> list[tuple[int, MatchTexts, str | None]]:
+        """
+        Noisy (position, texts, extra column) for each match, drawn from
+        ``seed`` in order, so the same matches always get the same noise.
+        """
+        rng = random.Random(self.seed)
+        noisy = []
+        for position, (date, home, result, away, round_, season) in matches:
+            if rng.random() < self.result_separator_rate:
+                result = result.replace(":", "-")
+            if rng.random() < self.team_symbol_rate:
+                home = home + rng.choice(_TEAM_SYMBOLS)
+            if rng.random() < self.team_symbol_rate:
+                away = away + rng.choice(_TEAM_SYMBOLS)
+            extra = rng.choice(_EXTRA_VALUES) if self.extra_column else None
+            noisy.append((position, (date, home, result, away, round_, season), extra))
+        return noisy
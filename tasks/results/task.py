@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
+from dataclasses import asdict
 from pathlib import Path
 from typing import Any
 
-from anthropic.types import ToolUnionParam
+from anthropic.types import TextBlockParam, ToolUnionParam
 
-from utils.prompt_loader import load_prompt
+from utils.answer_cache import AnswerCache, default_answer_cache
+from utils.prompt_caching import cache_breakpoint
+from utils.prompt_loader import load_prompt_template
+from utils.token_estimation import estimate_tokens, split_by_tokens
 from ..rl_task_base import RLTask, ToolHandler
+from .conditions import compile_condition
+from .matches import ROW_FIELDS, MatchStore, load_match_store, mask_positions
+from .noise import MatchNoise
 from .tools import build_tools as build_task_tools
 from .tools import build_tool_handlers as build_task_tool_handlers
-from .grader import verify as verify_result
+from .grader import GRADER_VERSION, ExpectedMatches, GradeReport
 
 
 class TeamAwayLossTask(RLTask):
@@ -18,15 +26,39 @@ class TeamAwayLossTask(RLTask):
     - Away team won.
     - Home team won and away team scored at least one goal.
     - Home team won and total goals < 3.
+
+    With ``shard_tokens`` each episode of a batch is split into concurrent
+    sub-episodes over shards of the matches, each prompt within that many
+    estimated tokens; their submissions are merged and verified against the
+    whole expected answer.
+
+    The expected answer comes from the answer cache, so a task whose answer
+    is cached parses the CSV only once its prompt is rendered.
     """
 
+    # The whole dataset is inlined in the prompt and identical for every run.
+    cache_prompt = True
+
+    # (prompt text, expression) per condition; a match is expected when any
+    # expression holds. See conditions.compile_condition for the syntax.
+    conditions: tuple[tuple[str, str], ...] = (
+        ("Away team won.", "away_win"),
+        ("Home team won and away team scored at least one goal.", "home_win & away_goals >= 1"),
+        ("Home team won and total goals < 3.", "home_win & total_goals < 3"),
+    )
+
     def __init__(
         self,
         *,
         csv_path: str | Path | None = None,
         description: str | None = None,
+        conditions: Sequence[tuple[str, str]] | None = None,
+        subset: str | None = None,
+        noise: MatchNoise | None = None,
+        shard_tokens: int | None = None,
         model: str = "claude-haiku-4-5",
         max_steps: int = 20,
+        answer_cache: AnswerCache | None = None,
     ) -> None:
         super().__init__(model=model, max_steps=max_steps)
         
@@ -42,62 +74,134 @@ class TeamAwayLossTask(RLTask):
             "Find matches where (a) the away team wins, (b) the home team wins and the away team scored, "
             "or (c) the home team wins and total goals < 3."
         )
-        self._prompt_template = load_prompt("results", "prompt.md")
-        self._rows = self._load_rows()
-        self._expected_answer = self._build_expected_answer()
-
-    def _load_rows(self) -> list[dict[str, Any]]:
-        import csv
-
-        rows: list[dict[str, Any]] = []
-        with open(self._csv_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                result = (row.get("Резултат") or "").strip()
-                rows.append(
-                    {
-                        "date": row.get("Дата", "").strip(),
-                        "home": row.get("Домакин", "").strip(),
-                        "result": result,
-                        "away": row.get("Гост", "").strip(),
-                        "round": row.get("Кръг", "").strip(),
-                        "season": row.get("Сезон", "").strip(),
-                    }
-                )
-        return rows
-
-    def _build_expected_answer(self) -> list[dict[str, Any]]:
-        """Build the expected answer by parsing the CSV."""
-        matches = []
-        for row in self._rows:
-            result = row["result"]
-            if ":" not in result:
-                continue
-            try:
-                home_goals, away_goals = map(int, result.split(":"))
-            except ValueError:
-                continue
-            away_win = away_goals > home_goals
-            home_win = home_goals > away_goals
-            total_goals = home_goals + away_goals
-            home_win_with_away_goal = home_win and away_goals > 0
-            home_win_low_total = home_win and total_goals < 3
-            if away_win or home_win_with_away_goal or home_win_low_total:
-                matches.append(row)
-        return matches
+        if conditions is not None:
+            self.conditions = tuple(conditions)
+        self._subset = subset
+        self._noise = noise
+        self._prompt_template = load_prompt_template("results", "prompt.md")
+        self._answer_cache = answer_cache or default_answer_cache()
+        self._shard_tokens = shard_tokens
+        self._matches: MatchStore | None = None
+        self._shown: list[tuple[int, tuple[str, ...], str | None]] | None = None
+        self._expected_answer, self._expected_positions = self._build_expected_answer()
+        self._expected_matches: ExpectedMatches | None = None
+        self._shards: list[TeamAwayLossShardTask] | None = None
 
     @property
-    def prompt(self) -> str:
-        return self._prompt_template.format(dataset=self._format_dataset())
+    def matches(self) -> MatchStore:
+        # Shared with every other task over the same file.
+        if self._matches is None:
+            self._matches = load_match_store(self._csv_path)
+        return self._matches
+
+    def _subset_mask(self) -> int | None:
+        return compile_condition(self._subset).mask(self.matches) if self._subset else None
+
+    @property
+    def shown(self) -> list[tuple[int, tuple[str, ...], str | None]]:
+        if self._shown is None:
+            self._shown = self._shown_matches()
+        return self._shown
+
+    @property
+    def expected_matches(self) -> ExpectedMatches:
+        if self._expected_matches is None:
+            self._expected_matches = ExpectedMatches(self._expected_answer)
+        return self._expected_matches
+
+    def _shown_matches(self) -> list[tuple[int, tuple[str, ...], str | None]]:
+        """
+        (position, cell texts, extra column) of every match listed in the
+        prompt: those with a result, within ``subset``, with ``noise`` applied.
+        """
+        matches = [
+            (position, texts)
+            for position, texts in self.matches.selected_texts(self._subset_mask())
+            if texts[2]
+        ]
+        if self._noise is not None:
+            return self._noise.apply(matches)
+        return [(position, texts, None) for position, texts in matches]
+
+    def _build_expected_answer(self) -> tuple[list[dict[str, Any]], list[int]]:
+        """
+        The expected rows and their positions in the file, from the answer
+        cache when this file was already graded with the same parameters.
+        """
+        cached = self._answer_cache.get_or_compute(
+            "results",
+            dataset=self._csv_path,
+            params={
+                "conditions": self.conditions,
+                "subset": self._subset,
+                "noise": asdict(self._noise) if self._noise is not None else None,
+            },
+            version=GRADER_VERSION,
+            compute=self._compute_expected_answer,
+        )
+        return cached["answer"], cached["positions"]
+
+    def _compute_expected_answer(self) -> dict[str, list[Any]]:
+        """Select the matches satisfying any of the conditions."""
+        mask = 0
+        for _, expression in self.conditions:
+            mask |= compile_condition(expression).mask(self.matches)
+        subset_mask = self._subset_mask()
+        if subset_mask is not None:
+            mask &= subset_mask
+        positions = list(mask_positions(mask))
+        if self._noise is None:
+            return {"answer": self.matches.rows(mask), "positions": positions}
+        # Report the texts as shown in the prompt.
+        shown = {position: texts for position, texts, _ in self.shown}
+        return {
+            "answer": [dict(zip(ROW_FIELDS, shown[position])) for position in positions],
+            "positions": positions,
+        }
+
+    def _build_shards(self, shard_tokens: int) -> list[TeamAwayLossShardTask]:
+        """
+        Split the shown matches into shards whose prompts stay within
+        ``shard_tokens`` estimated tokens, each with its part of the
+        expected answer.
+        """
+        lines = self._dataset_lines(self.shown)
+        overhead = estimate_tokens(self._render_prompt([]))
+        expected = dict(zip(self._expected_positions, self._expected_answer))
+        shards = []
+        for chunk in split_by_tokens(lines, shard_tokens, overhead=overhead):
+            shown = self.shown[chunk.start : chunk.stop]
+            answer = [expected[position] for position, _, _ in shown if position in expected]
+            shards.append(TeamAwayLossShardTask(self, shown, answer))
+        return shards
+
+    def shard_tasks(self) -> list[RLTask] | None:
+        if self._shard_tokens is None:
+            return None
+        if self._shards is None:
+            self._shards = self._build_shards(self._shard_tokens)
+        return [self.apply_settings(shard) for shard in self._shards]
+
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (self.conditions, self.shown)
+
+    def render_prompt(self) -> str:
+        return self._render_prompt(self.shown)
 
-    def _format_dataset(self) -> str:
+    def _render_prompt(self, shown: list[tuple[int, tuple[str, ...], str | None]]) -> str:
+        conditions = "\n".join(f"{number}. {text}" for number, (text, _) in enumerate(self.conditions, 1))
+        return self._prompt_template.format(conditions=conditions, dataset="\n".join(self._dataset_lines(shown)))
+
+    def build_prompt_content(self) -> list[TextBlockParam]:
+        return [cache_breakpoint({"type": "text", "text": self.prompt})]
+
+    @staticmethod
+    def _dataset_lines(shown: list[tuple[int, tuple[str, ...], str | None]]) -> list[str]:
         lines: list[str] = []
-        for row in self._rows:
-            if row["result"]:
-                lines.append(
-                    f"- {row['date']} | {row['home']} {row['result']} {row['away']} | {row['round']} | {row['season']}"
-                )
-        return "\n".join(lines)
+        for _, (date, home, result, away, round_, season), extra in shown:
+            line = f"- {date} | {home} {result} {away} | {round_} | {season}"
+            lines.append(line if extra is None else f"{line} | {extra}")
+        return lines
 
     @property
     def expected_answer(self) -> Any:
@@ -110,5 +214,56 @@ class TeamAwayLossTask(RLTask):
         return build_task_tool_handlers()
 
     def verify(self, result: Any) -> bool:
-        return verify_result(result, self._expected_answer)
+        return self.expected_matches.matches(result)
+
+    def grade(self, result: Any) -> GradeReport:
+        """
+        Precision, recall, missing rows and extra rows grouped by cause, e.g.
+        to see why an episode failed.
+        """
+        return self.expected_matches.grade(result)
 
+
+class TeamAwayLossShardTask(RLTask):
+    """
+    One shard of a sharded ``TeamAwayLossTask``: the same conditions and
+    instructions over a slice of its matches, expecting the part of the
+    answer within that slice.
+    """
+
+    cache_prompt = True
+
+    def __init__(
+        self,
+        task: TeamAwayLossTask,
+        shown: list[tuple[int, tuple[str, ...], str | None]],
+        expected: list[dict[str, Any]],
+        **settings: Any,
+    ) -> None:
+        super().__init__(**settings)
+        self.task = task
+        self._shown = shown
+        self._expected_answer = expected
+        self._expected_matches = ExpectedMatches(expected)
+
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (self.task.conditions, self._shown)
+
+    def render_prompt(self) -> str:
+        return self.task._render_prompt(self._shown)
+
+    def build_prompt_content(self) -> list[TextBlockParam]:
+        return [cache_breakpoint({"type": "text", "text": self.prompt})]
+
+    @property
+    def expected_answer(self) -> Any:
+        return self._expected_answer
+
+    def build_tools(self) -> list[ToolUnionParam]:
+        return build_task_tools()
+
+    def build_tool_handlers(self) -> dict[str, ToolHandler]:
+        return build_task_tool_handlers()
+
+    def verify(self, result: Any) -> bool:
+        return self._expected_matches.matches(result)
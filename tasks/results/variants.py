@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import json
+import random
+from collections.abc import Iterable, Sequence
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from anthropic.types import TextBlockParam, ToolUnionParam
+
+from utils.prompt_caching import cache_breakpoint
+from ..rl_task_base import RLTask, ToolHandler
+from .grader import ExpectedMatches, GradeReport
+from .matches import MISSING, MatchStore, load_match_store
+from .noise import MatchNoise
+from .task import TeamAwayLossTask
+from .tools import build_tools as build_task_tools
+from .tools import build_tool_handlers as build_task_tool_handlers
+
+
+DEFAULT_CSV_PATH = Path(__file__).parent / "data" / "combined_matches.csv"
+MAX_ATTEMPTS = 20
+
+# (prompt text, expression, range of k or None). "names" draws k from the
+# team-name lengths in the data.
+_ATOMS: tuple[tuple[str, str, tuple[int, int] | str | None], ...] = (
+    ("the away team won", "away_win", None),
+    ("the home team won", "home_win", None),
+    ("the match was a draw", "draw", None),
+    ("the away team scored at least {k} goal(s)", "away_goals >= {k}", (1, 3)),
+    ("the home team scored at most {k} goal(s)", "home_goals <= {k}", (0, 2)),
+    ("total goals < {k}", "total_goals < {k}", (2, 5)),
+    ("total goals >= {k}", "total_goals >= {k}", (3, 7)),
+    ("the winner won by at least {k} goals", "(goal_difference >= {k} | goal_difference <= -{k})", (2, 4)),
+    ("the home team's name is longer than {k} characters", "home_name_length > {k}", "names"),
+    ("the away team's name has at most {k} characters", "away_name_length <= {k}", "names"),
+)
+
+
+@dataclass(slots=True, frozen=True)
+class TaskVariant:
+    """
+    One generated variant of ``TeamAwayLossTask``: how it was built (seed,
+    conditions, subset, noise) and the prompt and expected answer that
+    result, as stored in a manifest line.
+    """
+
+    variant_id: str
+    seed: str
+    csv_path: str
+    conditions: tuple[tuple[str, str], ...]
+    subset: str | None
+    noise: MatchNoise | None
+    prompt: str
+    expected_answer: list[dict[str, Any]]
+
+    def to_json(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["conditions"] = [list(condition) for condition in self.conditions]
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> TaskVariant:
+        return cls(
+            **{
+                **data,
+                "conditions": tuple(tuple(condition) for condition in data["conditions"]),
+                "noise": MatchNoise(**data["noise"]) if data["noise"] else None,
+            }
+        )
+
+
+def generate_variants(
+    count: int,
+    *,
+    seed: int = 0,
+    csv_path: str | Path = DEFAULT_CSV_PATH,
+    max_conditions: int = 4,
+    noise_probability: float = 0.5,
+    subset_probability: float = 0.5,
+) -> list[TaskVariant]:
+    """
+    Build ``count`` seeded variants of the match-results task from one CSV:
+    random condition trees (ANDs of predicates, with nested ORs), season and
+    round subsets, and injected noise. The file is loaded once and every
+    variant is evaluated against the shared ``MatchStore``, whose per-value
+    bitmasks make each variant's expected answer a few integer operations.
+    Variants whose expected answer would be empty are redrawn, up to
+    ``MAX_ATTEMPTS`` times.
+    """
+    csv_path = Path(csv_path).resolve()
+    store = load_match_store(csv_path)
+    name_lengths = sorted({len(name) for name in store.teams.labels if name})
+    seasons = _distinct(store, "season")
+    rounds = _distinct(store, "round")
+
+    variants = []
+    for index in range(count):
+        attempt = 0
+        while True:
+            variant_seed = f"{seed}:{index}:{attempt}"
+            rng = random.Random(variant_seed)
+            noise = _draw_noise(rng, noise_probability)
+            # Stray symbols change the shown names, so name-length
+            # predicates would no longer match what the model reads.
+            use_names = bool(name_lengths) and (noise is None or noise.team_symbol_rate == 0)
+            conditions = tuple(
+                _draw_condition(rng, name_lengths if use_names else None)
+                for _ in range(rng.randint(1, max_conditions))
+            )
+            subset = _draw_subset(rng, seasons, rounds) if rng.random() < subset_probability else None
+            task = TeamAwayLossTask(csv_path=csv_path, conditions=conditions, subset=subset, noise=noise)
+            attempt += 1
+            if task.expected_answer or attempt == MAX_ATTEMPTS:
+                break
+        variants.append(
+            TaskVariant(
+                variant_id=f"results-{seed}-{index:05d}",
+                seed=variant_seed,
+                csv_path=str(csv_path),
+                conditions=conditions,
+                subset=subset,
+                noise=noise,
+                prompt=task.prompt,
+                expected_answer=task.expected_answer,
+            )
+        )
+    return variants
+
+
+def _distinct(store: MatchStore, column: str) -> list[int]:
+    return sorted({value for value in store.columns[column] if value != MISSING})
+
+
+def _draw_noise(rng: random.Random, probability: float) -> MatchNoise | None:
+    if rng.random() >= probability:
+        return None
+    return MatchNoise(
+        seed=rng.randrange(2**32),
+        result_separator_rate=rng.choice((0.0, 0.1, 0.3, 0.5)),
+        team_symbol_rate=rng.choice((0.0, 0.0, 0.1, 0.2)),
+        extra_column=rng.random() < 0.5,
+    )
+
+
+def _draw_atom(rng: random.Random, name_lengths: Sequence[int] | None) -> tuple[str, str]:
+    atoms = _ATOMS if name_lengths else [atom for atom in _ATOMS if atom[2] != "names"]
+    text, expression, k_range = rng.choice(atoms)
+    if k_range is None:
+        return text, expression
+    k = rng.choice(name_lengths) if k_range == "names" else rng.randint(*k_range)
+    return text.format(k=k), expression.format(k=k)
+
+
+def _draw_condition(rng: random.Random, name_lengths: Sequence[int] | None) -> tuple[str, str]:
+    """
+    An AND of one or two predicates, one of which may be a nested OR.
+    """
+    parts: list[tuple[str, str]] = []
+    for _ in range(rng.randint(1, 2)):
+        if rng.random() < 0.3:
+            left = _draw_atom(rng, name_lengths)
+            right = _draw_atom(rng, name_lengths)
+            parts.append((f"({left[0]} or {right[0]})", f"({left[1]} | {right[1]})"))
+        else:
+            parts.append(_draw_atom(rng, name_lengths))
+    parts = list(dict.fromkeys(parts))
+    text = " and ".join(part[0] for part in parts)
+    return f"{text[0].upper()}{text[1:]}.", " & ".join(part[1] for part in parts)
+
+
+def _draw_subset(rng: random.Random, seasons: Sequence[int], rounds: Sequence[int]) -> str | None:
+    clauses = []
+    if len(seasons) > 1:
+        chosen = rng.sample(seasons, rng.randint(1, len(seasons)))
+        clauses.append("(" + " | ".join(f"season == {season}" for season in sorted(chosen)) + ")")
+    if len(rounds) > 1:
+        first, last = sorted(rng.sample(rounds, 2))
+        clauses.append(f"round >= {first} & round <= {last}")
+    return " & ".join(clauses) or None
+
+
+def write_manifest(path: str | Path, variants: Iterable[TaskVariant]) -> None:
+    """
+    One JSON object per line and variant.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for variant in variants:
+            f.write(json.dumps(variant.to_json(), ensure_ascii=False) + "\n")
+
+
+def load_manifest(path: str | Path) -> list[TaskVariant]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [TaskVariant.from_json(json.loads(line)) for line in f if line.strip()]
+
+
+class TeamAwayLossVariantTask(RLTask):
+    """
+    One manifest variant, served from its stored prompt and expected answer
+    without loading the CSV.
+    """
+
+    cache_prompt = True
+
+    def __init__(self, variant: TaskVariant, **settings: Any) -> None:
+        super().__init__(**settings)
+        self.variant = variant
+        self._expected_matches: ExpectedMatches | None = None
+
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (self.variant,)
+
+    def render_prompt(self) -> str:
+        return self.variant.prompt
+
+    def build_prompt_content(self) -> list[TextBlockParam]:
+        return [cache_breakpoint({"type": "text", "text": self.prompt})]
+
+    @property
+    def expected_answer(self) -> Any:
+        return self.variant.expected_answer
+
+    def build_tools(self) -> list[ToolUnionParam]:
+        return build_task_tools()
+
+    def build_tool_handlers(self) -> dict[str, ToolHandler]:
+        return build_task_tool_handlers()
+
+    @property
+    def expected_matches(self) -> ExpectedMatches:
+        if self._expected_matches is None:
+            self._expected_matches = ExpectedMatches(self.variant.expected_answer)
+        return self._expected_matches
+
+    def verify(self, result: Any) -> bool:
+        return self.expected_matches.matches(result)
+
+    def grade(self, result: Any) -> GradeReport:
+        return self.expected_matches.grade(result)
+
+
+class TeamAwayLossManifestTask(RLTask):
+    """
+    Runs a manifest through ``run_batch``: run ``run_id`` uses variant
+    ``(run_id - 1) % len(variants)``, so ``num_runs=len(variants)`` runs each
+    variant once. Settings assigned to this task (rate limiter, client,
+    response cache, token budget, ...) apply to every variant.
+    """
+
+    def __init__(self, variants: Sequence[TaskVariant] | str | Path, **settings: Any) -> None:
+        super().__init__(**settings)
+        if isinstance(variants, (str, Path)):
+            variants = load_manifest(variants)
+        if not variants:
+            raise ValueError("The manifest has no variants.")
+        self.variants = list(variants)
+        self._tasks: dict[int, TeamAwayLossVariantTask] = {}
+
+    def variant_for(self, run_id: int) -> TaskVariant:
+        return self.variants[(run_id - 1) % len(self.variants)]
+
+    def grade(self, run_id: int, result: Any) -> GradeReport:
+        return self.episode_task(run_id).grade(result)
+
+    def episode_task(self, run_id: int) -> TeamAwayLossVariantTask:
+        index = (run_id - 1) % len(self.variants)
+        task = self._tasks.get(index)
+        if task is None:
+            task = self._tasks[index] = TeamAwayLossVariantTask(self.variants[index])
+        return self.apply_settings(task)
+
+    # The task's own prompt, answer and tools are those of the first variant.
+    def render_prompt(self) -> str:
+        return self.episode_task(1).render_prompt()
+
+    @property
+    def expected_answer(self) -> Any:
+        return self.variants[0].expected_answer
+
+    def build_tools(self) -> list[ToolUnionParam]:
+        return build_task_tools()
+
+    def build_tool_handlers(self) -> dict[str, ToolHandler]:
+        return build_task_tool_handlers()
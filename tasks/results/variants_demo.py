@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from .variants import TeamAwayLossManifestTask, generate_variants, write_manifest
+
+
+async def run_demo() -> None:
+    # Generate an evaluation set from combined_matches.csv and run the first
+    # few variants; run_batch serves one variant per run. The manifest goes
+    # to a temporary directory, so the demo leaves nothing behind.
+    with tempfile.TemporaryDirectory(prefix="variants_demo_") as directory:
+        manifest_path = Path(directory) / "variants_manifest.jsonl"
+        started_at = time.perf_counter()
+        variants = generate_variants(1_000, seed=0)
+        write_manifest(manifest_path, variants)
+        print(f"Wrote {len(variants)} variants to {manifest_path} in {time.perf_counter() - started_at:.2f}s")
+        task = TeamAwayLossManifestTask(manifest_path)
+
+    results = await task.run_batch(num_runs=3, verbose=True)
+    successes = sum(1 for result in results if result.success)
+
+    print("\nSummary")
+    print("-------")
+    for result in results:
+        variant = task.variant_for(result.run_id)
+        print(f"{variant.variant_id}: {task.grade(result.run_id, result.value).describe()}")
+    print(f"Pass rate: {successes}/{len(results)} ({(successes/max(1, len(results)))*100:.1f}%)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_demo())
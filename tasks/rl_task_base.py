@@ -1,17 +1,45 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from abc import ABC, abstractmethod
+from contextlib import AsyncExitStack
 from dataclasses import dataclass
 from typing import Any, Callable
 
-from anthropic import RateLimitError
+from anthropic import AsyncAnthropic, RateLimitError
 
-from anthropic.types import ToolUnionParam
+from anthropic.types import TextBlockParam, ToolUnionParam
 
-from main import run_agent_loop
+from main import TOOL_TIMEOUT_SECONDS, run_agent_loop
+from utils.client_pool import AnthropicClientPool, ClientSettings
+from utils.handlers import call_handler
+from utils.history import CompactionPolicy
+from utils.metrics import EpisodeMetrics
+from utils.prompt_caching import CacheStats
+from utils.rate_limiter import AdaptiveRateLimiter
+from utils.response_cache import ResponseCache
+from utils.sandbox import PythonSession
+from utils.token_budget import EpisodeEstimate, TokenBudgetPlanner
+from utils.token_estimation import estimate_tokens
 
 
+# Settings that ``RLTask.apply_settings`` passes on to per-run and shard tasks.
+_RUN_SETTINGS = (
+    "model",
+    "max_steps",
+    "rate_limiter",
+    "client",
+    "python_session",
+    "tool_timeout",
+    "response_cache",
+    "token_budget",
+    "stream",
+    "cache_stats",
+)
+
+# Sync callables, coroutine functions, or sync callables marked with
+# utils.handlers.blocking (run in a worker thread by the agent loop).
 ToolHandler = Callable[..., Any]
 
 
@@ -20,6 +48,22 @@ class EpisodeResult:
     run_id: int
     success: bool
     value: Any
+    metrics: EpisodeMetrics | None = None
+
+
+@dataclass(slots=True, frozen=True)
+class RenderedPrompt:
+    text: str
+    byte_size: int
+    estimated_tokens: int
+
+    @classmethod
+    def from_text(cls, text: str) -> RenderedPrompt:
+        return cls(
+            text=text,
+            byte_size=len(text.encode("utf-8")),
+            estimated_tokens=estimate_tokens(text),
+        )
 
 
 class RLTask(ABC):
@@ -29,22 +73,123 @@ class RLTask(ABC):
     Subclasses define the task-specific prompt, tools, handlers, and verification
     rule while this class provides shared orchestration helpers such as running a
     single episode or a batch of episodes.
+
+    Subclasses implement ``render_prompt`` and list the values it depends on in
+    ``prompt_inputs``; the rendered text is cached and only re-rendered when
+    those inputs change (or after ``invalidate_prompt``).
+
+    Assign ``rate_limiter`` (optionally the same instance on several tasks) to
+    pace every API call of every episode against the account limits. Assign
+    ``client`` to reuse a long-lived client (or a local stand-in) across
+    episodes; otherwise every batch opens its own client pool and closes it
+    when the batch finishes.
+
+    Set ``cache_prompt`` on subclasses with large static prompts to enable
+    prompt-caching breakpoints; ``cache_stats`` accumulates cache hits and
+    misses over every episode of the task.
+
+    With ``python_session`` enabled every episode gets its own persistent
+    ``python_expression`` namespace, pre-seeded from ``session_variables`` and
+    discarded when the episode ends.
+
+    Set ``compaction`` (a ``utils.history.CompactionPolicy``) to keep
+    per-step input tokens flat on long episodes by shrinking older steps.
+
+    With ``stream`` enabled responses are streamed and each tool call starts
+    as soon as its block is complete, overlapping tools with generation.
+
+    Assign ``response_cache`` to record API responses to disk and replay them
+    offline, e.g. to re-check grader or harness changes without API calls.
+
+    Every ``EpisodeResult`` of a batch carries per-step ``EpisodeMetrics``;
+    ``utils.metrics.BatchMetrics.from_results`` rolls them up.
+
+    Assign ``token_budget`` to start episodes only as fast as the per-minute
+    token budgets allow and to end the batch early, with the results of the
+    episodes that ran, once a token or cost cap would be exceeded.
+
+    Override ``episode_task`` to run a different task per ``run_id``, e.g.
+    ``tasks.results.variants.TeamAwayLossManifestTask`` serving one variant
+    of a manifest per run, and ``shard_tasks``/``merge_shard_results`` to
+    run each episode of a batch as concurrent sub-episodes whose results
+    are merged before verification (map-reduce).
     """
 
-    def __init__(self, *, model: str = "claude-haiku-4-5", max_steps: int = 20) -> None:
+    cache_prompt: bool = False
+    compaction: CompactionPolicy | None = None
+
+    def __init__(
+        self,
+        *,
+        model: str = "claude-haiku-4-5",
+        max_steps: int = 20,
+        rate_limiter: AdaptiveRateLimiter | None = None,
+        client: AsyncAnthropic | None = None,
+        python_session: bool = False,
+        tool_timeout: float | None = TOOL_TIMEOUT_SECONDS,
+        response_cache: ResponseCache | None = None,
+        token_budget: TokenBudgetPlanner | None = None,
+        stream: bool = False,
+    ) -> None:
         self.model = model
         self.max_steps = max_steps
+        self.tool_timeout = tool_timeout
+        self.response_cache = response_cache
+        self.token_budget = token_budget
+        self.stream = stream
+        self.rate_limiter = rate_limiter
+        self.client = client
+        self.python_session = python_session
+        self.cache_stats = CacheStats()
+        self._rendered_prompt: RenderedPrompt | None = None
+        self._rendered_prompt_inputs: tuple[Any, ...] | None = None
 
-    @property
     @abstractmethod
-    def prompt(self) -> str:
+    def render_prompt(self) -> str:
         ...
 
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        """
+        Values the rendered prompt depends on. Compared on every access, so
+        return the stored objects rather than copies of large datasets.
+        """
+        return ()
+
+    @property
+    def rendered_prompt(self) -> RenderedPrompt:
+        inputs = self.prompt_inputs()
+        if self._rendered_prompt is None or self._rendered_prompt_inputs != inputs:
+            self._rendered_prompt = RenderedPrompt.from_text(self.render_prompt())
+            self._rendered_prompt_inputs = inputs
+        return self._rendered_prompt
+
+    @property
+    def prompt(self) -> str:
+        return self.rendered_prompt.text
+
+    def invalidate_prompt(self) -> None:
+        """
+        Drop the cached prompt, e.g. after mutating an input in place.
+        """
+        self._rendered_prompt = None
+        self._rendered_prompt_inputs = None
+
     @property
     @abstractmethod
     def expected_answer(self) -> Any:
         ...
 
+    @property
+    def system_prompt(self) -> str | None:
+        return None
+
+    def build_prompt_content(self) -> str | list[TextBlockParam]:
+        """
+        Content of the first user message. Override to split the prompt into
+        text blocks and mark the stable ones with ``cache_breakpoint``.
+        """
+        return self.prompt
+
     @abstractmethod
     def build_tools(self) -> list[ToolUnionParam]:
         ...
@@ -53,18 +198,52 @@ class RLTask(ABC):
     def build_tool_handlers(self) -> dict[str, ToolHandler]:
         ...
 
+    def session_variables(self) -> dict[str, Any]:
+        """
+        Variables pre-defined in the python_expression session of each episode.
+        """
+        return {}
+
     def verify(self, result: Any) -> bool:
+        """
+        Decorate overrides that read files with ``utils.handlers.blocking`` so
+        batches run them off the event loop.
+        """
         return result == self.expected_answer
 
-    async def run_episode(self, *, verbose: bool = False) -> Any | None:
-        return await run_agent_loop(
-            prompt=self.prompt,
-            tools=self.build_tools(),
-            tool_handlers=self.build_tool_handlers(),
-            max_steps=self.max_steps,
-            model=self.model,
-            verbose=verbose,
-        )
+    async def run_episode(
+        self,
+        *,
+        verbose: bool = False,
+        client: AsyncAnthropic | None = None,
+        metrics: EpisodeMetrics | None = None,
+    ) -> Any | None:
+        prompt = self.build_prompt_content()
+        tool_handlers = self.build_tool_handlers()
+        async with AsyncExitStack() as stack:
+            if self.python_session and "python_expression" in tool_handlers:
+                variables = self.session_variables()
+                session = await stack.enter_async_context(PythonSession(variables=variables, timeout=self.tool_timeout))
+                tool_handlers["python_expression"] = session.run
+                prompt = _append_text(prompt, _describe_session(variables))
+            return await run_agent_loop(
+                prompt=prompt,
+                tools=self.build_tools(),
+                tool_handlers=tool_handlers,
+                max_steps=self.max_steps,
+                model=self.model,
+                verbose=verbose,
+                rate_limiter=self.rate_limiter,
+                client=client or self.client,
+                system=self.system_prompt,
+                cache_prompt=self.cache_prompt,
+                cache_stats=self.cache_stats,
+                tool_timeout=self.tool_timeout,
+                response_cache=self.response_cache,
+                metrics=metrics,
+                stream=self.stream,
+                compaction=self.compaction,
+            )
 
     async def run_batch(
         self,
@@ -73,27 +252,82 @@ class RLTask(ABC):
         verbose: bool = False,
         delay_seconds: float = 0.0,
         initial_delay_seconds: float | None = None,
+        concurrency: int = 1,
+        client_pool_size: int = 1,
+        client_settings: ClientSettings | None = None,
     ) -> list[EpisodeResult]:
+        """
+        Run ``num_runs`` episodes and verify each result.
+
+        With ``concurrency=1`` episodes run one after another, sleeping
+        ``initial_delay_seconds`` after the first run and ``delay_seconds``
+        between the following ones. With a higher ``concurrency`` up to that
+        many episodes run at once as asyncio tasks and ``delay_seconds`` only
+        staggers their start times. Results are always returned in ``run_id``
+        order; cancelling the batch cancels every episode still in flight.
+        ``concurrency`` counts conversations, so each shard of a sharded
+        episode (see ``shard_tasks``) takes its own slot.
+
+        With ``token_budget`` set, episodes start only once the planner admits
+        them and the batch ends early (returning fewer results) when its
+        spend cap is reached.
+
+        Unless ``self.client`` is set, episodes share a pool of
+        ``client_pool_size`` clients built from ``client_settings`` that is
+        closed once the batch finishes.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1.")
+        if self.client is not None:
+            # The injected client belongs to the caller, so it is not closed here.
+            return await self._run_batch_with_clients(
+                lambda: self.client,
+                num_runs=num_runs,
+                verbose=verbose,
+                delay_seconds=delay_seconds,
+                initial_delay_seconds=initial_delay_seconds,
+                concurrency=concurrency,
+            )
+        async with AnthropicClientPool(size=client_pool_size, settings=client_settings) as pool:
+            return await self._run_batch_with_clients(
+                pool.acquire,
+                num_runs=num_runs,
+                verbose=verbose,
+                delay_seconds=delay_seconds,
+                initial_delay_seconds=initial_delay_seconds,
+                concurrency=concurrency,
+            )
+
+    async def _run_batch_with_clients(
+        self,
+        next_client: Callable[[], AsyncAnthropic | None],
+        *,
+        num_runs: int,
+        verbose: bool,
+        delay_seconds: float,
+        initial_delay_seconds: float | None,
+        concurrency: int,
+    ) -> list[EpisodeResult]:
+        # Held per conversation, not per episode, so the shards of a sharded
+        # episode count against the limit too.
+        limit = asyncio.Semaphore(concurrency)
+        if concurrency > 1:
+            return await self._run_batch_concurrently(
+                next_client,
+                num_runs=num_runs,
+                verbose=verbose,
+                delay_seconds=delay_seconds,
+                limit=limit,
+            )
+
         results: list[EpisodeResult] = []
         for run_id in range(1, num_runs + 1):
-            try:
-                value = await self.run_episode(verbose=verbose)
-                success = self.verify(value)
-            except RateLimitError as err:
-                if verbose:
-                    print(
-                        "\nRate limit error encountered. Counting run as failure and continuing."
-                    )
-                value = {"error": "rate_limit", "details": str(err)}
-                success = False
-            except Exception as err:  # noqa: BLE001
-                if verbose:
-                    print(
-                        "\nUnexpected error encountered. Counting run as failure and continuing."
-                    )
-                value = {"error": "exception", "details": str(err)}
-                success = False
-            results.append(EpisodeResult(run_id=run_id, success=success, value=value))
+            result = await self._run_budgeted_episode(
+                run_id, verbose=verbose, next_client=next_client, limit=limit
+            )
+            if result is None:
+                break
+            results.append(result)
             # Use initial_delay_seconds for first run, delay_seconds for subsequent runs
             if run_id == 1 and initial_delay_seconds is not None and initial_delay_seconds > 0:
                 if verbose:
@@ -105,3 +339,253 @@ class RLTask(ABC):
                 await asyncio.sleep(delay_seconds)
         return results
 
+    async def _run_batch_concurrently(
+        self,
+        next_client: Callable[[], AsyncAnthropic | None],
+        *,
+        num_runs: int,
+        verbose: bool,
+        delay_seconds: float,
+        limit: asyncio.Semaphore,
+    ) -> list[EpisodeResult]:
+        # The task group cancels and awaits every pending episode if the batch
+        # itself is cancelled, so no episode outlives its batch.
+        async with asyncio.TaskGroup() as group:
+            pending: list[asyncio.Task[EpisodeResult | None]] = []
+            for run_id in range(1, num_runs + 1):
+                if run_id > 1 and delay_seconds > 0:
+                    await asyncio.sleep(delay_seconds)
+                pending.append(
+                    group.create_task(
+                        self._run_budgeted_episode(run_id, verbose=verbose, next_client=next_client, limit=limit)
+                    )
+                )
+        return [result for task in pending if (result := task.result()) is not None]
+
+    def episode_task(self, run_id: int) -> RLTask:
+        """
+        The task whose prompt, tools and verification run ``run_id`` of a
+        batch uses. Override to serve a different task per run, e.g. one
+        variant of a manifest each.
+        """
+        return self
+
+    def shard_tasks(self) -> list[RLTask] | None:
+        """
+        Sub-tasks that together make up one episode, e.g. one per slice of a
+        dataset too large for a single prompt. In a batch each shard runs as
+        its own concurrent sub-episode (admitted separately by
+        ``token_budget``) and ``merge_shard_results`` combines their results
+        into the value that ``verify`` checks. None runs the task as one
+        episode.
+        """
+        return None
+
+    def merge_shard_results(self, results: list[Any]) -> Any:
+        """
+        Combine the shard results, in shard order, into one value for
+        ``verify``. By default list results are concatenated; a shard that
+        returned anything else (e.g. an error) is kept as a single item, so
+        the merged value fails verification instead of losing it.
+        """
+        merged: list[Any] = []
+        for result in results:
+            if isinstance(result, list):
+                merged.extend(result)
+            else:
+                merged.append(result)
+        return merged
+
+    def apply_settings(self, task: RLTask) -> RLTask:
+        """
+        Give ``task`` the run settings of this task (model, client, rate
+        limiter, response cache, token budget, ...), e.g. for the tasks
+        returned by ``episode_task`` or ``shard_tasks``.
+        """
+        for name in _RUN_SETTINGS:
+            setattr(task, name, getattr(self, name))
+        return task
+
+    def estimate_episode(self) -> EpisodeEstimate | None:
+        if self.token_budget is None:
+            return None
+        return self.token_budget.estimate_episode(
+            prompt=self.build_prompt_content(),
+            tools=self.build_tools(),
+            system=self.system_prompt,
+            max_steps=self.max_steps,
+        )
+
+    async def _run_budgeted_episode(
+        self,
+        run_id: int,
+        *,
+        verbose: bool,
+        next_client: Callable[[], AsyncAnthropic | None],
+        limit: asyncio.Semaphore,
+    ) -> EpisodeResult | None:
+        # Failures before the episode starts are counted like failures during
+        # it; raised, they would cancel every other episode of the batch.
+        try:
+            task = self.episode_task(run_id)
+            shards = task.shard_tasks()
+        except Exception as err:  # noqa: BLE001
+            return _failed_episode(run_id, err, verbose=verbose)
+        if shards is None:
+            return await self._run_admitted_episode(
+                task, run_id, verbose=verbose, next_client=next_client, limit=limit
+            )
+        return await self._run_sharded_episode(
+            task, shards, run_id, verbose=verbose, next_client=next_client, limit=limit
+        )
+
+    async def _run_admitted_episode(
+        self,
+        task: RLTask,
+        run_id: int,
+        *,
+        verbose: bool,
+        next_client: Callable[[], AsyncAnthropic | None],
+        limit: asyncio.Semaphore,
+    ) -> EpisodeResult | None:
+        """
+        Run one scored episode of ``task`` once a ``limit`` slot is free and
+        ``token_budget`` admits it; None means the spend cap was reached and
+        the episode was not started.
+        """
+        async with limit:
+            return await self._run_limited_episode(task, run_id, verbose=verbose, next_client=next_client)
+
+    async def _run_limited_episode(
+        self,
+        task: RLTask,
+        run_id: int,
+        *,
+        verbose: bool,
+        next_client: Callable[[], AsyncAnthropic | None],
+    ) -> EpisodeResult | None:
+        budget = self.token_budget
+        try:
+            client = next_client()
+        except Exception as err:  # noqa: BLE001
+            return _failed_episode(run_id, err, verbose=verbose)
+        if budget is None:
+            return await self._run_scored_episode(task, run_id, verbose=verbose, client=client)
+        already_stopped = budget.stopped
+        try:
+            estimate = task.estimate_episode()
+        except Exception as err:  # noqa: BLE001
+            return _failed_episode(run_id, err, verbose=verbose)
+        reservation = await budget.reserve(estimate)
+        if reservation is None:
+            if verbose and not already_stopped:
+                print(f"\nToken budget reached; run {run_id} and later runs were not started.")
+            return None
+        result: EpisodeResult | None = None
+        try:
+            result = await self._run_scored_episode(task, run_id, verbose=verbose, client=client)
+        finally:
+            budget.settle(reservation, result.metrics if result is not None else None)
+        return result
+
+    async def _run_sharded_episode(
+        self,
+        task: RLTask,
+        shards: list[RLTask],
+        run_id: int,
+        *,
+        verbose: bool,
+        next_client: Callable[[], AsyncAnthropic | None],
+        limit: asyncio.Semaphore,
+    ) -> EpisodeResult | None:
+        """
+        Map-reduce: run the shards concurrently (each holding its own
+        ``limit`` slot), merge their results and verify the merged value
+        against the whole task. The episode's metrics hold the steps of every
+        shard and its time is that of the slowest one. None when the spend
+        cap stopped every shard; when it stopped only some, the episode fails
+        but keeps the steps of the shards that ran.
+        """
+        started_at = time.perf_counter()
+        async with asyncio.TaskGroup() as group:
+            pending = [
+                group.create_task(
+                    self._run_admitted_episode(shard, run_id, verbose=verbose, next_client=next_client, limit=limit)
+                )
+                for shard in shards
+            ]
+        results = [result for shard in pending if (result := shard.result()) is not None]
+        if not results:
+            return None
+        metrics = EpisodeMetrics(steps=[step for result in results for step in result.metrics.steps])
+        if len(results) < len(shards):
+            value = {
+                "error": "token_budget",
+                "details": f"{len(shards) - len(results)} of {len(shards)} shards were not started.",
+            }
+            success = False
+        else:
+            try:
+                value = task.merge_shard_results([result.value for result in results])
+                success = await call_handler(task.verify, value)
+            except Exception as err:  # noqa: BLE001
+                if verbose:
+                    print(
+                        "\nUnexpected error encountered. Counting run as failure and continuing."
+                    )
+                value = {"error": "exception", "details": str(err)}
+                success = False
+        metrics.episode_seconds = time.perf_counter() - started_at
+        return EpisodeResult(run_id=run_id, success=success, value=value, metrics=metrics)
+
+    async def _run_scored_episode(
+        self, task: RLTask, run_id: int, *, verbose: bool, client: AsyncAnthropic | None = None
+    ) -> EpisodeResult:
+        metrics = EpisodeMetrics()
+        started_at = time.perf_counter()
+        try:
+            value = await task.run_episode(verbose=verbose, client=client, metrics=metrics)
+            success = await call_handler(task.verify, value)
+        except RateLimitError as err:
+            if verbose:
+                print(
+                    "\nRate limit error encountered. Counting run as failure and continuing."
+                )
+            value = {"error": "rate_limit", "details": str(err)}
+            success = False
+        except Exception as err:  # noqa: BLE001
+            if verbose:
+                print(
+                    "\nUnexpected error encountered. Counting run as failure and continuing."
+                )
+            value = {"error": "exception", "details": str(err)}
+            success = False
+        metrics.episode_seconds = time.perf_counter() - started_at
+        return EpisodeResult(run_id=run_id, success=success, value=value, metrics=metrics)
+
+
+def _failed_episode(run_id: int, err: Exception, *, verbose: bool) -> EpisodeResult:
+    if verbose:
+        print("\nUnexpected error encountered. Counting run as failure and continuing.")
+    return EpisodeResult(
+        run_id=run_id,
+        success=False,
+        value={"error": "exception", "details": str(err)},
+        metrics=EpisodeMetrics(),
+    )
+
+
+def _describe_session(variables: dict[str, Any]) -> str:
+    note = "The python_expression tool keeps its variables between calls during this task."
+    if variables:
+        defined = ", ".join(f"{name} ({type(value).__name__})" for name, value in variables.items())
+        note += f" These variables are already defined: {defined}."
+    return note
+
+
+def _append_text(
+    content: str | list[TextBlockParam], text: str
+) -> str | list[TextBlockParam]:
+    if isinstance(content, str):
+        return f"{content}\n\n{text}"
+    return [*content, {"type": "text", "text": text}]
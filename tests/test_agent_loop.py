@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+from typing import Any
+
+from anthropic import APIStatusError
+from anthropic.types import ToolUnionParam
+
+from main import run_agent_loop
+from utils.handlers import blocking
+from utils.fake_anthropic import ErrorReply, FakeMessagesTransport, Reply, ToolCall, fake_client, submit
+from utils.rate_limiter import AdaptiveRateLimiter
+
+
+def _tool(name: str) -> ToolUnionParam:
+    return {
+        "name": name,
+        "description": name,
+        "input_schema": {"type": "object", "properties": {}, "additionalProperties": True},
+    }
+
+
+TOOLS = [_tool("record"), _tool("submit_answer")]
+WAIT_TOOLS = [_tool("wait"), _tool("submit_answer")]
+
+
+class _Recorder:
+    """
+    A slow side-effecting tool that notes which calls started and finished.
+    """
+
+    def __init__(self, seconds: float = 0.2) -> None:
+        self.seconds = seconds
+        self.started: list[str] = []
+        self.finished: list[str] = []
+
+    async def __call__(self, label: str) -> dict[str, Any]:
+        self.started.append(label)
+        await asyncio.sleep(self.seconds)
+        self.finished.append(label)
+        return {"label": label}
+
+    def handlers(self) -> dict[str, Any]:
+        return {"record": self, "submit_answer": lambda answer: {"answer": answer, "submitted": True}}
+
+
+def _record(label: str) -> Reply:
+    return Reply(tool_calls=[ToolCall(name="record", input={"label": label})])
+
+
+def _waits(*seconds: float) -> Reply:
+    return Reply(
+        tool_calls=[
+            ToolCall(name="wait", input={"label": f"call {index}", "seconds": value})
+            for index, value in enumerate(seconds)
+        ]
+    )
+
+
+class _PayloadRecorder:
+    """
+    Script turn that records the request it answers.
+    """
+
+    def __init__(self, reply: Reply) -> None:
+        self.reply = reply
+        self.payload: dict[str, Any] | None = None
+
+    def __call__(self, payload: dict[str, Any]) -> Reply:
+        self.payload = payload
+        return self.reply
+
+    def tool_results(self) -> list[tuple[str, Any]]:
+        assert self.payload is not None
+        issued = [block["id"] for block in self.payload["messages"][-2]["content"] if block["type"] == "tool_use"]
+        results = self.payload["messages"][-1]["content"]
+        assert [result["tool_use_id"] for result in results] == issued
+        return [(result["tool_use_id"], json.loads(result["content"])) for result in results]
+
+
+def _run_waits(handler: Any, *seconds: float, stream: bool = False) -> tuple[list[Any], float]:
+    """
+    Run one step of ``wait`` calls; return their results in the order the
+    next request carries them, and the wall time of the episode.
+    """
+    final = _PayloadRecorder(submit("done"))
+    transport = FakeMessagesTransport([_waits(*seconds), final])
+    handlers = {"wait": handler, "submit_answer": lambda answer: {"answer": answer, "submitted": True}}
+    started_at = time.perf_counter()
+    answer = asyncio.run(
+        run_agent_loop("Wait.", WAIT_TOOLS, handlers, client=fake_client(transport), verbose=False, stream=stream)
+    )
+    elapsed = time.perf_counter() - started_at
+    assert answer == "done"
+    return [result for _, result in final.tool_results()], elapsed
+
+
+async def _run_then_settle(recorder: _Recorder, **options: Any) -> Any:
+    try:
+        return await run_agent_loop("Record.", TOOLS, recorder.handlers(), verbose=False, stream=True, **options)
+    finally:
+        # Long enough for any orphaned tool call to finish.
+        await asyncio.sleep(recorder.seconds * 2)
+        others = asyncio.all_tasks() - {asyncio.current_task()}
+        assert not others, f"tool calls left running: {others}"
+
+
+class StreamingToolCallTest(unittest.TestCase):
+    def test_failed_stream_attempt_cancels_its_tool_calls(self) -> None:
+        # The first attempt streams a complete tool_use block, which starts
+        # the tool, and then fails mid-stream; the limiter retries it.
+        transport = FakeMessagesTransport(
+            [
+                [ErrorReply(529, partial=_record("first attempt")), _record("retry")],
+                submit("done"),
+            ],
+            block_latency=0.05,
+        )
+        recorder = _Recorder()
+        limiter = AdaptiveRateLimiter(base_backoff_seconds=0.01)
+        answer = asyncio.run(_run_then_settle(recorder, client=fake_client(transport), rate_limiter=limiter))
+        self.assertEqual(answer, "done")
+        self.assertEqual(recorder.started, ["first attempt", "retry"])
+        self.assertEqual(recorder.finished, ["retry"])
+
+    def test_failed_stream_without_limiter_cancels_its_tool_calls(self) -> None:
+        transport = FakeMessagesTransport([[ErrorReply(529, partial=_record("only attempt"))]], block_latency=0.05)
+        recorder = _Recorder()
+        with self.assertRaises(APIStatusError):
+            asyncio.run(_run_then_settle(recorder, client=fake_client(transport, max_retries=0)))
+        self.assertEqual(recorder.started, ["only attempt"])
+        self.assertEqual(recorder.finished, [])
+
+    def test_unsupported_stop_reason_cancels_started_tool_calls(self) -> None:
+        # The first call starts while the second block is still streaming.
+        reply = Reply(
+            tool_calls=[ToolCall(name="record", input={"label": label}) for label in ("first", "second")],
+            stop_reason="refusal",
+        )
+        transport = FakeMessagesTransport([reply], block_latency=0.05)
+        recorder = _Recorder()
+        with self.assertRaises(AssertionError):
+            asyncio.run(_run_then_settle(recorder, client=fake_client(transport)))
+        self.assertEqual(recorder.started[:1], ["first"])
+        self.assertEqual(recorder.finished, [])
+
+
+class ConcurrentToolCallTest(unittest.TestCase):
+    def test_calls_of_one_step_overlap_and_keep_issue_order(self) -> None:
+        async def wait(label: str, seconds: float) -> dict[str, Any]:
+            await asyncio.sleep(seconds)
+            return {"label": label}
+
+        for stream in (False, True):
+            with self.subTest(stream=stream):
+                # The first call finishes last.
+                results, elapsed = _run_waits(wait, 0.3, 0.1, 0.2, stream=stream)
+                self.assertEqual(results, [{"label": "call 0"}, {"label": "call 1"}, {"label": "call 2"}])
+                self.assertLess(elapsed, 0.5)
+
+    def test_timeouts_are_per_call(self) -> None:
+        async def wait(label: str, seconds: float) -> dict[str, Any]:
+            await asyncio.sleep(seconds)
+            return {"label": label}
+
+        final = _PayloadRecorder(submit("done"))
+        transport = FakeMessagesTransport([_waits(1.0, 0.01), final])
+        handlers = {"wait": wait, "submit_answer": lambda answer: {"answer": answer, "submitted": True}}
+        asyncio.run(
+            run_agent_loop("Wait.", WAIT_TOOLS, handlers, client=fake_client(transport), verbose=False, tool_timeout=0.1)
+        )
+        (_, slow), (_, fast) = final.tool_results()
+        self.assertIn("timed out", slow["error"])
+        self.assertEqual(fast, {"label": "call 1"})
+
+
+class BlockingHandlerTest(unittest.TestCase):
+    def test_blocking_handlers_run_in_worker_threads(self) -> None:
+        loop_thread = threading.get_ident()
+
+        @blocking
+        def wait(label: str, seconds: float) -> dict[str, Any]:
+            time.sleep(seconds)
+            return {"label": label, "on_loop_thread": threading.get_ident() == loop_thread}
+
+        results, elapsed = _run_waits(wait, 0.2, 0.2, 0.2)
+        self.assertEqual([result["label"] for result in results], ["call 0", "call 1", "call 2"])
+        self.assertFalse(any(result["on_loop_thread"] for result in results))
+        # Three sleeps in parallel threads, not one after another.
+        self.assertLess(elapsed, 0.5)
+
+    def test_event_loop_keeps_running_during_a_blocking_call(self) -> None:
+        ticks: list[float] = []
+
+        @blocking
+        def wait(label: str, seconds: float) -> dict[str, Any]:
+            time.sleep(seconds)
+            return {"label": label}
+
+        async def run() -> Any:
+            async def tick() -> None:
+                while True:
+                    ticks.append(time.perf_counter())
+                    await asyncio.sleep(0.01)
+
+            ticker = asyncio.create_task(tick())
+            transport = FakeMessagesTransport([_waits(0.3), submit("done")])
+            handlers = {"wait": wait, "submit_answer": lambda answer: {"answer": answer, "submitted": True}}
+            try:
+                return await run_agent_loop("Wait.", WAIT_TOOLS, handlers, client=fake_client(transport), verbose=False)
+            finally:
+                ticker.cancel()
+
+        self.assertEqual(asyncio.run(run()), "done")
+        self.assertGreater(len(ticks), 10)
+        self.assertLess(max(later - earlier for earlier, later in zip(ticks, ticks[1:])), 0.15)
+
+    def test_unmarked_sync_handlers_run_on_the_loop_thread(self) -> None:
+        loop_thread = threading.get_ident()
+
+        def wait(label: str, seconds: float) -> dict[str, Any]:
+            return {"label": label, "on_loop_thread": threading.get_ident() == loop_thread}
+
+        results, _ = _run_waits(wait, 0.0)
+        self.assertTrue(results[0]["on_loop_thread"])
+
+
+if __name__ == "__main__":
+    unittest.main()
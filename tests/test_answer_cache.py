@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from utils.answer_cache import AnswerCache
+
+
+class AnswerCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        root = Path(self.directory.name)
+        self.dataset = root / "data.csv"
+        self.dataset.write_text("a,b\n1,2\n", encoding="utf-8")
+        self.cache_dir = root / "cache"
+        self.calls = 0
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def compute(self, value: object = None):
+        def compute() -> object:
+            self.calls += 1
+            return value
+
+        return compute
+
+    def get(self, cache: AnswerCache, value: object = None, *, params: object = None, version: int = 1) -> object:
+        return cache.get_or_compute(
+            "test", dataset=self.dataset, params=params, version=version, compute=self.compute(value)
+        )
+
+    def test_memory_hit(self) -> None:
+        cache = AnswerCache()
+        self.assertEqual(self.get(cache, {"rows": [1, 2]}), {"rows": [1, 2]})
+        self.assertEqual(self.get(cache, {"rows": [1, 2]}), {"rows": [1, 2]})
+        self.assertEqual((self.calls, cache.hits, cache.misses), (1, 1, 1))
+
+    def test_none_is_cached(self) -> None:
+        cache = AnswerCache(self.cache_dir)
+        self.assertIsNone(self.get(cache))
+        self.assertIsNone(self.get(cache))
+        self.assertIsNone(self.get(AnswerCache(self.cache_dir)))
+        self.assertEqual(self.calls, 1)
+
+    def test_get_default_on_miss(self) -> None:
+        cache = AnswerCache()
+        missing = object()
+        self.assertIs(cache.get("test", dataset=self.dataset, params=None, version=1, default=missing), missing)
+        cache.put("test", None, dataset=self.dataset, params=None, version=1)
+        self.assertIsNone(cache.get("test", dataset=self.dataset, params=None, version=1, default=missing))
+
+    def test_disk_hit_across_instances(self) -> None:
+        self.get(AnswerCache(self.cache_dir), [1, 2, 3])
+        other = AnswerCache(self.cache_dir)
+        self.assertEqual(self.get(other, "unused"), [1, 2, 3])
+        self.assertEqual((self.calls, other.disk_hits), (1, 1))
+
+    def test_rewritten_dataset_is_recomputed(self) -> None:
+        cache = AnswerCache(self.cache_dir)
+        self.get(cache, "old")
+        self.dataset.write_text("a,b\n3,4\n", encoding="utf-8")
+        stat = self.dataset.stat()
+        os.utime(self.dataset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(self.get(cache, "new"), "new")
+        self.assertEqual(self.get(AnswerCache(self.cache_dir), "unused"), "new")
+        self.assertEqual(self.calls, 2)
+
+    def test_params_and_version_change_the_key(self) -> None:
+        cache = AnswerCache()
+        self.get(cache, "a", params={"k": 1})
+        self.assertEqual(self.get(cache, "b", params={"k": 2}), "b")
+        self.assertEqual(self.get(cache, "c", params={"k": 1}, version=2), "c")
+        self.assertEqual(self.get(cache, "unused", params={"k": 1}), "a")
+        self.assertEqual(self.calls, 3)
+
+    def test_values_are_independent_copies(self) -> None:
+        for cache in (AnswerCache(), AnswerCache(self.cache_dir)):
+            with self.subTest(directory=cache.directory):
+                first = self.get(cache, {"answer": [{"team": "A"}]}, params=str(cache.directory))
+                first["answer"][0]["team"] = "changed"
+                first["answer"].append({})
+                second = self.get(cache, "unused", params=str(cache.directory))
+                self.assertEqual(second, {"answer": [{"team": "A"}]})
+                second["answer"].clear()
+                self.assertEqual(self.get(cache, "unused", params=str(cache.directory)), {"answer": [{"team": "A"}]})
+
+
+if __name__ == "__main__":
+    unittest.main()
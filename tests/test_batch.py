@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from typing import Any
+
+import httpx
+from anthropic.types import ToolUnionParam
+
+from tasks.rl_task_base import RLTask, ToolHandler
+from utils.fake_anthropic import FakeMessagesTransport, Reply, ToolCall, fake_client
+from utils.metrics import BatchMetrics
+
+
+def _submit_prompt(payload: dict[str, Any]) -> Reply:
+    # Each conversation submits its own prompt text as a one-item list.
+    prompt = payload["messages"][0]["content"]
+    text = prompt if isinstance(prompt, str) else prompt[0]["text"]
+    return Reply(tool_calls=[ToolCall(name="submit_answer", input={"answer": [text]})])
+
+
+class _CountingTransport(FakeMessagesTransport):
+    def __init__(self) -> None:
+        super().__init__([_submit_prompt], latency=0.02)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+
+class _PromptTask(RLTask):
+    def __init__(self, prompt: str, **settings: Any) -> None:
+        super().__init__(**settings)
+        self._prompt = prompt
+
+    def render_prompt(self) -> str:
+        return self._prompt
+
+    @property
+    def expected_answer(self) -> Any:
+        return [self._prompt]
+
+    def build_tools(self) -> list[ToolUnionParam]:
+        return [
+            {
+                "name": "submit_answer",
+                "description": "Submit the final answer",
+                "input_schema": {"type": "object", "properties": {"answer": {}}, "required": ["answer"]},
+            }
+        ]
+
+    def build_tool_handlers(self) -> dict[str, ToolHandler]:
+        return {"submit_answer": lambda answer: {"answer": answer, "submitted": True}}
+
+    def verify(self, result: Any) -> bool:
+        return result == self.expected_answer
+
+
+class _ShardedTask(_PromptTask):
+    def __init__(self, shards: int, **settings: Any) -> None:
+        super().__init__("whole", **settings)
+        self.shards = shards
+
+    @property
+    def expected_answer(self) -> Any:
+        return [f"shard {index}" for index in range(self.shards)]
+
+    def shard_tasks(self) -> list[RLTask] | None:
+        return [self.apply_settings(_PromptTask(f"shard {index}")) for index in range(self.shards)]
+
+
+class _StubBudget:
+    """
+    Admits the first ``admitted`` episodes and refuses the rest.
+    """
+
+    def __init__(self, admitted: int) -> None:
+        self.admitted = admitted
+        self.stopped = False
+        self.settled = 0
+
+    def estimate_episode(self, **_: Any) -> None:
+        return None
+
+    async def reserve(self, estimate: Any) -> object | None:
+        if self.admitted == 0:
+            self.stopped = True
+            return None
+        self.admitted -= 1
+        return object()
+
+    def settle(self, reservation: Any, metrics: Any) -> None:
+        self.settled += 1
+
+
+class ShardedBatchTest(unittest.TestCase):
+    def test_shards_are_merged_and_verified(self) -> None:
+        task = _ShardedTask(3, client=fake_client(FakeMessagesTransport([_submit_prompt])))
+        results = asyncio.run(task.run_batch(num_runs=2, concurrency=2))
+        self.assertEqual([result.success for result in results], [True, True])
+        self.assertEqual(results[0].value, ["shard 0", "shard 1", "shard 2"])
+        self.assertEqual(len(results[0].metrics.steps), 3)
+
+    def test_concurrency_counts_every_shard(self) -> None:
+        transport = _CountingTransport()
+        task = _ShardedTask(4, client=fake_client(transport))
+        results = asyncio.run(task.run_batch(num_runs=3, concurrency=2))
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(transport.max_in_flight, 2)
+
+    def test_budget_refusing_some_shards_keeps_their_metrics(self) -> None:
+        budget = _StubBudget(admitted=2)
+        task = _ShardedTask(3, client=fake_client(FakeMessagesTransport([_submit_prompt])))
+        task.token_budget = budget
+        results = asyncio.run(task.run_batch(num_runs=2))
+        self.assertEqual(len(results), 1)
+        self.assertFalse(results[0].success)
+        self.assertEqual(results[0].value["error"], "token_budget")
+        self.assertEqual(len(results[0].metrics.steps), 2)
+        self.assertEqual(budget.settled, 2)
+        self.assertEqual(BatchMetrics.from_results(results).episodes, 1)
+
+    def test_default_merge_concatenates_lists(self) -> None:
+        task = _PromptTask("whole")
+        merged = task.merge_shard_results([["a"], {"error": "timeout"}, ["b", "c"]])
+        self.assertEqual(merged, ["a", {"error": "timeout"}, "b", "c"])
+
+
+class _FailingRunTask(_PromptTask):
+    def __init__(self, failing_run: int, **settings: Any) -> None:
+        super().__init__("whole", **settings)
+        self.failing_run = failing_run
+
+    def episode_task(self, run_id: int) -> RLTask:
+        if run_id == self.failing_run:
+            raise FileNotFoundError("variant file is missing")
+        return self
+
+
+class _BadEstimateTask(_PromptTask):
+    def estimate_episode(self) -> Any:
+        raise ValueError("cannot estimate")
+
+
+class FailingEpisodeTest(unittest.TestCase):
+    def test_episode_task_error_fails_only_its_run(self) -> None:
+        task = _FailingRunTask(2, client=fake_client(FakeMessagesTransport([_submit_prompt])))
+        results = asyncio.run(task.run_batch(num_runs=3, concurrency=3))
+        self.assertEqual([result.run_id for result in results], [1, 2, 3])
+        self.assertEqual([result.success for result in results], [True, False, True])
+        self.assertEqual(results[1].value, {"error": "exception", "details": "variant file is missing"})
+
+    def test_estimate_error_fails_only_its_run(self) -> None:
+        task = _BadEstimateTask("whole", client=fake_client(FakeMessagesTransport([_submit_prompt])))
+        task.token_budget = _StubBudget(admitted=10)
+        results = asyncio.run(task.run_batch(num_runs=2, concurrency=2))
+        self.assertEqual([result.success for result in results], [False, False])
+        self.assertEqual(task.token_budget.settled, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
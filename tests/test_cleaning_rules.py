@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import unittest
+
+from tasks.dataset_cleaning_csv.rules import DEFAULT_RULES, CleaningPipeline, compile_rules
+
+
+HEADER = ["id", "name", "status", "score", "home city"]
+ROWS = [
+    ["1", "Ann", "active", "9.5", "Sofia"],
+    ["2", "Bob", "Inactive", "7", "Varna"],
+    ["3", "Cy", " ACTIVE ", "", "Sofia"],
+    ["4", "Di", "pending", "n/a", "Ruse"],
+    ["5", "Ann", "active", "6.5", "Plovdiv"],
+]
+
+
+def _clean(rules: tuple[str, ...], rows: list[list[str]] = ROWS) -> tuple[list[list[str]], CleaningPipeline]:
+    pipeline = compile_rules(rules)
+    run = pipeline.start(HEADER)
+    kept = [cleaned for row in rows if (cleaned := run.feed(row)) is not None]
+    return [run.output_header, *kept], pipeline
+
+
+class CompileRulesTest(unittest.TestCase):
+    def test_default_rules_keep_the_original_wording(self) -> None:
+        self.assertEqual(
+            compile_rules(DEFAULT_RULES).describe(),
+            '1. Keep only rows with status == "active".\n'
+            "2. Drop rows where score is empty.\n"
+            "3. Preserve the header and the original column order.",
+        )
+
+    def test_default_rules(self) -> None:
+        rows, _ = _clean(DEFAULT_RULES)
+        self.assertEqual(
+            rows,
+            [["id", "name", "status", "score"], ["1", "Ann", "active", "9.5"], ["5", "Ann", "active", "6.5"]],
+        )
+        run = compile_rules(DEFAULT_RULES).start(HEADER)
+        for row in ROWS:
+            run.feed(row)
+        summary = run.summary()
+        self.assertEqual((summary.rows_kept, summary.average_score), (2, 8.0))
+
+    def test_text_comparison_ignores_case_and_spaces(self) -> None:
+        rows, _ = _clean(('keep status == "active"', "select id"))
+        self.assertEqual(rows, [["id"], ["1"], ["3"], ["5"]])
+        rows, _ = _clean(('drop status != "ACTIVE"', "select id"))
+        self.assertEqual(rows, [["id"], ["1"], ["3"], ["5"]])
+
+    def test_numeric_comparison_is_false_for_non_numbers(self) -> None:
+        rows, _ = _clean(("keep score >= 7", "select id"))
+        self.assertEqual(rows, [["id"], ["1"], ["2"]])
+        rows, _ = _clean(("drop score < 7", "select id"))
+        self.assertEqual(rows, [["id"], ["1"], ["2"], ["3"], ["4"]])
+
+    def test_membership_and_emptiness(self) -> None:
+        rows, _ = _clean(('keep "home city" in ("sofia", "Ruse")', "select id"))
+        self.assertEqual(rows, [["id"], ["1"], ["3"], ["4"]])
+        rows, _ = _clean(("keep score is not empty", "select id"))
+        self.assertEqual(rows, [["id"], ["1"], ["2"], ["4"], ["5"]])
+
+    def test_coerce_rewrites_values_and_drops_failures(self) -> None:
+        rows, _ = _clean(("coerce score float", "coerce status lower", "select id, status, score"))
+        self.assertEqual(
+            rows,
+            [["id", "status", "score"], ["1", "active", "9.5"], ["2", "inactive", "7.0"], ["5", "active", "6.5"]],
+        )
+        # Coercion copies the row, so the input rows are left untouched.
+        self.assertEqual(ROWS[1][3], "7")
+
+    def test_dedupe_keeps_the_first_row_per_key(self) -> None:
+        rows, _ = _clean(("dedupe name", "select id, name"))
+        self.assertEqual(rows, [["id", "name"], ["1", "Ann"], ["2", "Bob"], ["3", "Cy"], ["4", "Di"]])
+        rows, _ = _clean(('dedupe name, "home city"', "select id"))
+        self.assertEqual(len(rows), 6)
+
+    def test_select_and_average(self) -> None:
+        pipeline = compile_rules(('select name, "home city"', "average score"))
+        self.assertEqual(pipeline.select, ("name", "home city"))
+        self.assertEqual(pipeline.average, "score")
+        self.assertIn("Report average_score, the mean score of the kept rows.", pipeline.describe())
+
+    def test_average_of_a_non_number_raises(self) -> None:
+        with self.assertRaisesRegex(ValueError, "Cannot average score"):
+            _clean(("average score",))
+
+    def test_invalid_rules(self) -> None:
+        for rules in (
+            ("keep status ~ active",),
+            ("select id", "select name"),
+            ("average score", "average id"),
+            ('keep status > "a"',),
+            ("frobnicate id",),
+        ):
+            with self.subTest(rules=rules), self.assertRaises(ValueError):
+                CleaningPipeline(rules)
+
+    def test_unknown_column(self) -> None:
+        with self.assertRaisesRegex(ValueError, "no 'rating' column"):
+            compile_rules(("keep rating > 1",)).start(HEADER)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from typing import Any
+from unittest import mock
+
+from tests.test_batch import _PromptTask, _submit_prompt
+from utils.client_pool import AnthropicClientPool, ClientSettings, create_client
+from utils.fake_anthropic import FakeMessagesTransport, fake_client
+
+
+class _FakeClientFactory:
+    def __init__(self) -> None:
+        self.transport = FakeMessagesTransport([_submit_prompt])
+        self.clients: list[Any] = []
+
+    def __call__(self) -> Any:
+        client = fake_client(self.transport)
+        self.clients.append(client)
+        return client
+
+
+class AnthropicClientPoolTest(unittest.TestCase):
+    def test_clients_are_created_lazily_and_rotated(self) -> None:
+        factory = _FakeClientFactory()
+        pool = AnthropicClientPool(size=2, client_factory=factory)
+        self.assertEqual(factory.clients, [])
+        acquired = [pool.acquire() for _ in range(5)]
+        self.assertEqual(len(factory.clients), 2)
+        first, second = factory.clients
+        self.assertEqual(acquired, [first, second, first, second, first])
+        asyncio.run(pool.aclose())
+
+    def test_closing_closes_every_client_and_starts_afresh(self) -> None:
+        factory = _FakeClientFactory()
+
+        async def run() -> None:
+            async with AnthropicClientPool(size=3, client_factory=factory) as pool:
+                pool.acquire()
+            self.assertTrue(all(client.is_closed() for client in factory.clients))
+            # A closed pool builds new clients on the next acquire.
+            pool.acquire()
+            self.assertEqual(len(factory.clients), 6)
+            await pool.aclose()
+
+        asyncio.run(run())
+
+    def test_size_must_be_positive(self) -> None:
+        with self.assertRaises(ValueError):
+            AnthropicClientPool(size=0)
+
+    def test_settings_size_the_connection_pool(self) -> None:
+        settings = ClientSettings(max_connections=7, timeout=12.0, connect_timeout=3.0, max_retries=4)
+        client = create_client(settings)
+        try:
+            self.assertEqual(client.max_retries, 4)
+            self.assertEqual(client.timeout.read, 12.0)
+            self.assertEqual(client.timeout.connect, 3.0)
+        finally:
+            asyncio.run(client.close())
+
+
+class BatchClientTest(unittest.TestCase):
+    def test_batch_shares_pooled_clients_and_closes_them(self) -> None:
+        factory = _FakeClientFactory()
+
+        def pool(**options: Any) -> AnthropicClientPool:
+            return AnthropicClientPool(**options, client_factory=factory)
+
+        task = _PromptTask("pooled")
+        with mock.patch("tasks.rl_task_base.AnthropicClientPool", pool):
+            results = asyncio.run(task.run_batch(num_runs=6, concurrency=3, client_pool_size=2))
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(len(factory.clients), 2)
+        self.assertEqual(factory.transport.request_count, 6)
+        self.assertTrue(all(client.is_closed() for client in factory.clients))
+
+    def test_injected_client_is_left_open(self) -> None:
+        transport = FakeMessagesTransport([_submit_prompt])
+        client = fake_client(transport)
+        task = _PromptTask("injected", client=client)
+
+        async def run() -> list[Any]:
+            first = await task.run_batch(num_runs=2)
+            second = await task.run_batch(num_runs=2)
+            return first + second
+
+        results = asyncio.run(run())
+        self.assertTrue(all(result.success for result in results))
+        self.assertFalse(client.is_closed())
+        self.assertEqual(transport.request_count, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import re
+import unittest
+
+from tasks.results.conditions import compile_condition
+from tasks.results.matches import MAX_GROUP_MASKS, MatchStore, mask_positions
+
+
+MATCHES = [
+    # date, home, result, away, round, season
+    ("14.09.2025 в 14:00", "Sparta", "2:4", "Urvich", "Кръг 1", "2025/2026"),
+    ("14.09.2025 в 16:00", "Lozen", "1:0", "Orlovets 2015", "Кръг 1", "2025/2026"),
+    ("21.09.2025", "Urvich", "1:1", "Lozen", "Кръг 2", "2025/2026"),
+    ("28.09.2025", "Orlovets 2015", "", "Sparta", "Кръг 3", "2025/2026"),
+    ("05.10.2024", "Sparta", "3:0", "Lozen", "Кръг 1", "2024/2025"),
+]
+
+
+class ConditionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.store = MatchStore()
+        for row in MATCHES:
+            cls.store.append(*row)
+
+    def select(self, expression: str) -> list[int]:
+        return list(mask_positions(compile_condition(expression).mask(self.store)))
+
+    def test_named_conditions(self) -> None:
+        self.assertEqual(self.select("away_win"), [0])
+        self.assertEqual(self.select("home_win"), [1, 4])
+        self.assertEqual(self.select("draw"), [2])
+        self.assertEqual(self.select("played"), [0, 1, 2, 4])
+
+    def test_comparisons_skip_missing_values(self) -> None:
+        # The unplayed match has no score, so neither a comparison nor its
+        # opposite selects it; only a negation does.
+        self.assertEqual(self.select("home_goals >= 0"), [0, 1, 2, 4])
+        self.assertEqual(self.select("home_goals < 0"), [])
+        self.assertEqual(self.select("~played"), [3])
+
+    def test_team_names_and_columns(self) -> None:
+        self.assertEqual(self.select("home == 'Sparta'"), [0, 4])
+        self.assertEqual(self.select('away != "Lozen" and played'), [0, 1])
+        self.assertEqual(self.select("home == 'Nobody'"), [])
+        self.assertEqual(self.select("date >= 20250921"), [2, 3])
+        self.assertEqual(self.select("round == 1 & season == 2025"), [0, 1])
+        self.assertEqual(self.select("away_name_length > 6"), [1])
+
+    def test_arithmetic_and_named_values(self) -> None:
+        self.assertEqual(self.select("total_goals >= 3"), [0, 4])
+        self.assertEqual(self.select("goal_difference == -2"), [0])
+        self.assertEqual(self.select("(home_goals + 1) > away_goals + 2"), [4])
+        self.assertEqual(self.select("-home_goals < -2"), [4])
+
+    def test_precedence(self) -> None:
+        # & binds tighter than |, ~ tighter than &.
+        self.assertEqual(self.select("away_win | home_win & season == 2024"), [0, 4])
+        self.assertEqual(self.select("(away_win | home_win) & season == 2024"), [4])
+        self.assertEqual(self.select("not home_win and played"), [0, 2])
+        self.assertEqual(self.select("~(home_win | draw) & played"), [0])
+
+    def test_operators_combine_compiled_conditions(self) -> None:
+        away_win = compile_condition("away_win")
+        draw = compile_condition("draw")
+        mask = (away_win | draw) & ~compile_condition("home == 'Urvich'")
+        self.assertEqual(list(mask_positions(mask.mask(self.store))), [0])
+
+    def test_constant_comparison(self) -> None:
+        self.assertEqual(self.select("1 < 2"), [0, 1, 2, 3, 4])
+        self.assertEqual(self.select("1 > 2"), [])
+
+    def test_compiled_conditions_are_cached(self) -> None:
+        self.assertIs(compile_condition("draw | away_win"), compile_condition("draw | away_win"))
+
+    def test_invalid_expressions(self) -> None:
+        for expression, message in [
+            ("home_goals >", "Unexpected end"),
+            ("(away_win", "Missing ')'"),
+            ("away_win draw", "Unexpected 'draw'"),
+            ("unknown_column > 1", "Expected a condition at 'unknown_column'"),
+            ("home_goals > unknown", "Expected a value at 'unknown'"),
+            ("home_goals > 1 ;", "Cannot parse condition"),
+            ("", "Unexpected end"),
+        ]:
+            with self.subTest(expression=expression):
+                with self.assertRaisesRegex(ValueError, re.escape(message)):
+                    compile_condition(expression)
+
+
+class HighCardinalityTest(unittest.TestCase):
+    def test_distinct_values_do_not_get_a_mask_each(self) -> None:
+        store = MatchStore()
+        count = MAX_GROUP_MASKS * 4
+        for index in range(count):
+            day = 1 + index % 28
+            month = 1 + index // 28 % 12
+            store.append(f"{day:02d}.{month:02d}.{2000 + index // 336}", "A", f"{index % 3}:1", "B", "1", "2000")
+        dates = store.columns["date"]
+        expected = [position for position in range(count) if dates[position] >= 20000415 and position % 3 == 0]
+        condition = compile_condition("date >= 20000415 & away_win")
+        for _ in range(2):
+            self.assertEqual(list(mask_positions(condition.mask(store))), expected)
+        # Dates are selected from their positions; the few result groups
+        # keep a bitmask each.
+        self.assertIsNone(store.groups(("date",))._masks)
+        self.assertEqual(len(store.groups(("away_goals", "home_goals"))._masks), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import csv
+import tempfile
+import unittest
+from pathlib import Path
+
+from tasks.dataset_cleaning_csv.grader import csv_digest, first_difference, same_csv_rows, verify
+from tasks.dataset_cleaning_csv.task import DatasetCleaningCSVTask
+from utils.answer_cache import AnswerCache
+
+
+RAW_CSV = """id,name,status,score
+1,Ann,active,9.5
+2,Bob,inactive,7
+3,"Cy, Jr.",Active,
+4,Di, active ,8.5
+"""
+
+
+class DatasetCleaningCSVTaskTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        root = Path(self.directory.name)
+        self.input_path = root / "raw.csv"
+        self.input_path.write_text(RAW_CSV, encoding="utf-8")
+        self.output_path = root / "cleaned.csv"
+        self.task = DatasetCleaningCSVTask(
+            input_path=str(self.input_path),
+            output_path=str(self.output_path),
+            answer_cache=AnswerCache(),
+        )
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write_output(self, rows: list[list[str]], **writer_options: str) -> None:
+        with open(self.output_path, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f, **writer_options).writerows(rows)
+
+    def test_expected_answer(self) -> None:
+        self.assertEqual(self.task.expected_answer, {"rows_kept": 2, "average_score": 9.0})
+
+    def test_verify_accepts_any_quoting_and_line_endings(self) -> None:
+        rows = [["id", "name", "status", "score"], ["1", "Ann", "active", "9.5"], ["4", "Di", " active ", "8.5"]]
+        self.write_output(rows, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        self.assertTrue(self.task.verify({"rows_kept": 2, "average_score": 9.0}))
+        self.assertIsNone(self.task.output_difference())
+
+    def test_verify_rejects_a_wrong_row_and_reports_it(self) -> None:
+        self.write_output([["id", "name", "status", "score"], ["1", "Ann", "active", "9.5"], ["4", "Di", "active", "8.5"]])
+        self.assertFalse(self.task.verify({"rows_kept": 2, "average_score": 9.0}))
+        self.assertEqual(
+            self.task.output_difference(),
+            "Row 3: expected ['4', 'Di', ' active ', '8.5'], got ['4', 'Di', 'active', '8.5'].",
+        )
+
+    def test_verify_rejects_wrong_counts(self) -> None:
+        self.assertFalse(self.task.verify({"rows_kept": 3, "average_score": 9.0}))
+        self.assertFalse(self.task.verify({"rows_kept": 2, "average_score": 8.0}))
+        self.assertFalse(self.task.verify("2 rows"))
+
+    def test_missing_output(self) -> None:
+        self.assertFalse(self.task.verify({"rows_kept": 2, "average_score": 9.0}))
+        self.assertIn("does not exist", self.task.output_difference())
+
+
+class GraderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "out.csv"
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_digest_matches_same_csv_rows(self) -> None:
+        expected = [["a", "b"], ["1", "x,y"], ["2", ""]]
+        self.path.write_text('a,b\r\n\r\n1,"x,y"\r\n2,\r\n', encoding="utf-8")
+        other = Path(self.directory.name) / "expected.csv"
+        with open(other, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerows(expected)
+        self.assertTrue(same_csv_rows(self.path, expected))
+        self.assertEqual(csv_digest(self.path), csv_digest(other))
+
+    def test_digest_of_invalid_utf8_is_none(self) -> None:
+        self.path.write_bytes(b"a,b\n\xff,1\n")
+        self.assertIsNone(csv_digest(self.path))
+
+    def test_first_difference_reports_missing_and_extra_rows(self) -> None:
+        self.path.write_text("a\n1\n", encoding="utf-8")
+        self.assertEqual(first_difference(self.path, [["a"], ["1"], ["2"]]), (3, ["2"], None))
+        self.assertEqual(first_difference(self.path, [["a"]]), (2, None, ["1"]))
+        self.assertIsNone(first_difference(self.path, [["a"], ["1"]]))
+
+    def test_verify_needs_expected_rows_or_digest(self) -> None:
+        self.path.write_text("a\n", encoding="utf-8")
+        with self.assertRaises(ValueError):
+            verify({"rows_kept": 0}, expected_rows=0, expected_average=None, cleaned_path=self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
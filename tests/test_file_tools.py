@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+from utils.file_tools import _mapped, read_text_file_tool, write_text_file_tool
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class ReadTextFileToolTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "lines.txt"
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_whole_file_uses_universal_newlines(self) -> None:
+        self.path.write_bytes(b"a\r\nb\r\n")
+        result = read_text_file_tool(str(self.path))
+        self.assertEqual(result["content"], "a\nb\n")
+        self.assertEqual(result["total_bytes"], 6)
+
+    def test_line_pages_cover_the_file(self) -> None:
+        self.path.write_text("".join(f"line {index}\n" for index in range(25)))
+        contents, offset = [], 0
+        while offset is not None:
+            page = read_text_file_tool(str(self.path), unit="lines", offset=offset, page_size=10)
+            contents.append(page["content"])
+            offset = page["next_offset"]
+        self.assertEqual(len(contents), 3)
+        self.assertEqual("".join(contents), self.path.read_text())
+        self.assertEqual(page["total_lines"], 25)
+
+    def test_byte_pages_end_on_line_breaks(self) -> None:
+        self.path.write_text("alpha\nbeta\ngamma\n")
+        page = read_text_file_tool(str(self.path), unit="bytes", page_size=8)
+        self.assertEqual(page["content"], "alpha\n")
+        self.assertEqual(page["next_offset"], 6)
+
+    def test_rewritten_file_is_mapped_afresh(self) -> None:
+        self.path.write_text("old\n")
+        read_text_file_tool(str(self.path), unit="lines")
+        write_text_file_tool(str(self.path), "new content\n")
+        page = read_text_file_tool(str(self.path), unit="lines")
+        self.assertEqual(page["content"], "new content\n")
+
+    def test_write_replaces_the_file(self) -> None:
+        # A new inode, so maps of the old file keep their pages.
+        self.path.write_text("old\n")
+        _mapped(self.path)
+        inode = self.path.stat().st_ino
+        write_text_file_tool(str(self.path), "")
+        self.assertNotEqual(self.path.stat().st_ino, inode)
+        self.assertEqual(self.path.read_text(), "")
+        self.assertEqual(list(self.path.parent.glob("*.tmp")), [])
+
+    def test_truncate_while_mapped_does_not_crash(self) -> None:
+        # Reading a map of a file truncated in place raises SIGBUS, which
+        # would kill the test runner, so the scenario runs in a subprocess.
+        script = textwrap.dedent(
+            f"""
+            from pathlib import Path
+            from utils.file_tools import _mapped, write_text_file_tool
+
+            path = Path({str(self.path)!r})
+            path.write_text("x" * 100_000)
+            mapped = _mapped(path)
+            write_text_file_tool(str(path), "")
+            assert mapped.data[99_999:100_000] == b"x"
+            """
+        )
+        completed = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import unittest
+from typing import Any
+
+from utils.history import CompactionPolicy, compact_history
+
+
+PROMPT = "Find the answer."
+
+
+def _history(steps: int, *, calls_per_step: int = 2, result_chars: int = 3_000) -> list[dict[str, Any]]:
+    messages: list[dict[str, Any]] = [{"role": "user", "content": PROMPT}]
+    for step in range(steps):
+        ids = [f"toolu_{step}_{call}" for call in range(calls_per_step)]
+        messages.append(
+            {
+                "role": "assistant",
+                "content": [
+                    {"type": "text", "text": f"Step {step}."},
+                    *(
+                        {"type": "tool_use", "id": tool_use_id, "name": "read_file", "input": {"path": tool_use_id}}
+                        for tool_use_id in ids
+                    ),
+                ],
+            }
+        )
+        messages.append(
+            {
+                "role": "user",
+                "content": [
+                    {"type": "tool_result", "tool_use_id": tool_use_id, "content": json.dumps("x" * result_chars)}
+                    for tool_use_id in ids
+                ],
+            }
+        )
+    return messages
+
+
+def _ids(message: dict[str, Any], block_type: str, field: str) -> list[str]:
+    content = message["content"]
+    if isinstance(content, str):
+        return []
+    return [block[field] for block in content if block.get("type") == block_type]
+
+
+class CompactHistoryTest(unittest.TestCase):
+    def assertValidHistory(self, messages: list[dict[str, Any]]) -> None:
+        self.assertEqual(messages[0]["role"], "user")
+        content = messages[0]["content"]
+        first_text = content if isinstance(content, str) else content[0]["text"]
+        self.assertEqual(first_text, PROMPT)
+        self.assertEqual(
+            [message["role"] for message in messages],
+            ["user", *["assistant", "user"] * ((len(messages) - 1) // 2)],
+        )
+        # Every tool_use is answered by the next message, and every
+        # tool_result answers a tool_use of the message before it.
+        self.assertEqual(_ids(messages[0], "tool_result", "tool_use_id"), [])
+        for assistant, results in zip(messages[1::2], messages[2::2]):
+            self.assertEqual(
+                _ids(assistant, "tool_use", "id"), _ids(results, "tool_result", "tool_use_id")
+            )
+
+    def test_keep_recent_steps_must_be_positive(self) -> None:
+        for steps in (0, -1):
+            with self.subTest(keep_recent_steps=steps):
+                with self.assertRaises(ValueError):
+                    CompactionPolicy(keep_recent_steps=steps)
+
+    def test_dropping_steps_keeps_pairs_and_the_prompt(self) -> None:
+        messages = _history(8)
+        for keep in (1, 2, 5):
+            for budget in (1, 2_000, 5_000, 20_000, None):
+                with self.subTest(keep_recent_steps=keep, max_history_tokens=budget):
+                    policy = CompactionPolicy(keep_recent_steps=keep, max_history_tokens=budget)
+                    compacted = compact_history(messages, policy)
+                    self.assertValidHistory(compacted)
+                    # The newest steps are always sent, unchanged.
+                    self.assertEqual(compacted[-2 * keep :], messages[-2 * keep :])
+
+    def test_tiny_budget_drops_every_older_step_and_notes_it(self) -> None:
+        messages = _history(6)
+        compacted = compact_history(messages, CompactionPolicy(keep_recent_steps=1, max_history_tokens=1))
+        self.assertEqual(compacted[1:], messages[-2:])
+        self.assertIn("5 earlier step(s) omitted", compacted[0]["content"][-1]["text"])
+
+    def test_older_results_are_excerpted(self) -> None:
+        messages = _history(4, result_chars=5_000)
+        compacted = compact_history(messages, CompactionPolicy(keep_recent_steps=2, excerpt_chars=100))
+        self.assertValidHistory(compacted)
+        old, recent = compacted[2]["content"][0]["content"], compacted[-1]["content"][0]["content"]
+        self.assertIn("characters omitted", old)
+        self.assertLess(len(old), 200)
+        self.assertEqual(recent, messages[-1]["content"][0]["content"])
+        # The transcript itself is left untouched.
+        self.assertNotIn("characters omitted", messages[2]["content"][0]["content"])
+
+    def test_superseded_results_are_replaced(self) -> None:
+        messages = _history(3, calls_per_step=1)
+        # Step 2 repeats step 0's call.
+        messages[5]["content"][1]["input"] = dict(messages[1]["content"][1]["input"])
+        policy = CompactionPolicy(keep_recent_steps=1, excerpt_chars=None, superseded_tools=("read_file",))
+        compacted = compact_history(messages, policy)
+        self.assertValidHistory(compacted)
+        self.assertIn("superseded", compacted[2]["content"][0]["content"])
+        self.assertEqual(compacted[4], messages[4])
+
+    def test_short_histories_are_unchanged(self) -> None:
+        messages = _history(0)
+        self.assertIs(compact_history(messages, CompactionPolicy()), messages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from tasks.rl_task_base import EpisodeResult
+from tests.test_batch import _PromptTask, _submit_prompt
+from utils.fake_anthropic import FakeMessagesTransport, fake_client
+from utils.metrics import (
+    BatchMetrics,
+    Distribution,
+    EpisodeMetrics,
+    StepMetrics,
+    ToolMetrics,
+    write_episode_jsonl,
+    write_prometheus_textfile,
+)
+
+
+def _episode(*steps: StepMetrics, seconds: float = 1.0) -> EpisodeMetrics:
+    return EpisodeMetrics(steps=list(steps), episode_seconds=seconds)
+
+
+def _results() -> list[EpisodeResult]:
+    first = _episode(
+        StepMetrics(
+            step=0,
+            api_seconds=0.5,
+            stop_reason="tool_use",
+            input_tokens=100,
+            output_tokens=10,
+            cache_read_input_tokens=80,
+            tool_seconds=0.25,
+            tools=[ToolMetrics("lookup", 0.25), ToolMetrics("submit_answer", 0.0)],
+        ),
+        seconds=0.75,
+    )
+    second = _episode(
+        StepMetrics(step=0, api_seconds=1.5, stop_reason="tool_use", input_tokens=50, from_response_cache=True),
+        StepMetrics(step=1, api_seconds=2.5, stop_reason="end_turn", rate_limit_wait_seconds=0.5),
+        seconds=4.0,
+    )
+    return [
+        EpisodeResult(run_id=1, success=True, value="a", metrics=first),
+        EpisodeResult(run_id=2, success=False, value=None, metrics=second),
+        EpisodeResult(run_id=3, success=False, value=None, metrics=None),
+    ]
+
+
+def _samples(text: str) -> dict[str, str]:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = value
+    return samples
+
+
+class DistributionTest(unittest.TestCase):
+    def test_nearest_rank_percentiles(self) -> None:
+        distribution = Distribution.from_values(float(value) for value in range(100, 0, -1))
+        self.assertEqual((distribution.p50, distribution.p95, distribution.p99), (50.0, 95.0, 99.0))
+        self.assertEqual((distribution.count, distribution.total, distribution.max), (100, 5050.0, 100.0))
+        self.assertEqual(Distribution.from_values([]), Distribution())
+
+
+class BatchMetricsTest(unittest.TestCase):
+    def test_rolls_up_steps_and_tools(self) -> None:
+        metrics = BatchMetrics.from_results(_results())
+        self.assertEqual((metrics.episodes, metrics.successes, metrics.steps), (3, 1, 3))
+        self.assertEqual((metrics.input_tokens, metrics.output_tokens, metrics.cache_read_input_tokens), (150, 10, 80))
+        self.assertEqual(metrics.response_cache_hits, 1)
+        self.assertEqual(metrics.stop_reasons, {"tool_use": 2, "end_turn": 1})
+        self.assertEqual(metrics.api_seconds.p50, 1.5)
+        self.assertEqual(metrics.episode_seconds.max, 4.0)
+        self.assertEqual(list(metrics.tool_seconds), ["lookup", "submit_answer"])
+        self.assertIn("1/3 episodes succeeded in 3 steps", metrics.describe())
+
+    def test_prometheus_exposition(self) -> None:
+        text = BatchMetrics.from_results(_results()).to_prometheus(labels={"task": 'say "hi"\n'})
+        self.assertTrue(text.endswith("\n"))
+        self.assertIn("# TYPE rl_task_episodes gauge", text)
+        self.assertIn("# TYPE rl_task_tool_seconds summary", text)
+        samples = _samples(text)
+        task = 'task="say \\"hi\\"\\n"'
+        self.assertEqual(samples[f"rl_task_episodes{{{task}}}"], "3")
+        self.assertEqual(samples[f'rl_task_tokens{{{task},kind="cache_read"}}'], "80")
+        self.assertEqual(samples[f'rl_task_stop_reasons{{{task},stop_reason="end_turn"}}'], "1")
+        self.assertEqual(samples[f'rl_task_step_api_seconds{{{task},quantile="0.5"}}'], "1.5")
+        self.assertEqual(samples[f"rl_task_step_api_seconds_sum{{{task}}}"], "4.5")
+        self.assertEqual(samples[f"rl_task_step_api_seconds_count{{{task}}}"], "3")
+        self.assertEqual(samples[f'rl_task_tool_seconds_count{{{task},tool="lookup"}}'], "1")
+
+    def test_prometheus_without_labels(self) -> None:
+        samples = _samples(BatchMetrics().to_prometheus(prefix="batch"))
+        self.assertEqual(samples["batch_episodes"], "0")
+        self.assertEqual(samples['batch_episode_seconds{quantile="0.99"}'], "0.0")
+
+
+class MetricsFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_prometheus_textfile_is_replaced_whole(self) -> None:
+        path = self.directory / "nested" / "batch.prom"
+        metrics = BatchMetrics.from_results(_results())
+        write_prometheus_textfile(path, metrics, labels={"task": "demo"})
+        self.assertEqual(path.read_text(encoding="utf-8"), metrics.to_prometheus(labels={"task": "demo"}))
+        self.assertEqual([entry.name for entry in path.parent.iterdir()], ["batch.prom"])
+
+    def test_episode_jsonl_round_trips(self) -> None:
+        path = self.directory / "episodes.jsonl"
+        results = _results()
+        write_episode_jsonl(path, results[:2])
+        write_episode_jsonl(path, results[2:], append=True)
+        records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual([record["run_id"] for record in records], [1, 2, 3])
+        self.assertEqual(records[0]["metrics"]["steps"][0]["tools"][0], {"name": "lookup", "seconds": 0.25})
+        self.assertEqual(records[1]["metrics"]["steps"][1]["rate_limit_wait_seconds"], 0.5)
+        self.assertIsNone(records[2]["metrics"])
+
+    def test_batch_results_carry_step_metrics(self) -> None:
+        transport = FakeMessagesTransport([_submit_prompt])
+        task = _PromptTask("measured", client=fake_client(transport))
+        results = asyncio.run(task.run_batch(num_runs=3))
+        metrics = BatchMetrics.from_results(results)
+        self.assertEqual((metrics.episodes, metrics.successes, metrics.steps), (3, 3, 3))
+        self.assertEqual(metrics.tool_seconds["submit_answer"].count, 3)
+        self.assertGreater(metrics.input_tokens, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
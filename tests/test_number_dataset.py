@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from tasks.number_frequency.dataset import NumberDataset, iter_json_int_chunks, load_number_dataset
+
+
+def _parse(text: str, chunk_bytes: int) -> list[int]:
+    stream = io.BytesIO(text.encode("utf-8"))
+    return [value for chunk in iter_json_int_chunks(stream, chunk_bytes=chunk_bytes) for value in chunk]
+
+
+class StreamingParserTest(unittest.TestCase):
+    def assertParses(self, text: str, expected: list[int]) -> None:
+        # Every chunk size, so chunk boundaries fall inside numbers, signs,
+        # whitespace and brackets.
+        for chunk_bytes in (*range(1, len(text) + 2), 1 << 20):
+            with self.subTest(chunk_bytes=chunk_bytes):
+                self.assertEqual(_parse(text, chunk_bytes), expected)
+
+    def assertRejected(self, text: str, message: str) -> None:
+        for chunk_bytes in (1, 3, 1 << 20):
+            with self.subTest(chunk_bytes=chunk_bytes):
+                with self.assertRaisesRegex(ValueError, message):
+                    _parse(text, chunk_bytes)
+
+    def test_integers_split_across_chunks(self) -> None:
+        self.assertParses("[12345, 678,9,\n 1000000]", [12345, 678, 9, 1000000])
+
+    def test_negatives_and_whitespace(self) -> None:
+        self.assertParses(" \n\t[ -1 ,\r\n-23,0 , -0 ]\n ", [-1, -23, 0, 0])
+
+    def test_empty_list(self) -> None:
+        self.assertParses(" [ ] ", [])
+
+    def test_values_outside_int64(self) -> None:
+        big = 2**63
+        self.assertParses(f"[1, {big}, -{big + 1}, 2]", [1, big, -(big + 1), 2])
+        dataset = NumberDataset.from_file(self._write(f"[1, {big}, 1]"), chunk_bytes=4)
+        self.assertEqual(dataset.positions(1), [0, 2])
+        self.assertEqual(dataset.count(big), 1)
+
+    def test_int64_bounds_stay_in_the_typed_array(self) -> None:
+        dataset = NumberDataset.from_file(self._write(f"[{2**63 - 1}, {-(2**63)}]"))
+        self.assertEqual(dataset.values.typecode, "q")
+        self.assertEqual(list(dataset.values), [2**63 - 1, -(2**63)])
+
+    def test_floats_and_exponents_rejected(self) -> None:
+        for text in ("[1, 2.5]", "[1e3]", "[1, 2E-1, 3]", "[1.0]"):
+            with self.subTest(text=text):
+                self.assertRejected(text, "only integers")
+
+    def test_other_values_rejected(self) -> None:
+        for text in ('[1, "2"]', "[null]", '[{"a": 1}]'):
+            with self.subTest(text=text):
+                self.assertRejected(text, "only integers")
+
+    def test_nested_arrays_rejected(self) -> None:
+        # Depending on where the chunk ends, the nested array is cut at its
+        # comma (not a list) or decoded whole (not an integer).
+        for text in ("[[1, 2], 3]", "[1, [2]]", "[[]]"):
+            with self.subTest(text=text):
+                self.assertRejected(text, "integers")
+
+    def test_malformed_lists_rejected(self) -> None:
+        for text in ("", "   ", "{}", "1, 2", "[1, 2", "[1, 2]]", "[,1]", "[1,]", "[1,,2]", "[1 2]", "[01]"):
+            with self.subTest(text=text):
+                self.assertRejected(text, "JSON list of integers")
+
+    def _write(self, text: str) -> Path:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "numbers.json"
+        path.write_text(text, encoding="utf-8")
+        return path
+
+
+class NumberDatasetTest(unittest.TestCase):
+    def test_positions_and_counts(self) -> None:
+        dataset = NumberDataset.from_numbers([7, 1, 7, -3, 7])
+        self.assertEqual(dataset.expected_answer(7), {"number": 7, "count": 3, "positions": [0, 2, 4]})
+        self.assertEqual(dataset.count(5), 0)
+        self.assertEqual(dataset.positions(-3), [3])
+
+    def test_non_integer_numbers_raise_value_error(self) -> None:
+        for numbers in ([1, 2.0], [1, "7"], [2**70, "x"], [None]):
+            with self.subTest(numbers=numbers):
+                with self.assertRaisesRegex(ValueError, "only integers"):
+                    NumberDataset.from_numbers(numbers)
+
+    def test_numbers_outside_int64(self) -> None:
+        dataset = NumberDataset.from_numbers([1, 2**70, 1])
+        self.assertEqual(dataset.positions(1), [0, 2])
+
+    def test_loaded_dataset_is_shared_until_the_file_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "numbers.json"
+            path.write_text("[1, 2, 1]", encoding="utf-8")
+            first = load_number_dataset(path)
+            self.assertIs(load_number_dataset(path), first)
+            path.write_text("[1, 2, 1, 1]", encoding="utf-8")
+            self.assertEqual(load_number_dataset(path).count(1), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
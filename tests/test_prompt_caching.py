@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from typing import Any
+
+from anthropic.types import ToolUnionParam
+
+from main import run_agent_loop
+from utils.fake_anthropic import FakeMessagesTransport, Reply, fake_client, submit, tool_call
+from utils.prompt_caching import (
+    EPHEMERAL_CACHE,
+    CacheStats,
+    cached_system,
+    cached_tools,
+    with_history_breakpoint,
+)
+
+
+# The API rejects requests with more than four cache_control breakpoints.
+MAX_BREAKPOINTS = 4
+
+
+def _tool(name: str) -> ToolUnionParam:
+    return {
+        "name": name,
+        "description": name,
+        "input_schema": {"type": "object", "properties": {}, "additionalProperties": True},
+    }
+
+
+TOOLS = [_tool("lookup"), _tool("submit_answer")]
+HANDLERS = {
+    "lookup": lambda **_: {"value": 1},
+    "submit_answer": lambda answer: {"answer": answer, "submitted": True},
+}
+
+
+def _breakpoints(payload: Any) -> list[str]:
+    """
+    Paths of every cache_control marker in a request payload.
+    """
+    found: list[str] = []
+
+    def walk(node: Any, path: str) -> None:
+        if isinstance(node, dict):
+            if "cache_control" in node:
+                found.append(path)
+            for key, value in node.items():
+                walk(value, f"{path}.{key}")
+        elif isinstance(node, list):
+            for index, value in enumerate(node):
+                walk(value, f"{path}[{index}]")
+
+    walk(payload, "")
+    return found
+
+
+class _RecordingScript:
+    """
+    Replies from ``replies`` in turn and keeps a copy of every payload.
+    """
+
+    def __init__(self, replies: list[Reply]) -> None:
+        self.replies = replies
+        self.payloads: list[dict[str, Any]] = []
+
+    def turns(self) -> list[Any]:
+        return [self._reply for _ in self.replies]
+
+    def _reply(self, payload: dict[str, Any]) -> Reply:
+        self.payloads.append(json.loads(json.dumps(payload)))
+        return self.replies[len(self.payloads) - 1]
+
+
+class BreakpointPlacementTest(unittest.TestCase):
+    def test_tools_and_system_mark_only_their_last_entry(self) -> None:
+        tools = cached_tools(TOOLS)
+        self.assertNotIn("cache_control", tools[0])
+        self.assertEqual(tools[-1]["cache_control"], EPHEMERAL_CACHE)
+        self.assertEqual(
+            cached_system("Be brief."), [{"type": "text", "text": "Be brief.", "cache_control": EPHEMERAL_CACHE}]
+        )
+        self.assertEqual(cached_tools([]), [])
+        # The caller's definitions are not modified.
+        self.assertNotIn("cache_control", TOOLS[-1])
+
+    def test_history_breakpoint_moves_to_the_newest_message(self) -> None:
+        messages: list[Any] = [
+            {"role": "user", "content": "Question?"},
+            {"role": "assistant", "content": [{"type": "text", "text": "Thinking."}]},
+            {"role": "user", "content": [{"type": "text", "text": "a"}, {"type": "text", "text": "b"}]},
+        ]
+        marked = with_history_breakpoint(messages)
+        self.assertEqual(_breakpoints(marked), ["[2].content[1]"])
+        self.assertEqual(marked[:2], messages[:2])
+        self.assertEqual(_breakpoints(messages), [])
+        self.assertEqual(_breakpoints(with_history_breakpoint(messages[:1])), ["[0].content[0]"])
+
+    def test_every_request_stays_within_the_breakpoint_cap(self) -> None:
+        script = _RecordingScript([tool_call("lookup") for _ in range(5)] + [submit("done")])
+        transport = FakeMessagesTransport(script.turns())
+        answer = asyncio.run(
+            run_agent_loop(
+                "Look it up.",
+                TOOLS,
+                HANDLERS,
+                client=fake_client(transport),
+                system="Be brief.",
+                cache_prompt=True,
+                verbose=False,
+            )
+        )
+        self.assertEqual(answer, "done")
+        self.assertEqual(len(script.payloads), 6)
+        for step, payload in enumerate(script.payloads):
+            with self.subTest(step=step):
+                breakpoints = _breakpoints(payload)
+                self.assertLessEqual(len(breakpoints), MAX_BREAKPOINTS)
+                last = len(payload["messages"]) - 1
+                last_block = len(payload["messages"][last]["content"]) - 1
+                self.assertCountEqual(
+                    breakpoints,
+                    [".tools[1]", ".system[0]", f".messages[{last}].content[{last_block}]"],
+                )
+
+    def test_no_breakpoints_without_cache_prompt(self) -> None:
+        script = _RecordingScript([tool_call("lookup"), submit("done")])
+        asyncio.run(
+            run_agent_loop(
+                "Look it up.", TOOLS, HANDLERS, client=fake_client(FakeMessagesTransport(script.turns())), verbose=False
+            )
+        )
+        self.assertEqual([_breakpoints(payload) for payload in script.payloads], [[], []])
+
+
+class CacheStatsTest(unittest.TestCase):
+    def test_counts_hits_and_tokens(self) -> None:
+        stats = CacheStats()
+        stats.record(SimpleNamespace(input_tokens=10, cache_creation_input_tokens=500, cache_read_input_tokens=0))
+        stats.record(SimpleNamespace(input_tokens=20, cache_creation_input_tokens=None, cache_read_input_tokens=500))
+        self.assertEqual((stats.requests, stats.hits, stats.misses), (2, 1, 1))
+        self.assertEqual(stats.total_input_tokens, 1_030)
+        self.assertIn("cache hits 1/2", stats.describe())
+
+
+if __name__ == "__main__":
+    unittest.main()
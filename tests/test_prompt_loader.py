@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import unittest
+from typing import Any
+
+from tasks.arithmetic_expression.task import ArithmeticExpressionTask
+from tests.test_batch import _PromptTask
+from utils.prompt_loader import PromptTemplate, load_prompt, load_prompt_template
+
+
+class _CountingTask(_PromptTask):
+    def __init__(self, prompt: str) -> None:
+        super().__init__(prompt)
+        self.renders = 0
+
+    def prompt_inputs(self) -> tuple[Any, ...]:
+        return (self._prompt,)
+
+    def render_prompt(self) -> str:
+        self.renders += 1
+        return super().render_prompt()
+
+
+class PromptTemplateTest(unittest.TestCase):
+    def test_renders_like_str_format(self) -> None:
+        source = "{{literal}} {name}: {value:>6.2f} {value!r} {name!s:*^9}{tail}"
+        values = {"name": "pi", "value": 3.14159, "tail": ""}
+        template = PromptTemplate(source)
+        self.assertEqual(template.format(**values), source.format(**values))
+        self.assertEqual(template.fields, {"name", "value", "tail"})
+
+    def test_template_without_fields(self) -> None:
+        template = PromptTemplate("No fields, {{braces}} only.")
+        self.assertEqual(template.format(), "No fields, {braces} only.")
+        self.assertEqual(template.fields, frozenset())
+
+    def test_rejects_attribute_and_index_fields(self) -> None:
+        for source in ("{row.name}", "{rows[0]}", "{0}", "{}"):
+            with self.subTest(source=source):
+                with self.assertRaisesRegex(ValueError, "Unsupported prompt field"):
+                    PromptTemplate(source)
+
+    def test_missing_value_raises_key_error(self) -> None:
+        with self.assertRaises(KeyError):
+            PromptTemplate("{a} and {b}").format(a=1)
+
+    def test_task_prompts_are_loaded_once(self) -> None:
+        template = load_prompt_template("arithmetic_expression", "prompt.md")
+        self.assertIs(load_prompt_template("arithmetic_expression", "prompt.md"), template)
+        self.assertEqual(template.source, load_prompt("arithmetic_expression", "prompt.md"))
+        self.assertEqual(template.fields, {"description", "expression"})
+        task = ArithmeticExpressionTask(expression="1 + 2", expected_answer=3, description="Add.")
+        self.assertEqual(task.prompt, template.source.format(description="Add.", expression="1 + 2"))
+
+
+class RenderedPromptTest(unittest.TestCase):
+    def test_prompt_is_rendered_once_per_inputs(self) -> None:
+        task = _CountingTask("first")
+        self.assertEqual([task.prompt, task.prompt, task.rendered_prompt.text], ["first"] * 3)
+        self.assertEqual(task.renders, 1)
+        self.assertEqual(task.rendered_prompt.byte_size, len(b"first"))
+        task._prompt = "second"
+        self.assertEqual(task.prompt, "second")
+        self.assertEqual(task.renders, 2)
+
+    def test_invalidate_prompt_forces_a_render(self) -> None:
+        task = _CountingTask("same")
+        task.prompt
+        task.invalidate_prompt()
+        task.prompt
+        self.assertEqual(task.renders, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import unittest
+from typing import Any
+
+import httpx
+from anthropic import BadRequestError, RateLimitError
+from anthropic.types import ToolUnionParam
+
+from main import run_agent_loop
+from utils.fake_anthropic import ErrorReply, FakeMessagesTransport, Reply, fake_client, submit
+from utils.metrics import EpisodeMetrics
+from utils.rate_limiter import AdaptiveRateLimiter, _TokenBucket
+
+
+TOOLS: list[ToolUnionParam] = [
+    {
+        "name": "submit_answer",
+        "description": "Submit the final answer",
+        "input_schema": {"type": "object", "properties": {"answer": {}}, "required": ["answer"]},
+    }
+]
+HANDLERS = {"submit_answer": lambda answer: {"answer": answer, "submitted": True}}
+
+
+class _DroppingTransport(FakeMessagesTransport):
+    """
+    Fails the first ``drops`` requests with a connection error.
+    """
+
+    def __init__(self, script: list[Any], drops: int) -> None:
+        super().__init__(script)
+        self.drops = drops
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.drops:
+            self.drops -= 1
+            self.request_count += 1
+            raise httpx.ConnectError("connection reset", request=request)
+        return await super().handle_async_request(request)
+
+
+def _limiter(**options: Any) -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(
+        **{
+            "requests_per_minute": 10_000,
+            "input_tokens_per_minute": 10_000_000,
+            "output_tokens_per_minute": 10_000_000,
+            "base_backoff_seconds": 0.01,
+            **options,
+        }
+    )
+
+
+def _run(transport: FakeMessagesTransport, limiter: AdaptiveRateLimiter, metrics: EpisodeMetrics | None = None) -> Any:
+    # The client keeps SDK retries on; run_agent_loop turns them off so the
+    # limiter sees every failure.
+    return asyncio.run(
+        run_agent_loop(
+            "Answer.",
+            TOOLS,
+            HANDLERS,
+            client=fake_client(transport),
+            rate_limiter=limiter,
+            metrics=metrics,
+            verbose=False,
+        )
+    )
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_waits_for_refill(self) -> None:
+        bucket = _TokenBucket(60)
+        self.assertEqual(bucket.wait_time(60), 0.0)
+        bucket.consume(60)
+        self.assertAlmostEqual(bucket.wait_time(1), 1.0, places=1)
+        bucket.refund(30)
+        self.assertEqual(bucket.wait_time(30), 0.0)
+
+    def test_request_larger_than_the_bucket_waits_for_a_full_bucket(self) -> None:
+        bucket = _TokenBucket(60)
+        bucket.consume(60)
+        self.assertAlmostEqual(bucket.wait_time(1_000), 60.0, places=0)
+
+    def test_sync_from_headers(self) -> None:
+        bucket = _TokenBucket(60)
+        bucket.sync(120, 0)
+        self.assertEqual(bucket.capacity, 120.0)
+        self.assertAlmostEqual(bucket.wait_time(2), 1.0, places=1)
+
+
+class AdaptiveRateLimiterTest(unittest.TestCase):
+    def test_retries_429_and_halves_concurrency(self) -> None:
+        transport = FakeMessagesTransport([[ErrorReply(429), ErrorReply(429), submit(42)]])
+        limiter = _limiter(max_concurrency=8)
+        metrics = EpisodeMetrics()
+        self.assertEqual(_run(transport, limiter, metrics), 42)
+        self.assertEqual(transport.request_count, 3)
+        self.assertEqual((limiter.rate_limited_count, limiter.concurrency), (2, 2))
+        self.assertEqual(metrics.steps[0].attempts, 3)
+
+    def test_honours_retry_after(self) -> None:
+        transport = FakeMessagesTransport([[ErrorReply(429, retry_after=0.2), submit(1)]])
+        metrics = EpisodeMetrics()
+        started_at = time.monotonic()
+        self.assertEqual(_run(transport, _limiter(), metrics), 1)
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.2)
+        self.assertGreaterEqual(metrics.steps[0].rate_limit_wait_seconds, 0.15)
+
+    def test_backoff_doubles_without_retry_after(self) -> None:
+        transport = FakeMessagesTransport([[ErrorReply(429), ErrorReply(429), ErrorReply(429), submit(1)]])
+        started_at = time.monotonic()
+        _run(transport, _limiter(base_backoff_seconds=0.05))
+        # 0.05 + 0.1 + 0.2 seconds of cooldown.
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.35)
+
+    def test_concurrency_grows_back_after_successes(self) -> None:
+        limiter = _limiter(max_concurrency=4, increase_after=2)
+        _run(FakeMessagesTransport([[ErrorReply(429), submit(1)]]), limiter)
+        self.assertEqual(limiter.concurrency, 2)
+        _run(FakeMessagesTransport([submit(1)]), limiter)
+        self.assertEqual(limiter.concurrency, 3)
+        for _ in range(4):
+            _run(FakeMessagesTransport([submit(1)]), limiter)
+        self.assertEqual(limiter.concurrency, 4)
+
+    def test_gives_up_after_max_retries(self) -> None:
+        transport = FakeMessagesTransport([[ErrorReply(429)]])
+        with self.assertRaises(RateLimitError):
+            _run(transport, _limiter(max_retries=2))
+        self.assertEqual(transport.request_count, 3)
+
+    def test_retries_overloaded_and_server_errors_without_shrinking(self) -> None:
+        transport = FakeMessagesTransport([[ErrorReply(529), ErrorReply(500), ErrorReply(408), submit(7)]])
+        limiter = _limiter(max_concurrency=8)
+        self.assertEqual(_run(transport, limiter), 7)
+        self.assertEqual(transport.request_count, 4)
+        self.assertEqual((limiter.rate_limited_count, limiter.concurrency), (0, 8))
+
+    def test_retries_connection_errors(self) -> None:
+        transport = _DroppingTransport([submit(3)], drops=2)
+        self.assertEqual(_run(transport, _limiter()), 3)
+        self.assertEqual(transport.request_count, 3)
+
+    def test_does_not_retry_client_errors(self) -> None:
+        transport = FakeMessagesTransport([[ErrorReply(400), submit(1)]])
+        limiter = _limiter()
+        with self.assertRaises(BadRequestError):
+            _run(transport, limiter)
+        self.assertEqual(transport.request_count, 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_paces_requests_per_minute(self) -> None:
+        limiter = _limiter(requests_per_minute=600)
+        # Drain the bucket, then each request waits a tenth of a second.
+        limiter._buckets["requests"].consume(600)
+        started_at = time.monotonic()
+        _run(FakeMessagesTransport([Reply(text="done")]), limiter)
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
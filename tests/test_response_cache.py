@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+
+from anthropic.types import Message
+
+from main import run_agent_loop, submit_answer_tool
+from utils.fake_anthropic import FakeMessagesTransport, fake_client, submit
+from utils.prompt_caching import cache_breakpoint
+from utils.response_cache import ResponseCache, ResponseCacheMiss, canonical_request_key
+
+
+TOOLS: list[Any] = [
+    {
+        "name": "submit_answer",
+        "description": "Submit the final answer",
+        "input_schema": {"type": "object", "properties": {"answer": {}}, "required": ["answer"]},
+    }
+]
+
+
+def _message(text: str) -> Message:
+    return Message.model_validate(
+        {
+            "id": "msg_1",
+            "type": "message",
+            "role": "assistant",
+            "model": "fake",
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 1, "output_tokens": 1},
+        }
+    )
+
+
+class CanonicalRequestKeyTest(unittest.TestCase):
+    def test_ignores_prompt_caching_markers(self) -> None:
+        block = {"type": "text", "text": "Find the matches."}
+        plain = canonical_request_key(model="m", tools=TOOLS, messages=[{"role": "user", "content": [block]}])
+        marked = canonical_request_key(
+            model="m",
+            tools=TOOLS,
+            messages=[{"role": "user", "content": [cache_breakpoint(block)]}],
+            system=None,
+        )
+        self.assertEqual(plain, marked)
+
+    def test_depends_on_the_request(self) -> None:
+        messages = [{"role": "user", "content": "a"}]
+        key = canonical_request_key(model="m", tools=TOOLS, messages=messages)
+        self.assertNotEqual(key, canonical_request_key(model="n", tools=TOOLS, messages=messages))
+        self.assertNotEqual(key, canonical_request_key(model="m", tools=[], messages=messages))
+        self.assertNotEqual(key, canonical_request_key(model="m", tools=TOOLS, messages=messages, system="s"))
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def run_loop(self, transport: FakeMessagesTransport, cache: ResponseCache, *, cache_prompt: bool) -> Any:
+        block = {"type": "text", "text": "Submit 42."}
+        return asyncio.run(
+            run_agent_loop(
+                # As tasks with cache_prompt mark their prompt.
+                prompt=[cache_breakpoint(block) if cache_prompt else block],
+                tools=TOOLS,
+                tool_handlers={"submit_answer": submit_answer_tool},
+                client=fake_client(transport),
+                cache_prompt=cache_prompt,
+                response_cache=cache,
+                verbose=False,
+            )
+        )
+
+    def test_record_then_replay_offline(self) -> None:
+        recording = FakeMessagesTransport([submit(42)])
+        answer = self.run_loop(recording, ResponseCache(self.path, mode="record"), cache_prompt=True)
+        self.assertEqual(answer, 42)
+        self.assertEqual(recording.request_count, 1)
+
+        replaying = FakeMessagesTransport([submit(0)])
+        cache = ResponseCache(self.path, mode="replay")
+        answer = self.run_loop(replaying, cache, cache_prompt=False)
+        self.assertEqual(answer, 42)
+        self.assertEqual(replaying.request_count, 0)
+        self.assertEqual(cache.hits, 1)
+
+    def test_replay_miss_raises(self) -> None:
+        cache = ResponseCache(self.path, mode="replay")
+        with self.assertRaises(ResponseCacheMiss):
+            cache.lookup("0" * 64)
+
+    def test_finds_responses_recorded_by_another_process(self) -> None:
+        reader = ResponseCache(self.path)
+        self.assertIsNone(reader.lookup("ab" * 32))
+        ResponseCache(self.path).store("ab" * 32, _message("hello"))
+        self.assertEqual(reader.lookup("ab" * 32).content[0].text, "hello")
+
+    def test_evicts_least_recently_used(self) -> None:
+        size = len(_message("x").model_dump_json())
+        cache = ResponseCache(self.path, max_bytes=2 * size)
+        for key in ("aa", "bb", "cc"):
+            cache.store(key * 32, _message("x"))
+        self.assertIsNone(cache.lookup("aa" * 32))
+        self.assertIsNotNone(cache.lookup("cc" * 32))
+        self.assertEqual(list(self.path.glob("*/*.tmp")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import unittest
+
+from tasks.results.grader import (
+    ALTERED_TEAM_NAME,
+    DUPLICATE_ROW,
+    MALFORMED_ROW,
+    SWAPPED_HOME_AWAY,
+    WRONG_ROW,
+    ExpectedMatches,
+    grade,
+    verify,
+)
+
+
+def match(home: str, result: str, away: str, date: str = "14.09.2025") -> dict[str, str]:
+    return {"date": date, "home": home, "result": result, "away": away}
+
+
+EXPECTED = [
+    match("FC Sparta (Men)", "2:4", "FC Urvich (Men)"),
+    match("FC Lozen", "0:1", "FC Orlovets", date="21.09.2025"),
+    match("FC Lozen", "0:1", "FC Orlovets", date="21.09.2025"),
+]
+
+
+class ExpectedMatchesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.expected = ExpectedMatches(EXPECTED)
+
+    def test_exact_answer_in_any_order_passes(self) -> None:
+        submitted = [dict(row) for row in reversed(EXPECTED)]
+        report = self.expected.grade(submitted)
+        self.assertTrue(report.passed)
+        self.assertTrue(self.expected.matches(submitted))
+        self.assertEqual((report.matched, report.missing, report.extra), (3, [], {}))
+        self.assertEqual((report.precision, report.recall), (1.0, 1.0))
+
+    def test_missing_rows(self) -> None:
+        report = self.expected.grade(EXPECTED[:2])
+        self.assertFalse(report.passed)
+        self.assertFalse(self.expected.matches(EXPECTED[:2]))
+        self.assertEqual(report.missing, [EXPECTED[2]])
+        self.assertEqual((report.precision, report.recall), (1.0, 2 / 3))
+
+    def test_wrong_row(self) -> None:
+        wrong = match("FC Other", "1:1", "FC Lozen")
+        report = self.expected.grade([*EXPECTED, wrong])
+        self.assertFalse(report.passed)
+        self.assertEqual(report.extra, {WRONG_ROW: [wrong]})
+        self.assertEqual((report.matched, report.precision, report.recall), (3, 0.75, 1.0))
+
+    def test_duplicate_row(self) -> None:
+        report = self.expected.grade([*EXPECTED, EXPECTED[0]])
+        self.assertEqual(report.extra, {DUPLICATE_ROW: [EXPECTED[0]]})
+        self.assertEqual(report.missing, [])
+
+    def test_altered_team_name_claims_its_expected_row(self) -> None:
+        altered = match("fc sparta men", "2:4", "FC  Urvich (Men)")
+        report = self.expected.grade([altered, *EXPECTED[1:]])
+        self.assertEqual(report.extra, {ALTERED_TEAM_NAME: [{"submitted": altered, "expected": EXPECTED[0]}]})
+        self.assertEqual(report.missing, [])
+        self.assertEqual(report.matched, 2)
+
+    def test_swapped_home_away(self) -> None:
+        for result in ("2:4", "4:2"):
+            with self.subTest(result=result):
+                swapped = match("FC Urvich (Men)", result, "FC Sparta (Men)")
+                report = self.expected.grade([swapped, *EXPECTED[1:]])
+                self.assertEqual(
+                    report.extra, {SWAPPED_HOME_AWAY: [{"submitted": swapped, "expected": EXPECTED[0]}]}
+                )
+                self.assertEqual(report.missing, [])
+
+    def test_malformed_rows(self) -> None:
+        malformed = ["not a row", {"home": "FC Lozen"}, {**EXPECTED[0], "notes": ["list"]}]
+        report = self.expected.grade([*EXPECTED, *malformed])
+        self.assertEqual(report.extra, {MALFORMED_ROW: malformed})
+        self.assertEqual(report.matched, 3)
+
+    def test_result_that_is_not_a_list(self) -> None:
+        report = self.expected.grade({"rows": EXPECTED})
+        self.assertFalse(report.passed)
+        self.assertEqual((report.submitted, report.matched), (0, 0))
+        self.assertEqual(report.missing, EXPECTED)
+        self.assertEqual(report.extra, {MALFORMED_ROW: [{"rows": EXPECTED}]})
+
+    def test_describe_lists_causes(self) -> None:
+        report = self.expected.grade([*EXPECTED, EXPECTED[0]])
+        self.assertEqual(
+            report.describe(),
+            "failed: 3/3 expected rows matched, precision 0.75, recall 1.00, 0 missing; extra: duplicate_row 1",
+        )
+
+    def test_empty_expected_answer(self) -> None:
+        self.assertTrue(grade([], []).passed)
+        report = grade([EXPECTED[0]], [])
+        self.assertEqual((report.passed, report.precision, report.recall), (False, 0.0, 1.0))
+
+    def test_rows_with_different_fields(self) -> None:
+        expected = [{"home": "A", "away": "B"}, {"home": "C", "away": "D", "result": "1:0"}]
+        self.assertTrue(verify(list(reversed(expected)), expected))
+        self.assertFalse(verify([expected[0], expected[0]], expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+from pathlib import Path
+
+from utils.sandbox import PythonSandbox, PythonSession
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class PythonSandboxTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sandbox = PythonSandbox(size=2)
+
+    def tearDown(self) -> None:
+        self.sandbox.close()
+
+    def test_captures_stdout_and_stderr(self) -> None:
+        result = asyncio.run(self.sandbox.run("import sys\nprint(6 * 7)\nprint('warn', file=sys.stderr)"))
+        self.assertEqual(result, {"result": "42\n", "error": None, "stderr": "warn\n"})
+
+    def test_reports_errors(self) -> None:
+        result = asyncio.run(self.sandbox.run("1 / 0"))
+        self.assertIsNone(result["result"])
+        self.assertEqual(result["error"], "division by zero")
+
+    def test_calls_do_not_share_a_namespace(self) -> None:
+        async def run() -> list[dict]:
+            await self.sandbox.run("x = 1")
+            return [await self.sandbox.run("print(x)") for _ in range(2)]
+
+        self.assertTrue(all("x" in result["error"] for result in asyncio.run(run())))
+
+    def test_timeout_kills_and_replaces_the_worker(self) -> None:
+        sandbox = PythonSandbox(size=1, timeout=0.5)
+
+        async def run() -> list[dict]:
+            return [await sandbox.run("while True: pass"), await sandbox.run("print('alive')")]
+
+        try:
+            timed_out, after = asyncio.run(run())
+        finally:
+            sandbox.close()
+        self.assertIn("timed out", timed_out["error"])
+        self.assertEqual(after["result"], "alive\n")
+
+    def test_cancelled_call_kills_the_worker(self) -> None:
+        async def run() -> dict:
+            with self.assertRaises(TimeoutError):
+                async with asyncio.timeout(0.5):
+                    await self.sandbox.run("import time\ntime.sleep(60)")
+            return await self.sandbox.run("print('alive')")
+
+        started_at = time.perf_counter()
+        self.assertEqual(asyncio.run(run())["result"], "alive\n")
+        self.assertLess(time.perf_counter() - started_at, 10)
+
+    def test_writes_to_the_stdout_descriptor_do_not_break_the_worker(self) -> None:
+        async def run(sandbox: PythonSandbox) -> list[dict]:
+            return [await sandbox.run("import os\nos.write(1, b'noise')"), await sandbox.run("print(1)")]
+
+        # Workers point fd 1 at the stderr they inherit, so start them with
+        # fd 2 captured in a file.
+        with tempfile.TemporaryFile() as captured:
+            saved_stderr = os.dup(2)
+            os.dup2(captured.fileno(), 2)
+            try:
+                sandbox = PythonSandbox(size=1)
+                try:
+                    first, second = asyncio.run(run(sandbox))
+                finally:
+                    sandbox.close()
+            finally:
+                os.dup2(saved_stderr, 2)
+                os.close(saved_stderr)
+            captured.seek(0)
+            self.assertEqual(captured.read(), b"noise")
+        self.assertIsNone(first["error"])
+        self.assertEqual(second["result"], "1\n")
+
+    def test_scripts_need_no_main_guard(self) -> None:
+        script = textwrap.dedent(
+            """
+            import asyncio
+            from utils.sandbox import PythonSandbox
+
+            sandbox = PythonSandbox(size=1)
+            print(asyncio.run(sandbox.run("print(1 + 1)"))["result"], end="")
+            sandbox.close()
+            """
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=60
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(completed.stdout, "2\n")
+
+
+class PythonSessionTest(unittest.TestCase):
+    def test_keeps_seeded_and_assigned_variables(self) -> None:
+        async def run() -> list[dict]:
+            async with PythonSession(variables={"numbers": [1, 2, 3]}) as session:
+                await session.run("total = sum(numbers)")
+                return [await session.run("print(total)")]
+
+        self.assertEqual(asyncio.run(run())[0]["result"], "6\n")
+
+    def test_timeout_resets_the_session(self) -> None:
+        async def run() -> list[dict]:
+            async with PythonSession(variables={"x": 1}, timeout=0.5) as session:
+                await session.run("x = 2")
+                timed_out = await session.run("while True: pass")
+                return [timed_out, await session.run("print(x)")]
+
+        timed_out, after = asyncio.run(run())
+        self.assertIn("session state was reset", timed_out["error"])
+        self.assertEqual(after["result"], "1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
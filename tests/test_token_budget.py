@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import unittest
+from typing import Any
+
+import httpx
+
+from tests.test_batch import _PromptTask, _submit_prompt
+from utils.fake_anthropic import FakeMessagesTransport, fake_client
+from utils.metrics import EpisodeMetrics, StepMetrics
+from utils.token_budget import PRICING, ModelPricing, TokenBudgetPlanner
+
+
+class _InFlightTransport(FakeMessagesTransport):
+    """
+    Notes the most requests that were ever in flight at once.
+    """
+
+    def __init__(self, script: list[Any], *, latency: float = 0.0) -> None:
+        super().__init__(script, latency=latency)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+
+def _planner(**options: Any) -> TokenBudgetPlanner:
+    return TokenBudgetPlanner(
+        **{"input_tokens_per_minute": 10_000_000, "output_tokens_per_minute": 10_000_000, **options}
+    )
+
+
+def _usage(input_tokens: int, output_tokens: int) -> EpisodeMetrics:
+    return EpisodeMetrics(
+        steps=[StepMetrics(step=0, api_seconds=0.0, input_tokens=input_tokens, output_tokens=output_tokens)]
+    )
+
+
+def _budgeted_batch(planner: TokenBudgetPlanner, num_runs: int, concurrency: int = 1) -> Any:
+    task = _PromptTask("budgeted", client=fake_client(FakeMessagesTransport([_submit_prompt])))
+    task.token_budget = planner
+    return asyncio.run(task.run_batch(num_runs=num_runs, concurrency=concurrency))
+
+
+class TokenBudgetPlannerTest(unittest.TestCase):
+    def test_total_token_cap_limits_the_runs_started(self) -> None:
+        priors = {"expected_steps": 1, "expected_output_tokens_per_step": 20}
+        # One episode first, to learn what an episode costs.
+        probe = _planner(**priors)
+        self.assertEqual(len(_budgeted_batch(probe, 1)), 1)
+        planner = _planner(max_total_tokens=int(probe.spent_tokens * 5.5), **priors)
+        results = _budgeted_batch(planner, 10, concurrency=2)
+        # Estimates run a little high, so the cap may cost one episode.
+        self.assertIn(len(results), (4, 5))
+        self.assertEqual([result.run_id for result in results], list(range(1, len(results) + 1)))
+        self.assertTrue(all(result.success for result in results))
+        self.assertTrue(planner.stopped)
+        self.assertLessEqual(planner.spent_tokens, planner.max_total_tokens)
+        self.assertIn("stopped at the spend cap", planner.describe())
+
+    def test_cost_cap_refuses_episodes_that_could_exceed_it(self) -> None:
+        pricing = ModelPricing(input=1_000_000, output=0, cache_write=0, cache_read=0)
+        planner = _planner(max_cost_usd=250, pricing=pricing, expected_steps=1, expected_growth_per_step=0)
+
+        async def run() -> list[Any]:
+            admitted = []
+            for _ in range(5):
+                estimate = planner.estimate_episode(prompt="x" * 400, tools=[], max_steps=1)
+                reservation = await planner.reserve(estimate)
+                if reservation is None:
+                    break
+                admitted.append(reservation)
+                planner.settle(reservation, _usage(reservation.estimate.input_tokens, 0))
+            return admitted
+
+        admitted = asyncio.run(run())
+        self.assertGreater(len(admitted), 0)
+        self.assertLessEqual(planner.spent_cost_usd, 250)
+        self.assertGreater(planner.spent_cost_usd + admitted[-1].cost_usd, 250)
+        self.assertTrue(planner.stopped)
+
+    def test_first_episode_runs_alone_until_it_settles(self) -> None:
+        transport_latency = 0.1
+        transport = _InFlightTransport([_submit_prompt], latency=transport_latency)
+        task = _PromptTask("budgeted", client=fake_client(transport))
+        task.token_budget = _planner()
+
+        async def run() -> Any:
+            started_at = time.perf_counter()
+            results = await task.run_batch(num_runs=5, concurrency=4)
+            return results, time.perf_counter() - started_at
+
+        results, elapsed = asyncio.run(run())
+        self.assertEqual(len(results), 5)
+        self.assertEqual(transport.max_in_flight, 4)
+        # The first episode, then the remaining four together.
+        self.assertGreaterEqual(elapsed, 2 * transport_latency)
+        self.assertLess(elapsed, 4 * transport_latency)
+
+    def test_concurrency_is_capped_by_the_batch(self) -> None:
+        transport = _InFlightTransport([_submit_prompt], latency=0.05)
+        task = _PromptTask("budgeted", client=fake_client(transport))
+        task.token_budget = _planner()
+        results = asyncio.run(task.run_batch(num_runs=8, concurrency=2))
+        self.assertEqual(len(results), 8)
+        self.assertEqual(transport.max_in_flight, 2)
+
+    def test_per_minute_budget_delays_admission(self) -> None:
+        priors = {"expected_steps": 1, "expected_growth_per_step": 0}
+        large_prompt, small_prompt = "x" * 40_000, "x" * 400
+        per_minute = _planner(**priors).estimate_episode(prompt=large_prompt, tools=[], max_steps=1).input_tokens
+        planner = _planner(input_tokens_per_minute=per_minute, **priors)
+
+        async def run() -> tuple[Any, float]:
+            large = await planner.reserve(planner.estimate_episode(prompt=large_prompt, tools=[], max_steps=1))
+            planner.settle(large, _usage(large.estimate.input_tokens, 0))
+            started_at = time.perf_counter()
+            small = await planner.reserve(planner.estimate_episode(prompt=small_prompt, tools=[], max_steps=1))
+            return small, time.perf_counter() - started_at
+
+        small, waited = asyncio.run(run())
+        # The first episode used the whole minute's budget; the second waits
+        # for its own tokens to refill.
+        expected = 60 * small.estimate.input_tokens / per_minute
+        self.assertGreaterEqual(waited, expected * 0.9)
+        self.assertLess(waited, expected + 0.5)
+
+    def test_cost_cap_needs_pricing(self) -> None:
+        self.assertNotIn("unknown-model", PRICING)
+        with self.assertRaises(ValueError):
+            TokenBudgetPlanner(model="unknown-model", max_cost_usd=1.0)
+        TokenBudgetPlanner(model="unknown-model", max_total_tokens=1_000)
+
+    def test_cancelled_episode_is_charged_its_estimate(self) -> None:
+        planner = _planner()
+
+        async def run() -> Any:
+            reservation = await planner.reserve(planner.estimate_episode(prompt="hello", tools=[], max_steps=3))
+            planner.settle(reservation, None)
+            return reservation
+
+        reservation = asyncio.run(run())
+        estimate = reservation.estimate
+        self.assertEqual(planner.spent_tokens, estimate.input_tokens + estimate.output_tokens)
+
+
+if __name__ == "__main__":
+    unittest.main()
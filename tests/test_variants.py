@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+
+from tasks.results.task import TeamAwayLossTask
+from tasks.results.variants import (
+    TeamAwayLossManifestTask,
+    generate_variants,
+    load_manifest,
+    write_manifest,
+)
+from utils.fake_anthropic import FakeMessagesTransport, Reply, fake_client, submit
+
+
+class GenerateVariantsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.variants = generate_variants(12, seed=7)
+
+    def test_same_seed_gives_the_same_variants(self) -> None:
+        self.assertEqual(generate_variants(12, seed=7), self.variants)
+        self.assertNotEqual(generate_variants(12, seed=8), self.variants)
+        # A longer run extends a shorter one with the same seed.
+        self.assertEqual(generate_variants(5, seed=7), self.variants[:5])
+
+    def test_variants_are_numbered_and_answerable(self) -> None:
+        self.assertEqual(
+            [variant.variant_id for variant in self.variants], [f"results-7-{index:05d}" for index in range(12)]
+        )
+        self.assertTrue(all(variant.expected_answer for variant in self.variants))
+
+    def test_variants_rebuild_their_task(self) -> None:
+        for variant in self.variants[:4]:
+            with self.subTest(variant=variant.variant_id):
+                task = TeamAwayLossTask(
+                    csv_path=variant.csv_path,
+                    conditions=variant.conditions,
+                    subset=variant.subset,
+                    noise=variant.noise,
+                )
+                self.assertEqual(task.prompt, variant.prompt)
+                self.assertEqual(task.expected_answer, variant.expected_answer)
+
+    def test_stray_symbols_rule_out_name_predicates(self) -> None:
+        variants = generate_variants(40, seed=3, noise_probability=1.0)
+        noisy = [variant for variant in variants if variant.noise.team_symbol_rate > 0]
+        self.assertTrue(noisy)
+        for variant in noisy:
+            self.assertFalse(any("name_length" in expression for _, expression in variant.conditions))
+
+    def test_without_subsets_or_noise(self) -> None:
+        variants = generate_variants(6, seed=1, noise_probability=0.0, subset_probability=0.0, max_conditions=1)
+        self.assertTrue(all(variant.noise is None and variant.subset is None for variant in variants))
+        self.assertTrue(all(len(variant.conditions) == 1 for variant in variants))
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "manifests" / "results.jsonl"
+        self.variants = generate_variants(4, seed=11, noise_probability=1.0)
+
+    def test_manifest_round_trips(self) -> None:
+        write_manifest(self.path, self.variants)
+        self.assertEqual(len(self.path.read_text(encoding="utf-8").splitlines()), 4)
+        self.assertEqual(load_manifest(self.path), self.variants)
+
+    def test_runs_cycle_through_the_variants(self) -> None:
+        write_manifest(self.path, self.variants)
+        task = TeamAwayLossManifestTask(self.path)
+        self.assertEqual([task.variant_for(run_id) for run_id in range(1, 6)], [*self.variants, self.variants[0]])
+        first = task.episode_task(1)
+        self.assertIs(task.episode_task(5), first)
+        self.assertEqual(first.prompt, self.variants[0].prompt)
+        self.assertTrue(first.verify(self.variants[0].expected_answer))
+        self.assertTrue(task.grade(2, self.variants[1].expected_answer).passed)
+
+    def test_empty_manifest_is_rejected(self) -> None:
+        write_manifest(self.path, [])
+        with self.assertRaises(ValueError):
+            TeamAwayLossManifestTask(self.path)
+
+    def test_batch_runs_every_variant(self) -> None:
+        answers = {variant.prompt: variant.expected_answer for variant in self.variants}
+        # The model solves every variant but the third.
+        answers[self.variants[2].prompt] = []
+
+        def answer(payload: dict[str, Any]) -> Reply:
+            return submit(answers[payload["messages"][0]["content"][0]["text"]])
+
+        task = TeamAwayLossManifestTask(
+            self.variants, client=fake_client(FakeMessagesTransport([answer]))
+        )
+        results = asyncio.run(task.run_batch(num_runs=len(self.variants), concurrency=2))
+        self.assertEqual([result.run_id for result in results], [1, 2, 3, 4])
+        self.assertEqual([result.success for result in results], [True, True, False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
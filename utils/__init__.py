@@ -1,5 +1,58 @@
-from .prompt_loader import load_prompt
+from .prompt_loader import PromptTemplate, load_prompt, load_prompt_template
+from .answer_cache import AnswerCache, default_answer_cache, set_default_answer_cache
 from .file_tools import read_text_file_tool, write_text_file_tool
+from .handlers import blocking, call_handler
+from .client_pool import AnthropicClientPool, ClientSettings, create_client
+from .fake_anthropic import FakeMessagesTransport, fake_client
+from .metrics import (
+    BatchMetrics,
+    EpisodeMetrics,
+    StepMetrics,
+    write_episode_jsonl,
+    write_prometheus_textfile,
+)
+from .prompt_caching import CacheStats, cache_breakpoint
+from .rate_limiter import AdaptiveRateLimiter
+from .response_cache import ResponseCache, ResponseCacheMiss, ResponseCacheMode
+from .sandbox import PythonSandbox, PythonSession, get_default_sandbox
+from .token_budget import CalibratedTokenEstimator, ModelPricing, TokenBudgetPlanner
+from .token_estimation import estimate_payload_tokens, estimate_tokens, split_by_tokens
 
-__all__ = ["load_prompt", "read_text_file_tool", "write_text_file_tool"]
+__all__ = [
+    "load_prompt",
+    "load_prompt_template",
+    "PromptTemplate",
+    "AnswerCache",
+    "default_answer_cache",
+    "set_default_answer_cache",
+    "read_text_file_tool",
+    "write_text_file_tool",
+    "blocking",
+    "call_handler",
+    "AnthropicClientPool",
+    "ClientSettings",
+    "create_client",
+    "FakeMessagesTransport",
+    "fake_client",
+    "BatchMetrics",
+    "EpisodeMetrics",
+    "StepMetrics",
+    "write_episode_jsonl",
+    "write_prometheus_textfile",
+    "CacheStats",
+    "cache_breakpoint",
+    "AdaptiveRateLimiter",
+    "ResponseCache",
+    "ResponseCacheMiss",
+    "ResponseCacheMode",
+    "PythonSandbox",
+    "PythonSession",
+    "get_default_sandbox",
+    "CalibratedTokenEstimator",
+    "ModelPricing",
+    "TokenBudgetPlanner",
+    "estimate_payload_tokens",
+    "estimate_tokens",
+    "split_by_tokens",
+]
 
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import marshal
+import os
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+
+# Set to a directory to share expected answers between processes by default.
+ANSWER_CACHE_ENV = "RL_TASK_ANSWER_CACHE"
+MAX_CACHED_ANSWERS = 256
+
+# Marks a miss, so a cached None (JSON null) is a hit like any other value.
+_MISSING = object()
+
+
+class AnswerCache:
+    """
+    Expected answers shared between task objects: in memory within a
+    process and, with a ``directory``, on disk between processes (e.g. the
+    workers of a multi-process run).
+
+    An answer is keyed by a namespace (the task), the content hash of its
+    dataset, the task parameters and the grader version, so any change to
+    one of them computes a fresh answer. File hashes are remembered by
+    (mtime, size), in memory and on disk, so an unchanged file is hashed once
+    and a rewritten one is hashed again. Values must be JSON-serialisable.
+    In memory they are held marshalled, so every caller gets its own copy
+    and mutating one cannot change what other tasks are given.
+    """
+
+    def __init__(self, directory: str | Path | None = None, *, max_entries: int = MAX_CACHED_ANSWERS) -> None:
+        self.directory = Path(directory).resolve() if directory is not None else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._answers: dict[str, bytes] = {}
+        self._fingerprints: dict[Path, tuple[tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        *,
+        dataset: str | Path,
+        params: Any,
+        version: int | str,
+        compute: Callable[[], Any],
+    ) -> Any:
+        key = self.key(namespace, dataset=dataset, params=params, version=version)
+        value = self._lookup(namespace, key)
+        if value is _MISSING:
+            value = compute()
+            self._store(namespace, key, value)
+        return value
+
+    def get(
+        self,
+        namespace: str,
+        *,
+        dataset: str | Path,
+        params: Any,
+        version: int | str,
+        default: Any = None,
+    ) -> Any:
+        value = self._lookup(namespace, self.key(namespace, dataset=dataset, params=params, version=version))
+        return default if value is _MISSING else value
+
+    def put(self, namespace: str, value: Any, *, dataset: str | Path, params: Any, version: int | str) -> None:
+        self._store(namespace, self.key(namespace, dataset=dataset, params=params, version=version), value)
+
+    def _lookup(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            frozen = self._answers.get(key)
+            if frozen is not None:
+                self.hits += 1
+        if frozen is not None:
+            return marshal.loads(frozen)
+        value = self._read(namespace, key)
+        if value is _MISSING:
+            self.misses += 1
+            return _MISSING
+        self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    def _store(self, namespace: str, key: str, value: Any) -> None:
+        self._write(namespace, key, value)
+        self._remember(key, value)
+
+    def key(self, namespace: str, *, dataset: str | Path, params: Any, version: int | str) -> str:
+        payload = {
+            "namespace": namespace,
+            "dataset": self.fingerprint(dataset),
+            "params": params,
+            "version": version,
+        }
+        encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def fingerprint(self, path: str | Path) -> str:
+        """
+        SHA-256 of the file's content, re-computed only when its mtime or
+        size changed since it was last hashed.
+        """
+        target = Path(path).resolve()
+        stat = target.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._fingerprints.get(target)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        record_path = self._fingerprint_path(target)
+        digest = None
+        if record_path is not None:
+            record = _read_json(record_path)
+            if record is not None and record.get("path") == str(target) and tuple(record.get("version", ())) == version:
+                digest = record.get("sha256")
+        if digest is None:
+            with open(target, "rb") as f:
+                digest = hashlib.file_digest(f, "sha256").hexdigest()
+            if record_path is not None:
+                _write_json(record_path, {"path": str(target), "version": list(version), "sha256": digest})
+        with self._lock:
+            self._fingerprints[target] = (version, digest)
+        return digest
+
+    def clear(self) -> None:
+        """
+        Forget the in-memory answers and file hashes; files on disk stay.
+        """
+        with self._lock:
+            self._answers.clear()
+            self._fingerprints.clear()
+
+    def _remember(self, key: str, value: Any) -> None:
+        frozen = marshal.dumps(value)
+        with self._lock:
+            if key not in self._answers and len(self._answers) >= self.max_entries:
+                del self._answers[next(iter(self._answers))]
+            self._answers[key] = frozen
+
+    def _answer_path(self, namespace: str, key: str) -> Path | None:
+        if self.directory is None:
+            return None
+        return self.directory / namespace / key[:2] / f"{key}.json"
+
+    def _fingerprint_path(self, target: Path) -> Path | None:
+        if self.directory is None:
+            return None
+        name = hashlib.sha256(str(target).encode("utf-8")).hexdigest()
+        return self.directory / "fingerprints" / f"{name}.json"
+
+    def _read(self, namespace: str, key: str) -> Any:
+        path = self._answer_path(namespace, key)
+        if path is None:
+            return _MISSING
+        record = _read_json(path)
+        if not isinstance(record, dict) or "value" not in record:
+            return _MISSING
+        return record["value"]
+
+    def _write(self, namespace: str, key: str, value: Any) -> None:
+        path = self._answer_path(namespace, key)
+        if path is not None:
+            _write_json(path, {"value": value})
+
+
+def _read_json(path: Path) -> Any | None:
+    try:
+        return json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        # Missing, or left half-written by a crashed process: recompute.
+        return None
+
+
+def _write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per process and thread, so concurrent writers never share a
+    # temporary file; the rename is atomic.
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    tmp_path.replace(path)
+
+
+_default_cache: AnswerCache | None = None
+_default_lock = threading.Lock()
+
+
+def default_answer_cache() -> AnswerCache:
+    """
+    The process-wide cache tasks use unless given one: in memory only, or
+    also on disk under ``$RL_TASK_ANSWER_CACHE`` when that is set.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AnswerCache(os.environ.get(ANSWER_CACHE_ENV) or None)
+        return _default_cache
+
+
+def set_default_answer_cache(cache: AnswerCache | None) -> None:
+    """
+    Replace the process-wide cache; None recreates it from the environment
+    on next use.
+    """
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from itertools import cycle
+from types import TracebackType
+from typing import Any, Iterator
+
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+
+@dataclass(slots=True)
+class ClientSettings:
+    """
+    Connection settings for the shared Anthropic clients.
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 600.0
+    connect_timeout: float = 5.0
+    max_retries: int = 2
+
+
+def create_client(settings: ClientSettings | None = None) -> AsyncAnthropic:
+    """
+    Build an AsyncAnthropic client whose HTTP connection pool is sized and
+    kept alive according to ``settings``.
+    """
+    settings = settings or ClientSettings()
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+    )
+    return AsyncAnthropic(http_client=http_client, max_retries=settings.max_retries)
+
+
+class AnthropicClientPool:
+    """
+    A small round-robin pool of long-lived clients shared by many episodes.
+
+    Clients are created lazily on first use and closed together by ``aclose``
+    (or on leaving ``async with``). ``client_factory`` lets callers swap in a
+    local stand-in for the real API.
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int = 1,
+        settings: ClientSettings | None = None,
+        client_factory: Callable[[], Any] | None = None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("Client pool size must be at least 1.")
+        self._size = size
+        self._settings = settings or ClientSettings()
+        self._client_factory = client_factory or (lambda: create_client(self._settings))
+        self._clients: list[Any] = []
+        self._rotation: Iterator[Any] | None = None
+
+    def acquire(self) -> Any:
+        if self._rotation is None:
+            self._clients = [self._client_factory() for _ in range(self._size)]
+            self._rotation = cycle(self._clients)
+        return next(self._rotation)
+
+    async def aclose(self) -> None:
+        clients, self._clients, self._rotation = self._clients, [], None
+        for client in clients:
+            close = getattr(client, "close", None)
+            if close is not None:
+                await close()
+
+    async def __aenter__(self) -> AnthropicClientPool:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
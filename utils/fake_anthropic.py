@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+from collections.abc import AsyncIterator, Callable, Sequence
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any
+
+import httpx
+from anthropic import AsyncAnthropic
+
+from .token_estimation import estimate_tokens
+
+
+@dataclass(slots=True)
+class ToolCall:
+    name: str
+    input: dict[str, Any]
+
+
+@dataclass(slots=True)
+class Reply:
+    """
+    One scripted assistant message. ``stop_reason`` defaults to ``tool_use``
+    when there are tool calls and ``end_turn`` otherwise.
+    """
+
+    tool_calls: list[ToolCall] = field(default_factory=list)
+    text: str | None = None
+    stop_reason: str | None = None
+    output_tokens: int | None = None
+
+
+@dataclass(slots=True)
+class ErrorReply:
+    """
+    A failed attempt: 429 (rate limit) or 529 (overloaded) by default. With
+    ``partial``, a streaming request gets a 200 response that streams the
+    blocks of ``partial`` and then, ``block_latency`` later, fails with an
+    ``error`` event, as when the API is overloaded mid-stream.
+    """
+
+    status: int = 429
+    retry_after: float | None = None
+    partial: Reply | None = None
+
+
+# A turn is the reply to one request, a list of attempts served in order to the
+# retries of that request (e.g. [ErrorReply(429), Reply(...)]), or a callable
+# building the reply from the request payload.
+Turn = Reply | Sequence[ErrorReply | Reply] | Callable[[dict[str, Any]], Reply]
+
+_ERROR_TYPES = {
+    429: "rate_limit_error",
+    500: "api_error",
+    529: "overloaded_error",
+}
+
+
+def tool_call(name: str, **tool_input: Any) -> Reply:
+    return Reply(tool_calls=[ToolCall(name=name, input=tool_input)])
+
+
+def submit(answer: Any, *, text: str | None = None) -> Reply:
+    return Reply(tool_calls=[ToolCall(name="submit_answer", input={"answer": answer})], text=text)
+
+
+def max_tokens_stop(text: str = "") -> Reply:
+    return Reply(text=text, stop_reason="max_tokens")
+
+
+def constant_latency(seconds: float) -> Callable[[], float]:
+    return lambda: seconds
+
+
+def lognormal_latency(median: float, sigma: float = 0.5, *, seed: int | None = None) -> Callable[[], float]:
+    """
+    Right-skewed latency typical for model responses, with the given median.
+    """
+    rng = random.Random(seed)
+    mu = math.log(median)
+    return lambda: rng.lognormvariate(mu, sigma)
+
+
+class FakeMessagesTransport(httpx.AsyncBaseTransport):
+    """
+    In-process stand-in for ``POST /v1/messages`` that plays back a script.
+
+    The turn is the number of assistant messages already in the request, so
+    every episode walks the same script independently. Retries of one turn
+    (after a scripted 429/529) are tracked per conversation, keyed by the first
+    user message, tools and model. ``rate_limit_probability`` and
+    ``overloaded_probability`` inject random failures on top of the script.
+
+    ``latency`` delays the start of the response and ``block_latency`` every
+    content block after the first, as if the model were still generating it.
+    Streaming requests get server-sent events as the blocks become ready;
+    other requests get the whole message once the last block is ready.
+    """
+
+    def __init__(
+        self,
+        script: Sequence[Turn],
+        *,
+        latency: Callable[[], float] | float = 0.0,
+        block_latency: Callable[[], float] | float = 0.0,
+        rate_limit_probability: float = 0.0,
+        overloaded_probability: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        self.script = list(script)
+        self.latency = latency if callable(latency) else constant_latency(latency)
+        self.block_latency = block_latency if callable(block_latency) else constant_latency(block_latency)
+        self.rate_limit_probability = rate_limit_probability
+        self.overloaded_probability = overloaded_probability
+        self.request_count = 0
+        self._rng = random.Random(seed)
+        self._attempts: dict[tuple[str, int], int] = {}
+        self._ids = count(1)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.request_count += 1
+        payload = json.loads(await request.aread())
+        delay = self.latency()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = self._rng.random()
+        if roll < self.rate_limit_probability:
+            return self._error(ErrorReply(429), request)
+        if roll < self.rate_limit_probability + self.overloaded_probability:
+            return self._error(ErrorReply(529), request)
+
+        reply = self._next_reply(payload)
+        if isinstance(reply, ErrorReply):
+            if reply.partial is not None and payload.get("stream"):
+                return httpx.Response(
+                    200,
+                    headers={"content-type": "text/event-stream"},
+                    content=self._events(self._message_body(reply.partial, payload), error=reply),
+                    request=request,
+                )
+            return self._error(reply, request)
+        body = self._message_body(reply, payload)
+        if payload.get("stream"):
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                content=self._events(body),
+                request=request,
+            )
+        for _ in body["content"][1:]:
+            delay = self.block_latency()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return httpx.Response(200, json=body, request=request)
+
+    def _next_reply(self, payload: dict[str, Any]) -> ErrorReply | Reply:
+        messages = payload.get("messages", [])
+        turn_index = sum(1 for message in messages if message.get("role") == "assistant")
+        if turn_index >= len(self.script):
+            return Reply(text="Script exhausted.")
+        turn = self.script[turn_index]
+        if callable(turn):
+            return turn(payload)
+        if isinstance(turn, Reply):
+            return turn
+        conversation = self._conversation_key(payload)
+        attempt = self._attempts.get((conversation, turn_index), 0)
+        self._attempts[(conversation, turn_index)] = attempt + 1
+        return turn[min(attempt, len(turn) - 1)]
+
+    @staticmethod
+    def _conversation_key(payload: dict[str, Any]) -> str:
+        messages = payload.get("messages") or [{}]
+        seed = json.dumps(
+            [payload.get("model"), payload.get("tools"), messages[0]], sort_keys=True, default=str
+        )
+        return hashlib.sha256(seed.encode("utf-8")).hexdigest()
+
+    def _message_body(self, reply: Reply, payload: dict[str, Any]) -> dict[str, Any]:
+        content: list[dict[str, Any]] = []
+        if reply.text:
+            content.append({"type": "text", "text": reply.text})
+        for call in reply.tool_calls:
+            content.append(
+                {"type": "tool_use", "id": f"toolu_fake_{next(self._ids)}", "name": call.name, "input": call.input}
+            )
+        stop_reason = reply.stop_reason or ("tool_use" if reply.tool_calls else "end_turn")
+        body_text = json.dumps(content)
+        body = {
+            "id": f"msg_fake_{next(self._ids)}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "fake"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": estimate_tokens(json.dumps(payload.get("messages", []))),
+                "output_tokens": reply.output_tokens or estimate_tokens(body_text),
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0,
+            },
+        }
+        return body
+
+    async def _events(self, body: dict[str, Any], *, error: ErrorReply | None = None) -> AsyncIterator[bytes]:
+        usage = body["usage"]
+        start = {**body, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 1}}
+        yield _sse("message_start", {"message": start})
+        for index, block in enumerate(body["content"]):
+            if index:
+                delay = self.block_latency()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if block["type"] == "text":
+                start = {"type": "text", "text": ""}
+                delta = {"type": "text_delta", "text": block["text"]}
+            else:
+                start = {**block, "input": {}}
+                delta = {"type": "input_json_delta", "partial_json": json.dumps(block["input"])}
+            yield _sse("content_block_start", {"index": index, "content_block": start})
+            yield _sse("content_block_delta", {"index": index, "delta": delta})
+            yield _sse("content_block_stop", {"index": index})
+        if error is not None:
+            delay = self.block_latency()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield _sse("error", _error_body(error))
+            return
+        yield _sse(
+            "message_delta",
+            {
+                "delta": {"stop_reason": body["stop_reason"], "stop_sequence": None},
+                "usage": {"output_tokens": usage["output_tokens"]},
+            },
+        )
+        yield _sse("message_stop", {})
+
+    def _error(self, error: ErrorReply, request: httpx.Request) -> httpx.Response:
+        headers = {}
+        if error.retry_after is not None:
+            headers["retry-after"] = str(error.retry_after)
+        return httpx.Response(error.status, json=_error_body(error), headers=headers, request=request)
+
+
+def _error_body(error: ErrorReply) -> dict[str, Any]:
+    return {
+        "type": "error",
+        "error": {
+            "type": _ERROR_TYPES.get(error.status, "api_error"),
+            "message": f"Scripted {error.status} from the fake Messages API",
+        },
+    }
+
+
+def _sse(event: str, data: dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps({'type': event, **data})}\n\n".encode("utf-8")
+
+
+def fake_client(transport: FakeMessagesTransport, *, max_retries: int = 2) -> AsyncAnthropic:
+    """
+    An AsyncAnthropic client served entirely by ``transport``; assign it to
+    ``RLTask.client`` or pass it to ``run_agent_loop``.
+    """
+    return AsyncAnthropic(
+        api_key="fake-key",
+        http_client=httpx.AsyncClient(transport=transport),
+        max_retries=max_retries,
+    )
@@ -1,7 +1,36 @@
 from __future__ import annotations
 
+import mmap
+import os
+import threading
+from array import array
+from math import ceil
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
+
+from .handlers import blocking
+
+
+DEFAULT_PAGE_BYTES = 64 * 1024
+DEFAULT_PAGE_LINES = 1_000
+MAX_MAPPED_FILES = 16
+
+# Input-schema properties for tools served by read_text_file_tool.
+PAGED_READ_PROPERTIES: dict[str, Any] = {
+    "unit": {
+        "type": "string",
+        "enum": ["bytes", "lines"],
+        "description": "Page by bytes or by 0-based lines. Omit unit, offset and page_size to read the whole file.",
+    },
+    "offset": {
+        "type": "integer",
+        "description": "Byte or line to start from; pass the previous result's next_offset to continue.",
+    },
+    "page_size": {
+        "type": "integer",
+        "description": f"Bytes (default {DEFAULT_PAGE_BYTES}) or lines (default {DEFAULT_PAGE_LINES}) per page.",
+    },
+}
 
 
 def _resolve_path(path: str) -> Path:
@@ -12,14 +41,150 @@ def _resolve_path(path: str) -> Path:
     return target
 
 
-def read_text_file_tool(path: str) -> dict[str, Any]:
+class _MappedFile:
+    """
+    Read-only memory map of one version of a file, with a line-start index
+    built on first use. Maps are never closed explicitly: a read may still use
+    one after it was replaced in the cache, so it is released once
+    unreferenced.
+
+    Truncating a mapped file in place makes reads of the map fault (SIGBUS),
+    so ``write_text_file_tool`` replaces files atomically instead: a map
+    keeps the old inode and its pages until it is released.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            # mmap cannot map an empty file.
+            self.data: mmap.mmap | bytes = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+            )
+        self._line_starts: array[int] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def line_starts(self) -> array[int]:
+        with self._lock:
+            if self._line_starts is None:
+                starts = array("Q", [0] if self.size else [])
+                position = self.data.find(b"\n")
+                while position != -1 and position + 1 < self.size:
+                    starts.append(position + 1)
+                    position = self.data.find(b"\n", position + 1)
+                self._line_starts = starts
+            return self._line_starts
+
+
+_mapped_files: dict[Path, tuple[tuple[int, int], _MappedFile]] = {}
+_mapped_files_lock = threading.Lock()
+
+
+def _mapped(target: Path) -> _MappedFile:
+    # Keyed by path and validated by (mtime, size), so a rewritten file is
+    # mapped afresh while repeated page reads reuse one map and line index.
+    stat = target.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _mapped_files_lock:
+        cached = _mapped_files.get(target)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        mapped = _MappedFile(target)
+        if cached is None and len(_mapped_files) >= MAX_MAPPED_FILES:
+            del _mapped_files[next(iter(_mapped_files))]
+        _mapped_files[target] = (version, mapped)
+        return mapped
+
+
+def _forget(target: Path) -> None:
+    with _mapped_files_lock:
+        _mapped_files.pop(target, None)
+
+
+def _page_end(data: mmap.mmap | bytes, start: int, end: int, size: int) -> int:
+    """
+    Pull a byte page's end back to the last line break in it, or failing
+    that to a UTF-8 character boundary, so pages decode cleanly.
+    """
+    if end >= size:
+        return size
+    newline = data.rfind(b"\n", start, end)
+    if newline != -1:
+        return newline + 1
+    boundary = end
+    while boundary > start and data[boundary] & 0xC0 == 0x80:
+        boundary -= 1
+    return boundary if boundary > start else end
+
+
+@blocking
+def read_text_file_tool(
+    path: str,
+    unit: Literal["bytes", "lines"] | None = None,
+    offset: int = 0,
+    page_size: int | None = None,
+) -> dict[str, Any]:
+    """
+    Read a whole file, or one page of it when ``unit``, ``offset`` or
+    ``page_size`` is given. Byte pages end on a line break where possible;
+    line pages count 0-based lines. Paged results report ``next_offset``
+    (None at the end of the file), the total size and ``pages_remaining``
+    (an estimate for byte pages, since they are trimmed to line breaks).
+    Pages are sliced from a cached memory map, so only the requested bytes
+    are copied and decoded; whole-file reads use universal newlines, as
+    ``Path.read_text`` does.
+    """
     target = _resolve_path(path)
-    content = target.read_text()
-    return {"path": str(target), "content": content}
+    if unit is None and offset == 0 and page_size is None:
+        total = target.stat().st_size
+        return {"path": str(target), "content": target.read_text(), "total_bytes": total}
+    if unit not in (None, "bytes", "lines"):
+        return {"path": str(target), "error": f"unit must be 'bytes' or 'lines', got {unit!r}"}
+    if offset < 0 or (page_size is not None and page_size < 1):
+        return {"path": str(target), "error": "offset must be >= 0 and page_size >= 1"}
 
+    mapped = _mapped(target)
+    if unit == "lines":
+        page_size = page_size or DEFAULT_PAGE_LINES
+        starts = mapped.line_starts
+        total = len(starts)
+        first = min(offset, total)
+        last = min(first + page_size, total)
+        start = starts[first] if first < total else mapped.size
+        end = starts[last] if last < total else mapped.size
+        next_offset = last if last < total else None
+        extra = {"total_lines": total}
+    else:
+        page_size = page_size or DEFAULT_PAGE_BYTES
+        total = mapped.size
+        start = min(offset, total)
+        end = _page_end(mapped.data, start, start + page_size, total)
+        next_offset = end if end < total else None
+        extra = {}
+    remaining = 0 if next_offset is None else ceil((total - next_offset) / page_size)
+    return {
+        "path": str(target),
+        "content": mapped.data[start:end].decode("utf-8", errors="replace"),
+        "unit": unit or "bytes",
+        "offset": offset,
+        "next_offset": next_offset,
+        "total_bytes": mapped.size,
+        **extra,
+        "page_size": page_size,
+        "pages_remaining": remaining,
+    }
 
+
+@blocking
 def write_text_file_tool(path: str, content: str) -> dict[str, Any]:
     target = _resolve_path(path)
-    target.write_text(content)
+    # Written beside the target and renamed over it, so concurrent episodes
+    # never see a half-written file and maps of the old file stay valid.
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_text(content)
+        os.replace(tmp_path, target)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    _forget(target)
     return {"path": str(target), "written_bytes": len(content)}
-
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_BLOCKING_ATTR = "__blocking_handler__"
+
+
+def blocking(func: F) -> F:
+    """
+    Mark a synchronous tool handler (or verify method) as doing blocking I/O,
+    so the agent loop runs it in a worker thread instead of on the event loop.
+    """
+    setattr(func, _BLOCKING_ATTR, True)
+    return func
+
+
+def is_blocking(func: Callable[..., Any]) -> bool:
+    return bool(getattr(func, _BLOCKING_ATTR, False))
+
+
+async def call_handler(handler: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Call a sync, blocking-sync or coroutine handler without stalling the loop.
+    """
+    if is_blocking(handler):
+        return await asyncio.to_thread(handler, *args, **kwargs)
+    result = handler(*args, **kwargs)
+    if inspect.isawaitable(result):
+        return await result
+    return result
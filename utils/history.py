@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from anthropic.types import MessageParam
+
+from .token_estimation import estimate_payload_tokens
+
+
+@dataclass(slots=True, frozen=True)
+class CompactionPolicy:
+    """
+    How ``run_agent_loop`` shrinks older steps before sending the history.
+
+    - Tool results of the newest ``keep_recent_steps`` steps (at least one, so
+      the tool_use being answered is never compacted away) are sent as is.
+    - Older results longer than ``excerpt_chars`` are cut to a head and tail
+      excerpt (None disables excerpts).
+    - Results of ``superseded_tools`` are replaced by a short note once the
+      same tool was called again with the same input, e.g. re-reading a file.
+    - With ``max_history_tokens`` the oldest steps (assistant turn plus its
+      tool results) are dropped until the estimate fits, never the first
+      message or the recent steps.
+
+    Tool results are shortened or dropped together with their tool_use block,
+    so every tool_use keeps its matching tool_result.
+    """
+
+    keep_recent_steps: int = 2
+    excerpt_chars: int | None = 2_000
+    superseded_tools: tuple[str, ...] = ()
+    max_history_tokens: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.keep_recent_steps < 1:
+            raise ValueError("keep_recent_steps must be at least 1.")
+
+
+def compact_history(messages: list[MessageParam], policy: CompactionPolicy) -> list[MessageParam]:
+    """
+    Return the messages to send under ``policy``; ``messages`` itself keeps the
+    full transcript. Old steps compact the same way every time, so the sent
+    prefix stays stable between steps apart from the step that just aged out.
+    """
+    if len(messages) < 3:
+        return messages
+    first, steps = messages[0], _pair_steps(messages[1:])
+    calls = _tool_calls(steps)
+    superseded = _superseded_ids(calls, policy.superseded_tools)
+    recent_from = max(0, len(steps) - policy.keep_recent_steps)
+
+    compacted: list[tuple[MessageParam, ...]] = []
+    for index, step in enumerate(steps):
+        if index >= recent_from:
+            compacted.append(step)
+            continue
+        compacted.append(tuple(_compact_results(message, calls, superseded, policy) for message in step))
+
+    dropped = 0
+    if policy.max_history_tokens is not None:
+        sizes = [estimate_payload_tokens(list(step)) for step in compacted]
+        total = estimate_payload_tokens([first]) + sum(sizes)
+        while total > policy.max_history_tokens and dropped < recent_from:
+            total -= sizes[dropped]
+            dropped += 1
+
+    result: list[MessageParam] = [first]
+    for step in compacted[dropped:]:
+        result.extend(step)
+    if dropped:
+        result = _note_dropped(result, dropped)
+    return result
+
+
+def _pair_steps(messages: list[MessageParam]) -> list[tuple[MessageParam, ...]]:
+    # After the prompt the history alternates assistant turn / tool results.
+    steps = []
+    for start in range(0, len(messages), 2):
+        steps.append(tuple(messages[start : start + 2]))
+    return steps
+
+
+def _field(block: Any, name: str) -> Any:
+    if isinstance(block, dict):
+        return block.get(name)
+    return getattr(block, name, None)
+
+
+def _tool_calls(steps: list[tuple[MessageParam, ...]]) -> dict[str, tuple[int, str, str]]:
+    """
+    tool_use id -> (step index, tool name, canonical input).
+    """
+    calls = {}
+    for index, step in enumerate(steps):
+        content = step[0]["content"]
+        if isinstance(content, str):
+            continue
+        for block in content:
+            if _field(block, "type") == "tool_use":
+                tool_input = json.dumps(_field(block, "input"), sort_keys=True, default=str)
+                calls[_field(block, "id")] = (index, _field(block, "name"), tool_input)
+    return calls
+
+
+def _superseded_ids(calls: dict[str, tuple[int, str, str]], tools: tuple[str, ...]) -> set[str]:
+    latest: dict[tuple[str, str], str] = {}
+    superseded = set()
+    for tool_use_id, (_, name, tool_input) in calls.items():
+        if name not in tools:
+            continue
+        previous = latest.get((name, tool_input))
+        if previous is not None:
+            superseded.add(previous)
+        latest[(name, tool_input)] = tool_use_id
+    return superseded
+
+
+def _compact_results(
+    message: MessageParam,
+    calls: dict[str, tuple[int, str, str]],
+    superseded: set[str],
+    policy: CompactionPolicy,
+) -> MessageParam:
+    content = message["content"]
+    if message["role"] != "user" or isinstance(content, str):
+        return message
+    blocks = []
+    for block in content:
+        if _field(block, "type") == "tool_result" and isinstance(_field(block, "content"), str):
+            tool_use_id = _field(block, "tool_use_id")
+            text = block["content"]
+            if tool_use_id in superseded:
+                name = calls[tool_use_id][1]
+                text = f"[result omitted: superseded by a later identical {name} call]"
+            elif policy.excerpt_chars is not None and len(text) > policy.excerpt_chars:
+                text = _excerpt(text, policy.excerpt_chars)
+            block = {**block, "content": text}
+        blocks.append(block)
+    return {"role": message["role"], "content": blocks}
+
+
+def _excerpt(text: str, limit: int) -> str:
+    head = limit // 2
+    tail = limit - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n... [{omitted} characters omitted] ...\n{text[-tail:]}"
+
+
+def _note_dropped(messages: list[MessageParam], dropped: int) -> list[MessageParam]:
+    # The first kept step follows the prompt directly, so the note goes into
+    # the prompt message to keep user/assistant alternation intact.
+    first = messages[0]
+    note = {"type": "text", "text": f"[{dropped} earlier step(s) omitted to stay within the history budget]"}
+    content = first["content"]
+    blocks = [{"type": "text", "text": content}] if isinstance(content, str) else list(content)
+    return [{"role": first["role"], "content": [*blocks, note]}, *messages[1:]]
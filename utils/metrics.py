@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import json
+import math
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+
+@dataclass(slots=True)
+class ToolMetrics:
+    name: str
+    seconds: float
+
+
+@dataclass(slots=True)
+class StepMetrics:
+    """
+    One ``messages.create`` round trip and the tool calls it triggered.
+
+    ``api_seconds`` is time spent in the request itself; with a rate limiter,
+    ``rate_limit_wait_seconds`` is the time spent queued or cooling down
+    before (re)trying it. ``tool_seconds`` is the wall time of the step's
+    concurrent tool phase and ``tools`` the time of each call.
+    ``time_to_first_tool_seconds`` runs from the start of the step to the
+    first tool call; with streaming that can be before the response ends.
+    """
+
+    step: int
+    api_seconds: float
+    rate_limit_wait_seconds: float = 0.0
+    attempts: int = 1
+    from_response_cache: bool = False
+    stop_reason: str | None = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    tool_seconds: float = 0.0
+    time_to_first_tool_seconds: float | None = None
+    tools: list[ToolMetrics] = field(default_factory=list)
+
+    def record_usage(self, usage: Any) -> None:
+        self.input_tokens = getattr(usage, "input_tokens", 0) or 0
+        self.output_tokens = getattr(usage, "output_tokens", 0) or 0
+        self.cache_read_input_tokens = getattr(usage, "cache_read_input_tokens", None) or 0
+        self.cache_creation_input_tokens = getattr(usage, "cache_creation_input_tokens", None) or 0
+
+
+@dataclass(slots=True)
+class EpisodeMetrics:
+    steps: list[StepMetrics] = field(default_factory=list)
+    episode_seconds: float = 0.0
+
+    @property
+    def api_seconds(self) -> float:
+        return sum(step.api_seconds for step in self.steps)
+
+    @property
+    def rate_limit_wait_seconds(self) -> float:
+        return sum(step.rate_limit_wait_seconds for step in self.steps)
+
+    @property
+    def tool_seconds(self) -> float:
+        return sum(step.tool_seconds for step in self.steps)
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(step.input_tokens for step in self.steps)
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(step.output_tokens for step in self.steps)
+
+
+class EpisodeRecord(Protocol):
+    run_id: int
+    success: bool
+    metrics: EpisodeMetrics | None
+
+
+@dataclass(slots=True)
+class Distribution:
+    count: int = 0
+    total: float = 0.0
+    p50: float = 0.0
+    p95: float = 0.0
+    p99: float = 0.0
+    max: float = 0.0
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> Distribution:
+        ordered = sorted(values)
+        if not ordered:
+            return cls()
+        return cls(
+            count=len(ordered),
+            total=math.fsum(ordered),
+            p50=_percentile(ordered, 0.5),
+            p95=_percentile(ordered, 0.95),
+            p99=_percentile(ordered, 0.99),
+            max=ordered[-1],
+        )
+
+    def quantiles(self) -> dict[float, float]:
+        return {0.5: self.p50, 0.95: self.p95, 0.99: self.p99}
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    # Nearest-rank, so every reported value was actually observed.
+    rank = max(1, math.ceil(q * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass(slots=True)
+class BatchMetrics:
+    """
+    Roll-up of the episode metrics of a batch: totals plus p50/p95/p99 of
+    episode time, per-step API time and rate-limit waits, and per-call time
+    of every tool.
+    """
+
+    episodes: int = 0
+    successes: int = 0
+    steps: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    response_cache_hits: int = 0
+    episode_seconds: Distribution = field(default_factory=Distribution)
+    api_seconds: Distribution = field(default_factory=Distribution)
+    rate_limit_wait_seconds: Distribution = field(default_factory=Distribution)
+    step_tool_seconds: Distribution = field(default_factory=Distribution)
+    time_to_first_tool_seconds: Distribution = field(default_factory=Distribution)
+    tool_seconds: dict[str, Distribution] = field(default_factory=dict)
+    stop_reasons: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_results(cls, results: Iterable[EpisodeRecord]) -> BatchMetrics:
+        results = list(results)
+        episodes = [result.metrics for result in results if result.metrics is not None]
+        steps = [step for episode in episodes for step in episode.steps]
+        tool_times: defaultdict[str, list[float]] = defaultdict(list)
+        for step in steps:
+            for tool in step.tools:
+                tool_times[tool.name].append(tool.seconds)
+        return cls(
+            episodes=len(results),
+            successes=sum(1 for result in results if result.success),
+            steps=len(steps),
+            input_tokens=sum(step.input_tokens for step in steps),
+            output_tokens=sum(step.output_tokens for step in steps),
+            cache_read_input_tokens=sum(step.cache_read_input_tokens for step in steps),
+            cache_creation_input_tokens=sum(step.cache_creation_input_tokens for step in steps),
+            response_cache_hits=sum(1 for step in steps if step.from_response_cache),
+            episode_seconds=Distribution.from_values(episode.episode_seconds for episode in episodes),
+            api_seconds=Distribution.from_values(step.api_seconds for step in steps),
+            rate_limit_wait_seconds=Distribution.from_values(step.rate_limit_wait_seconds for step in steps),
+            step_tool_seconds=Distribution.from_values(step.tool_seconds for step in steps),
+            time_to_first_tool_seconds=Distribution.from_values(
+                step.time_to_first_tool_seconds for step in steps if step.time_to_first_tool_seconds is not None
+            ),
+            tool_seconds={name: Distribution.from_values(times) for name, times in sorted(tool_times.items())},
+            stop_reasons=dict(Counter(step.stop_reason or "unknown" for step in steps)),
+        )
+
+    def describe(self) -> str:
+        lines = [
+            f"{self.successes}/{self.episodes} episodes succeeded in {self.steps} steps; "
+            f"tokens in {self.input_tokens}, out {self.output_tokens}, "
+            f"cache read {self.cache_read_input_tokens}, cache written {self.cache_creation_input_tokens}",
+            _describe_distribution("episode", self.episode_seconds),
+            _describe_distribution("model", self.api_seconds),
+            _describe_distribution("rate-limit wait", self.rate_limit_wait_seconds),
+            _describe_distribution("tools per step", self.step_tool_seconds),
+            _describe_distribution("first tool", self.time_to_first_tool_seconds),
+        ]
+        lines.extend(
+            _describe_distribution(f"tool {name}", distribution)
+            for name, distribution in self.tool_seconds.items()
+        )
+        return "\n".join(lines)
+
+    def to_prometheus(self, *, prefix: str = "rl_task", labels: dict[str, str] | None = None) -> str:
+        """
+        Render in the Prometheus text exposition format, e.g. for the
+        node_exporter textfile collector.
+        """
+        base = dict(labels or {})
+        lines: list[str] = []
+
+        def gauge(name: str, help_text: str, samples: list[tuple[dict[str, str], float]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for extra, value in samples:
+                lines.append(f"{prefix}_{name}{_labels({**base, **extra})} {_number(value)}")
+
+        def summary(name: str, help_text: str, series: list[tuple[dict[str, str], Distribution]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} summary")
+            for extra, distribution in series:
+                for quantile, value in distribution.quantiles().items():
+                    quantile_labels = _labels({**base, **extra, "quantile": str(quantile)})
+                    lines.append(f"{prefix}_{name}{quantile_labels} {_number(value)}")
+                lines.append(f"{prefix}_{name}_sum{_labels({**base, **extra})} {_number(distribution.total)}")
+                lines.append(f"{prefix}_{name}_count{_labels({**base, **extra})} {distribution.count}")
+
+        gauge("episodes", "Episodes in the batch.", [({}, self.episodes)])
+        gauge("episode_successes", "Episodes that passed verification.", [({}, self.successes)])
+        gauge("steps", "Model requests made by the batch.", [({}, self.steps)])
+        gauge(
+            "tokens",
+            "Tokens billed by the batch.",
+            [
+                ({"kind": "input"}, self.input_tokens),
+                ({"kind": "output"}, self.output_tokens),
+                ({"kind": "cache_read"}, self.cache_read_input_tokens),
+                ({"kind": "cache_creation"}, self.cache_creation_input_tokens),
+            ],
+        )
+        gauge("response_cache_hits", "Steps served from the response cache.", [({}, self.response_cache_hits)])
+        gauge(
+            "stop_reasons",
+            "Steps by stop reason.",
+            [({"stop_reason": reason}, count) for reason, count in sorted(self.stop_reasons.items())],
+        )
+        summary("episode_seconds", "Wall time of an episode.", [({}, self.episode_seconds)])
+        summary("step_api_seconds", "Time spent in one model request.", [({}, self.api_seconds)])
+        summary(
+            "step_rate_limit_wait_seconds",
+            "Time a step waited for the rate limiter.",
+            [({}, self.rate_limit_wait_seconds)],
+        )
+        summary("step_tool_seconds", "Wall time of the tool phase of a step.", [({}, self.step_tool_seconds)])
+        summary(
+            "step_time_to_first_tool_seconds",
+            "Time from the start of a step to its first tool call.",
+            [({}, self.time_to_first_tool_seconds)],
+        )
+        summary(
+            "tool_seconds",
+            "Execution time of one tool call.",
+            [({"tool": name}, distribution) for name, distribution in self.tool_seconds.items()],
+        )
+        return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(
+    path: str | Path,
+    metrics: BatchMetrics,
+    *,
+    prefix: str = "rl_task",
+    labels: dict[str, str] | None = None,
+) -> None:
+    # Written to a temporary file and renamed, so a scraper never reads a
+    # half-written file.
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(metrics.to_prometheus(prefix=prefix, labels=labels), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def write_episode_jsonl(path: str | Path, results: Iterable[EpisodeRecord], *, append: bool = False) -> None:
+    """
+    One JSON object per episode with its run id, outcome and step metrics.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
+        for result in results:
+            record = {
+                "run_id": result.run_id,
+                "success": result.success,
+                "metrics": asdict(result.metrics) if result.metrics is not None else None,
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _describe_distribution(label: str, distribution: Distribution) -> str:
+    return (
+        f"{label}: p50 {distribution.p50:.3f}s, p95 {distribution.p95:.3f}s, "
+        f"p99 {distribution.p99:.3f}s, total {distribution.total:.3f}s over {distribution.count}"
+    )
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from anthropic.types import MessageParam, TextBlockParam, ToolUnionParam
+
+
+EPHEMERAL_CACHE: dict[str, str] = {"type": "ephemeral"}
+
+
+def cache_breakpoint(block: Any) -> dict[str, Any]:
+    """
+    Return a copy of a content block or tool definition marked as the end of a
+    cacheable prefix.
+    """
+    if hasattr(block, "model_dump"):
+        block = block.model_dump(exclude_none=True)
+    return {**block, "cache_control": EPHEMERAL_CACHE}
+
+
+def text_blocks(content: str | list[TextBlockParam]) -> list[TextBlockParam]:
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return list(content)
+
+
+def cached_tools(tools: list[ToolUnionParam]) -> list[ToolUnionParam]:
+    """
+    Tool definitions are rendered first, so a breakpoint on the last one caches
+    all of them.
+    """
+    if not tools:
+        return tools
+    return [*tools[:-1], cache_breakpoint(tools[-1])]
+
+
+def cached_system(system: str | list[TextBlockParam]) -> list[TextBlockParam]:
+    blocks = text_blocks(system)
+    if not blocks:
+        return blocks
+    return [*blocks[:-1], cache_breakpoint(blocks[-1])]
+
+
+def with_history_breakpoint(messages: list[MessageParam]) -> list[MessageParam]:
+    """
+    Move a single rolling breakpoint onto the newest message so every step
+    reads the whole previous conversation from cache. ``messages`` itself is
+    left untouched so breakpoints never accumulate past the API limit.
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    blocks = text_blocks(last["content"]) if isinstance(last["content"], str) else list(last["content"])
+    if not blocks:
+        return messages
+    blocks[-1] = cache_breakpoint(blocks[-1])
+    return [*messages[:-1], {"role": last["role"], "content": blocks}]
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """
+    Running prompt-cache counters built from ``response.usage``.
+    """
+
+    requests: int = 0
+    hits: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    uncached_input_tokens: int = 0
+
+    def record(self, usage: Any) -> None:
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        self.requests += 1
+        self.hits += 1 if cache_read > 0 else 0
+        self.cache_read_tokens += cache_read
+        self.cache_write_tokens += cache_write
+        self.uncached_input_tokens += getattr(usage, "input_tokens", 0) or 0
+
+    @property
+    def misses(self) -> int:
+        return self.requests - self.hits
+
+    @property
+    def total_input_tokens(self) -> int:
+        return self.cache_read_tokens + self.cache_write_tokens + self.uncached_input_tokens
+
+    def describe(self) -> str:
+        return (
+            f"cache hits {self.hits}/{self.requests}, read {self.cache_read_tokens}, "
+            f"written {self.cache_write_tokens}, uncached {self.uncached_input_tokens} input tokens"
+        )
@@ -2,11 +2,42 @@ from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
+from string import Formatter
+from typing import Any
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 TASKS_DIR = BASE_DIR / "tasks"
 
+_CONVERSIONS = {None: lambda value: value, "s": str, "r": repr, "a": ascii}
+
+
+class PromptTemplate:
+    """
+    A ``str.format`` style template parsed once into literal text and fields,
+    so rendering is a single join instead of re-parsing the template.
+    """
+
+    __slots__ = ("source", "fields", "_segments")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        segments: list[tuple[str, str | None, str, Any]] = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if field is not None and not field.isidentifier():
+                raise ValueError(f"Unsupported prompt field {{{field}}}; use plain names.")
+            segments.append((literal, field, spec or "", _CONVERSIONS[conversion]))
+        self._segments = tuple(segments)
+        self.fields = frozenset(field for _, field, _, _ in segments if field is not None)
+
+    def format(self, **values: Any) -> str:
+        parts: list[str] = []
+        for literal, field, spec, convert in self._segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(format(convert(values[field]), spec))
+        return "".join(parts)
+
 
 @lru_cache(maxsize=None)
 def load_prompt(*relative_path: str) -> str:
@@ -21,3 +52,10 @@ def load_prompt(*relative_path: str) -> str:
         raise FileNotFoundError(f"Prompt template not found at {path}")
     return path.read_text().strip()
 
+
+@lru_cache(maxsize=None)
+def load_prompt_template(*relative_path: str) -> PromptTemplate:
+    """
+    Load and precompile a prompt markdown file located under the tasks directory.
+    """
+    return PromptTemplate(load_prompt(*relative_path))
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from anthropic import APIConnectionError, APIStatusError, RateLimitError
+
+
+class _TokenBucket:
+    """
+    Per-minute token bucket that refills continuously.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        # A single request larger than the whole bucket can only ever wait for
+        # a full bucket, otherwise it would block forever.
+        missing = min(amount, self.capacity) - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing * 60.0 / self.capacity
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def sync(self, limit: int | None, remaining: int | None) -> None:
+        self._refill()
+        if limit is not None and limit > 0:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.tokens = min(self.capacity, float(remaining))
+
+
+@dataclass(slots=True)
+class RequestTiming:
+    """
+    Where the time of one ``AdaptiveRateLimiter.call`` went: queued for
+    capacity or cooling down after a 429, versus inside the request itself.
+    """
+
+    attempts: int = 0
+    queued_seconds: float = 0.0
+    request_seconds: float = 0.0
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared pacing for ``messages.create`` calls.
+
+    Requests, input tokens and output tokens per minute are tracked with token
+    buckets that are re-synchronised from the ``anthropic-ratelimit-*`` response
+    headers. The number of concurrent requests shrinks multiplicatively on every
+    429 and grows by one after ``increase_after`` successful calls in a row.
+
+    Callers turn the client's own retries off (``max_retries=0``), so the
+    limiter also retries what the SDK would: overloaded (529) and other 5xx
+    responses, 408 and 409, and connection errors and timeouts, with the same
+    backoff as a 429 but without shrinking the concurrency.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: int = 50,
+        input_tokens_per_minute: int = 10_000,
+        output_tokens_per_minute: int = 8_000,
+        expected_output_tokens: int = 1_024,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        increase_after: int = 5,
+        max_retries: int = 5,
+        base_backoff_seconds: float = 1.0,
+    ) -> None:
+        if min_concurrency < 1 or max_concurrency < min_concurrency:
+            raise ValueError("Concurrency bounds must satisfy 1 <= min_concurrency <= max_concurrency.")
+        self._buckets = {
+            "requests": _TokenBucket(requests_per_minute),
+            "input-tokens": _TokenBucket(input_tokens_per_minute),
+            "output-tokens": _TokenBucket(output_tokens_per_minute),
+        }
+        self.expected_output_tokens = expected_output_tokens
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = max_concurrency
+        self.increase_after = increase_after
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self.rate_limited_count = 0
+        self._in_flight = 0
+        self._successes = 0
+        self._cooldown_until = 0.0
+        self._condition: asyncio.Condition | None = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def call(
+        self,
+        request: Callable[[], Awaitable[Any]],
+        *,
+        input_tokens: int,
+        timing: RequestTiming | None = None,
+    ) -> Any:
+        """
+        Run ``request`` once capacity is available and return the parsed message.
+
+        ``request`` must perform a raw-response call (``with_raw_response``) so
+        the rate-limit headers can be read. A ``RateLimitError`` or another
+        transient failure is retried up to ``max_retries`` times, honouring
+        ``retry-after``, before it is re-raised to the caller. Pass ``timing`` to have the queueing and
+        request time of every attempt added to it.
+        """
+        if timing is None:
+            timing = RequestTiming()
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.monotonic()
+            await self._acquire(input_tokens)
+            started_at = time.monotonic()
+            timing.attempts += 1
+            timing.queued_seconds += started_at - queued_at
+            try:
+                raw = await request()
+            except RateLimitError as err:
+                timing.request_seconds += time.monotonic() - started_at
+                self._on_rate_limited(err.response.headers, attempt)
+                await self._release(input_tokens, None)
+                if attempt == self.max_retries:
+                    raise
+                continue
+            except (APIStatusError, APIConnectionError) as err:
+                timing.request_seconds += time.monotonic() - started_at
+                await self._release(input_tokens, None)
+                if attempt == self.max_retries or not _is_transient(err):
+                    raise
+                self._back_off(_error_headers(err), attempt)
+                continue
+            except BaseException:
+                timing.request_seconds += time.monotonic() - started_at
+                await self._release(input_tokens, None)
+                raise
+            timing.request_seconds += time.monotonic() - started_at
+            message = raw.parse()
+            self._on_success(raw.headers)
+            await self._release(input_tokens, getattr(message, "usage", None))
+            return message
+        raise AssertionError("unreachable")
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _wait_time(self, input_tokens: int) -> float:
+        return max(
+            self._cooldown_until - time.monotonic(),
+            self._buckets["requests"].wait_time(1),
+            self._buckets["input-tokens"].wait_time(input_tokens),
+            self._buckets["output-tokens"].wait_time(self.expected_output_tokens),
+        )
+
+    async def _acquire(self, input_tokens: int) -> None:
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                delay = self._wait_time(input_tokens)
+                if delay <= 0 and self._in_flight < self.concurrency:
+                    break
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=delay if delay > 0 else None)
+                except TimeoutError:
+                    pass
+            self._buckets["requests"].consume(1)
+            self._buckets["input-tokens"].consume(input_tokens)
+            self._buckets["output-tokens"].consume(self.expected_output_tokens)
+            self._in_flight += 1
+
+    async def _release(self, estimated_input_tokens: int, usage: Any | None) -> None:
+        self._in_flight -= 1
+        if usage is not None:
+            # Replace the up-front estimates with what the API actually billed.
+            self._buckets["input-tokens"].refund(estimated_input_tokens - usage.input_tokens)
+            self._buckets["output-tokens"].refund(self.expected_output_tokens - usage.output_tokens)
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
+
+    def _on_success(self, headers: Mapping[str, str]) -> None:
+        self._sync_headers(headers)
+        self._successes += 1
+        if self._successes >= self.increase_after and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            self._successes = 0
+
+    def _on_rate_limited(self, headers: Mapping[str, str], attempt: int) -> None:
+        self.rate_limited_count += 1
+        self._successes = 0
+        self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+        self._sync_headers(headers)
+        self._back_off(headers, attempt)
+
+    def _back_off(self, headers: Mapping[str, str], attempt: int) -> None:
+        retry_after = _parse_float(headers.get("retry-after"))
+        if retry_after is None:
+            retry_after = self.base_backoff_seconds * (2**attempt)
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + retry_after)
+
+    def _sync_headers(self, headers: Mapping[str, str]) -> None:
+        for name, bucket in self._buckets.items():
+            limit = _parse_int(headers.get(f"anthropic-ratelimit-{name}-limit"))
+            remaining = _parse_int(headers.get(f"anthropic-ratelimit-{name}-remaining"))
+            bucket.sync(limit, remaining)
+            if remaining == 0:
+                reset = _seconds_until(headers.get(f"anthropic-ratelimit-{name}-reset"))
+                if reset is not None:
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + reset)
+
+
+_TRANSIENT_STREAM_ERRORS = ("rate_limit_error", "api_error", "overloaded_error")
+
+
+def _is_transient(err: Exception) -> bool:
+    # The failures the SDK itself retries; the server can override the
+    # decision with ``x-should-retry``.
+    if isinstance(err, APIConnectionError):
+        return True
+    if err.status_code < 400:
+        # A stream that fails after its 200 status reports the error in an
+        # ``error`` event instead.
+        error = err.body.get("error") if isinstance(err.body, dict) else None
+        return isinstance(error, dict) and error.get("type") in _TRANSIENT_STREAM_ERRORS
+    should_retry = err.response.headers.get("x-should-retry")
+    if should_retry in ("true", "false"):
+        return should_retry == "true"
+    return err.status_code in (408, 409) or err.status_code >= 500
+
+
+def _error_headers(err: Exception) -> Mapping[str, str]:
+    return err.response.headers if isinstance(err, APIStatusError) else {}
+
+
+def _parse_int(value: str | None) -> int | None:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _parse_float(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _seconds_until(timestamp: str | None) -> float | None:
+    if not timestamp:
+        return None
+    try:
+        reset_at = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, reset_at.timestamp() - time.time())
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from enum import StrEnum
+from pathlib import Path
+from typing import Any
+
+from anthropic.types import Message
+
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResponseCacheMode(StrEnum):
+    RECORD = "record"
+    REPLAY = "replay"
+    PASSTHROUGH = "passthrough"
+
+
+class ResponseCacheMiss(LookupError):
+    """
+    Raised in replay mode when a request was never recorded.
+    """
+
+
+def canonical_request_key(
+    *,
+    model: str,
+    tools: Any,
+    messages: Any,
+    system: Any = None,
+) -> str:
+    """
+    Content hash of the parts of a messages.create request that determine the
+    response. Prompt-caching markers (``cache_control``) are not part of the
+    key, so recordings replay whether or not prompt caching is on.
+    """
+    payload = _without_cache_control({"model": model, "system": system, "tools": tools, "messages": messages})
+    encoded = json.dumps(
+        payload,
+        default=_to_jsonable,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _without_cache_control(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {name: _without_cache_control(item) for name, item in value.items() if name != "cache_control"}
+    if isinstance(value, (list, tuple)):
+        return [_without_cache_control(item) for item in value]
+    if hasattr(value, "model_dump"):
+        return _without_cache_control(_to_jsonable(value))
+    return value
+
+
+def _to_jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    raise TypeError(f"Cannot canonicalise {type(value).__name__} for a cache key")
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk store of ``messages.create`` responses.
+
+    - ``record``: serve recorded responses, call the API on a miss and store it.
+    - ``replay``: serve recorded responses only; a miss raises
+      ``ResponseCacheMiss`` so runs stay fully offline.
+    - ``passthrough``: always call the API and leave the cache untouched.
+
+    The store is bounded by ``max_bytes``; the least recently used responses
+    are evicted first. Several processes may share a directory: writes are
+    atomic and each process finds the others' recordings on lookup, but
+    each one accounts ``max_bytes`` against the files it has seen (those
+    present when its index was loaded plus those it read or wrote since),
+    so the shared directory can briefly exceed the bound.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        mode: ResponseCacheMode | str = ResponseCacheMode.RECORD,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = Path(directory).resolve()
+        self.mode = ResponseCacheMode(mode)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._index: OrderedDict[str, int] | None = None
+        self._total_bytes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _load_index(self) -> OrderedDict[str, int]:
+        if self._index is None:
+            entries = []
+            if self.directory.exists():
+                for path in self.directory.glob("*/*.json"):
+                    stat = path.stat()
+                    entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def lookup(self, key: str) -> Message | None:
+        if self.mode is ResponseCacheMode.PASSTHROUGH:
+            return None
+        index = self._load_index()
+        path = self._path(key)
+        try:
+            # The file, not the index, is authoritative: another process may
+            # have recorded or evicted it since the index was loaded.
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self._total_bytes -= index.pop(key, 0)
+            self.misses += 1
+            if self.mode is ResponseCacheMode.REPLAY:
+                raise ResponseCacheMiss(f"No recorded response for request {key}") from None
+            return None
+        self.hits += 1
+        self._total_bytes += len(data) - index.pop(key, 0)
+        index[key] = len(data)
+        # The file mtime doubles as the LRU clock across processes.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return Message.model_validate_json(data)
+
+    def store(self, key: str, message: Message) -> None:
+        if self.mode is not ResponseCacheMode.RECORD:
+            return
+        index = self._load_index()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = message.model_dump_json().encode("utf-8")
+        # Unique per process and thread, so concurrent writers of the same key
+        # never share a temporary file; the rename is atomic.
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        self._total_bytes += len(data) - index.pop(key, 0)
+        index[key] = len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        index = self._load_index()
+        while self._total_bytes > self.max_bytes and len(index) > 1:
+            key, size = index.popitem(last=False)
+            self._path(key).unlink(missing_ok=True)
+            self._total_bytes -= size
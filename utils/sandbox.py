@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import queue
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any
+
+# execute_expression is re-exported for in-process callers.
+from .sandbox_worker import execute_expression, receive, send  # noqa: F401
+
+
+DEFAULT_CPU_SECONDS = 10
+DEFAULT_MEMORY_LIMIT_BYTES = 1024 * 1024 * 1024
+# Interpreter start-up is not charged to the first call's timeout.
+WORKER_STARTUP_TIMEOUT_SECONDS = 60.0
+
+_WORKER_SCRIPT = str(Path(__file__).resolve().with_name("sandbox_worker.py"))
+_EOF = object()
+
+
+class _Worker:
+    """
+    One worker process running ``sandbox_worker.py``. Replies are read by a
+    daemon thread into a queue, so waiting for one can time out on every
+    platform; when the process exits the thread queues ``_EOF``.
+    """
+
+    def __init__(
+        self,
+        memory_limit_bytes: int | None,
+        cpu_seconds: int | None,
+        session_namespace: dict[str, Any] | None = None,
+    ) -> None:
+        # -P keeps the worker script's directory off sys.path; the worker
+        # takes the parent's path from its first message instead.
+        self.process = subprocess.Popen(
+            [sys.executable, "-P", _WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._setup = ((list(sys.path), memory_limit_bytes, cpu_seconds), session_namespace)
+        self._replies: queue.Queue[Any] = queue.Queue()
+        threading.Thread(target=self._read_replies, daemon=True).start()
+        self.ready = False
+
+    def _read_replies(self) -> None:
+        try:
+            while True:
+                self._replies.put(receive(self.process.stdout))
+        except (EOFError, OSError, ValueError):
+            self._replies.put(_EOF)
+
+    def _reply(self, timeout: float | None) -> Any:
+        try:
+            reply = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError from None
+        if reply is _EOF:
+            raise EOFError
+        return reply
+
+    def execute(self, expression: str, timeout: float | None) -> dict[str, Any]:
+        if not self.ready:
+            # Sent here rather than at start-up, since seed variables can be
+            # large and this runs in a thread, off the event loop.
+            for message in self._setup:
+                send(self.process.stdin, message)
+            self._setup = None
+            self._reply(WORKER_STARTUP_TIMEOUT_SECONDS)
+            self.ready = True
+        send(self.process.stdin, expression)
+        return self._reply(timeout)
+
+    @property
+    def exitcode(self) -> int | None:
+        return self.process.poll()
+
+    def kill(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class PythonSandbox:
+    """
+    Pool of warm worker processes that run ``python_expression`` calls.
+
+    Each call gets a wall-clock ``timeout``, a per-call CPU budget and a memory
+    cap, and its stdout/stderr are captured inside the worker, so concurrent
+    episodes never see each other's output. A worker that times out, crashes
+    or whose call is cancelled is killed and replaced before the next call.
+
+    With ``timeout`` None (the default) the wall-clock limit is the caller's,
+    e.g. the agent loop's ``tool_timeout``, which cancels the call. Workers
+    are plain interpreters running ``sandbox_worker.py``: they import only
+    the standard library and never re-import the caller's ``__main__``, so
+    scripts need no ``if __name__ == "__main__"`` guard.
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int | None = None,
+        timeout: float | None = None,
+        cpu_seconds: int | None = DEFAULT_CPU_SECONDS,
+        memory_limit_bytes: int | None = DEFAULT_MEMORY_LIMIT_BYTES,
+    ) -> None:
+        self.size = size or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_limit_bytes = memory_limit_bytes
+        self._idle: list[_Worker] = []
+        self._started = 0
+        self._available: asyncio.Condition | None = None
+        self._available_loop: asyncio.AbstractEventLoop | None = None
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self.memory_limit_bytes, self.cpu_seconds)
+
+    def _get_available(self) -> asyncio.Condition:
+        # The default sandbox outlives individual asyncio.run() calls, so the
+        # condition is rebuilt whenever it is used from a new event loop.
+        loop = asyncio.get_running_loop()
+        if self._available is None or self._available_loop is not loop:
+            self._available = asyncio.Condition()
+            self._available_loop = loop
+        return self._available
+
+    async def _checkout(self) -> _Worker:
+        available = self._get_available()
+        async with available:
+            while not self._idle and self._started >= self.size:
+                await available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            return self._spawn()
+        except BaseException:
+            self._started -= 1
+            raise
+
+    async def _checkin(self, worker: _Worker | None) -> None:
+        available = self._get_available()
+        if worker is None:
+            # Restart the crashed or killed worker so the pool stays warm.
+            try:
+                worker = self._spawn()
+            except OSError:
+                self._started -= 1
+        async with available:
+            if worker is not None:
+                self._idle.append(worker)
+            available.notify()
+
+    async def run(self, expression: str) -> dict[str, Any]:
+        worker: _Worker | None = await self._checkout()
+        try:
+            return await asyncio.to_thread(worker.execute, expression, self.timeout)
+        except TimeoutError:
+            worker.kill()
+            worker = None
+            return {"result": None, "error": f"Execution timed out after {self.timeout}s", "stderr": ""}
+        except (EOFError, OSError):
+            worker.kill()
+            exit_code = worker.exitcode
+            worker = None
+            return {
+                "result": None,
+                "error": f"Worker process crashed (exit code {exit_code}); likely exceeded its CPU or memory limit",
+                "stderr": "",
+            }
+        except BaseException:
+            # Cancelled mid-call: the worker's state is unknown, so replace it.
+            worker.kill()
+            worker = None
+            raise
+        finally:
+            await self._checkin(worker)
+
+    def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+        self._started = 0
+
+
+class PythonSession:
+    """
+    A single worker process whose namespace persists across the
+    ``python_expression`` calls of one episode.
+
+    ``variables`` are pickled into the worker when it starts, so tasks can
+    pre-seed parsed datasets without any tool round-trips. The session is
+    bounded by the same timeout, CPU and memory limits as the pool (pass the
+    task's ``tool_timeout`` as ``timeout``, so a timed-out call is reported
+    as a reset session); if the
+    worker dies it is restarted from the seed variables and the caller is told
+    that earlier state was lost. Calls are serialised to keep their order.
+    """
+
+    def __init__(
+        self,
+        *,
+        variables: dict[str, Any] | None = None,
+        timeout: float | None = None,
+        cpu_seconds: int | None = DEFAULT_CPU_SECONDS,
+        memory_limit_bytes: int | None = DEFAULT_MEMORY_LIMIT_BYTES,
+    ) -> None:
+        self.variables = dict(variables or {})
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_limit_bytes = memory_limit_bytes
+        self._worker: _Worker | None = None
+        self._lock = asyncio.Lock()
+
+    async def run(self, expression: str) -> dict[str, Any]:
+        async with self._lock:
+            if self._worker is None:
+                self._worker = _Worker(
+                    self.memory_limit_bytes,
+                    self.cpu_seconds,
+                    session_namespace=self.variables,
+                )
+            worker = self._worker
+            try:
+                return await asyncio.to_thread(worker.execute, expression, self.timeout)
+            except TimeoutError:
+                self._discard()
+                return {
+                    "result": None,
+                    "error": f"Execution timed out after {self.timeout}s; session state was reset",
+                    "stderr": "",
+                }
+            except (EOFError, OSError):
+                self._discard()
+                return {
+                    "result": None,
+                    "error": (
+                        f"Session process crashed (exit code {worker.exitcode}); "
+                        "likely exceeded its CPU or memory limit. Session state was reset"
+                    ),
+                    "stderr": "",
+                }
+            except BaseException:
+                self._discard()
+                raise
+
+    def _discard(self) -> None:
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.kill()
+
+    def close(self) -> None:
+        self._discard()
+
+    async def __aenter__(self) -> PythonSession:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+_default_sandbox: PythonSandbox | None = None
+
+
+def get_default_sandbox() -> PythonSandbox:
+    """
+    Process-wide sandbox shared by every episode, shut down at interpreter exit.
+    """
+    global _default_sandbox
+    if _default_sandbox is None:
+        _default_sandbox = PythonSandbox()
+        atexit.register(_default_sandbox.close)
+    return _default_sandbox
@@ -0,0 +1,108 @@
+"""
+Entry point of the worker processes of ``utils.sandbox``, run as a script
+(``python -P sandbox_worker.py``). It imports only the standard library, so
+a worker starts in milliseconds, and the parent's ``__main__`` module is never
+re-imported, so callers need no ``if __name__ == "__main__"`` guard.
+
+Messages are pickles prefixed with their length, sent over the worker's
+original stdin (requests) and stdout (replies).
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import struct
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from typing import IO, Any
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+_HEADER = struct.Struct("!Q")
+
+
+def send(stream: IO[bytes], message: Any) -> None:
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def receive(stream: IO[bytes]) -> Any:
+    (size,) = _HEADER.unpack(_read_exactly(stream, _HEADER.size))
+    return pickle.loads(_read_exactly(stream, size))
+
+
+def _read_exactly(stream: IO[bytes], size: int) -> bytes:
+    data = stream.read(size)
+    if data is None or len(data) < size:
+        raise EOFError
+    return data
+
+
+def execute_expression(expression: str, namespace: dict[str, Any] | None = None) -> dict[str, Any]:
+    """
+    Run ``expression`` with exec and capture stdout and stderr separately.
+    """
+    if namespace is None:
+        namespace = {}
+    stdout = StringIO()
+    stderr = StringIO()
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exec(expression, namespace, namespace)
+    except KeyboardInterrupt:
+        raise
+    except Exception as e:
+        return {"result": None, "error": str(e) or repr(e), "stderr": stderr.getvalue()}
+    return {"result": stdout.getvalue(), "error": None, "stderr": stderr.getvalue()}
+
+
+def _set_cpu_limit(cpu_seconds: int) -> None:
+    # RLIMIT_CPU counts the whole process lifetime, so move the soft limit
+    # forward before every call. Exceeding it sends SIGXCPU.
+    used = sum(os.times()[:2])
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used) + cpu_seconds + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def main() -> None:
+    # Keep the protocol on private copies of stdin/stdout, so expressions that
+    # write to the file descriptors directly cannot corrupt it.
+    requests = os.fdopen(os.dup(0), "rb")
+    replies = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(2, 1)
+
+    # The parent's import path, so expressions and seeded session variables
+    # can use the same modules as the parent.
+    path, memory_limit_bytes, cpu_seconds = receive(requests)
+    sys.path[:] = path
+    session_namespace = receive(requests)
+    if resource is not None and memory_limit_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    send(replies, None)
+    while True:
+        try:
+            expression = receive(requests)
+        except (EOFError, OSError):
+            return
+        if resource is not None and cpu_seconds:
+            _set_cpu_limit(cpu_seconds)
+        # Pool workers start every call from an empty namespace; session
+        # workers keep theirs (seeded at start-up) for the worker's lifetime.
+        namespace = {} if session_namespace is None else session_namespace
+        send(replies, execute_expression(expression, namespace))
+
+
+if __name__ == "__main__":
+    main()
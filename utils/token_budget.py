@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from math import ceil
+from typing import Any
+
+from .metrics import EpisodeMetrics
+from .rate_limiter import _TokenBucket
+from .token_estimation import estimate_payload_tokens
+
+
+@dataclass(slots=True, frozen=True)
+class ModelPricing:
+    """
+    USD per million tokens.
+    """
+
+    input: float
+    output: float
+    cache_write: float
+    cache_read: float
+
+    def cost(
+        self,
+        *,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cache_creation_input_tokens: int = 0,
+        cache_read_input_tokens: int = 0,
+    ) -> float:
+        return (
+            input_tokens * self.input
+            + output_tokens * self.output
+            + cache_creation_input_tokens * self.cache_write
+            + cache_read_input_tokens * self.cache_read
+        ) / 1_000_000
+
+
+PRICING: dict[str, ModelPricing] = {
+    "claude-haiku-4-5": ModelPricing(input=1.0, output=5.0, cache_write=1.25, cache_read=0.10),
+    "claude-sonnet-4-5": ModelPricing(input=3.0, output=15.0, cache_write=3.75, cache_read=0.30),
+    "claude-opus-4-1": ModelPricing(input=15.0, output=75.0, cache_write=18.75, cache_read=1.50),
+}
+
+
+class CalibratedTokenEstimator:
+    """
+    Character-based token estimate scaled by the ratio of billed to estimated
+    tokens seen so far. ``prior_weight`` is how many estimated tokens the
+    initial ratio of 1.0 counts for, so one odd sample cannot swing it.
+    """
+
+    def __init__(self, *, prior_weight: int = 1_000) -> None:
+        self._estimated = float(prior_weight)
+        self._actual = float(prior_weight)
+
+    @property
+    def ratio(self) -> float:
+        return self._actual / self._estimated
+
+    def raw_estimate(self, payload: Any) -> int:
+        return estimate_payload_tokens(payload)
+
+    def estimate(self, payload: Any) -> int:
+        return ceil(self.raw_estimate(payload) * self.ratio)
+
+    def observe(self, raw_estimate: int, actual_tokens: int) -> None:
+        if raw_estimate > 0 and actual_tokens > 0:
+            self._estimated += raw_estimate
+            self._actual += actual_tokens
+
+
+@dataclass(slots=True, frozen=True)
+class EpisodeEstimate:
+    """
+    Expected cost of one episode: ``steps`` requests, the first sending
+    ``first_request_tokens`` and each later one ``growth_per_step`` more as the
+    history grows.
+    """
+
+    raw_prompt_tokens: int
+    first_request_tokens: int
+    growth_per_step: int
+    steps: int
+    output_tokens_per_step: int
+    max_steps: int
+
+    @property
+    def input_tokens(self) -> int:
+        return self.steps * self.first_request_tokens + self.growth_per_step * self.steps * (self.steps - 1) // 2
+
+    @property
+    def output_tokens(self) -> int:
+        return self.steps * self.output_tokens_per_step
+
+
+@dataclass(slots=True)
+class Reservation:
+    estimate: EpisodeEstimate
+    cost_usd: float
+
+
+class TokenBudgetPlanner:
+    """
+    Admits the episodes of a batch against per-minute token budgets and
+    total token / cost caps.
+
+    Each episode's input tokens are estimated before it starts from the
+    prompt, tool schemas and system prompt, plus the history growth and
+    number of steps observed in earlier episodes. ``reserve`` waits until the
+    per-minute budgets can absorb the estimate, or returns None once starting
+    the episode could exceed ``max_total_tokens`` or ``max_cost_usd``
+    (counting what finished episodes spent and what running ones reserved).
+    ``settle`` replaces the estimate with the episode's recorded usage and
+    recalibrates the estimator. Caps are checked when an episode starts; an
+    episode that is already running is never interrupted.
+    """
+
+    def __init__(
+        self,
+        *,
+        input_tokens_per_minute: int = 10_000,
+        output_tokens_per_minute: int = 8_000,
+        max_total_tokens: int | None = None,
+        max_cost_usd: float | None = None,
+        model: str = "claude-haiku-4-5",
+        pricing: ModelPricing | None = None,
+        estimator: CalibratedTokenEstimator | None = None,
+        expected_steps: int = 3,
+        expected_output_tokens_per_step: int = 256,
+        expected_growth_per_step: int | None = None,
+    ) -> None:
+        if max_cost_usd is not None and pricing is None and model not in PRICING:
+            raise ValueError(f"No pricing known for {model}; pass pricing to use max_cost_usd.")
+        self._input_bucket = _TokenBucket(input_tokens_per_minute)
+        self._output_bucket = _TokenBucket(output_tokens_per_minute)
+        self.max_total_tokens = max_total_tokens
+        self.max_cost_usd = max_cost_usd
+        self.pricing = pricing or PRICING.get(model)
+        self.estimator = estimator or CalibratedTokenEstimator()
+        self.expected_steps = expected_steps
+        self.expected_output_tokens_per_step = expected_output_tokens_per_step
+        self.expected_growth_per_step = expected_growth_per_step
+        self.spent_input_tokens = 0
+        self.spent_output_tokens = 0
+        self.spent_cost_usd = 0.0
+        self.stopped = False
+        self._reserved_tokens = 0
+        self._reserved_cost_usd = 0.0
+        self._episodes = 0
+        self._steps = 0
+        self._output_tokens = 0
+        self._growth_tokens = 0
+        self._growth_samples = 0
+        self._lock: asyncio.Lock | None = None
+        self._settled: asyncio.Event | None = None
+
+    @property
+    def spent_tokens(self) -> int:
+        return self.spent_input_tokens + self.spent_output_tokens
+
+    def estimate_episode(
+        self,
+        *,
+        prompt: Any,
+        tools: Any,
+        system: Any = None,
+        max_steps: int,
+    ) -> EpisodeEstimate:
+        payload = [tools, system, [{"role": "user", "content": prompt}]]
+        return self._estimate(self.estimator.raw_estimate(payload), max_steps)
+
+    def _estimate(self, raw: int, max_steps: int) -> EpisodeEstimate:
+        first = ceil(raw * self.estimator.ratio)
+        if self._episodes:
+            steps = ceil(self._steps / self._episodes)
+            output_per_step = ceil(self._output_tokens / max(1, self._steps))
+        else:
+            steps = self.expected_steps
+            output_per_step = self.expected_output_tokens_per_step
+        if self._growth_samples:
+            growth = ceil(self._growth_tokens / self._growth_samples)
+        elif self.expected_growth_per_step is not None:
+            growth = self.expected_growth_per_step
+        else:
+            # The assistant turn plus a tool result of similar size.
+            growth = 2 * output_per_step
+        return EpisodeEstimate(
+            raw_prompt_tokens=raw,
+            first_request_tokens=first,
+            growth_per_step=growth,
+            steps=max(1, min(steps, max_steps)),
+            output_tokens_per_step=output_per_step,
+            max_steps=max_steps,
+        )
+
+    def estimate_cost(self, estimate: EpisodeEstimate) -> float:
+        if self.pricing is None:
+            return 0.0
+        return self.pricing.cost(input_tokens=estimate.input_tokens, output_tokens=estimate.output_tokens)
+
+    async def reserve(self, estimate: EpisodeEstimate) -> Reservation | None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._settled = asyncio.Event()
+        # Admission is serialised so concurrent episodes are let through in
+        # order and never both claim the same budget.
+        async with self._lock:
+            # Until one episode has reported its usage the estimate rests on
+            # priors, so only that first episode is admitted. Every episode is
+            # re-estimated here with the calibration current at admission.
+            while self._episodes == 0 and self._reserved_tokens > 0:
+                self._settled.clear()
+                await self._settled.wait()
+            estimate = self._estimate(estimate.raw_prompt_tokens, estimate.max_steps)
+            cost = self.estimate_cost(estimate)
+            if self._over_cap(estimate, cost):
+                self.stopped = True
+                return None
+            while True:
+                delay = max(
+                    self._input_bucket.wait_time(estimate.input_tokens),
+                    self._output_bucket.wait_time(estimate.output_tokens),
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self._input_bucket.consume(estimate.input_tokens)
+            self._output_bucket.consume(estimate.output_tokens)
+            self._reserved_tokens += estimate.input_tokens + estimate.output_tokens
+            self._reserved_cost_usd += cost
+            return Reservation(estimate=estimate, cost_usd=cost)
+
+    def _over_cap(self, estimate: EpisodeEstimate, cost: float) -> bool:
+        if self.stopped:
+            return True
+        if self.max_total_tokens is not None:
+            tokens = estimate.input_tokens + estimate.output_tokens
+            if self.spent_tokens + self._reserved_tokens + tokens > self.max_total_tokens:
+                return True
+        if self.max_cost_usd is not None:
+            if self.spent_cost_usd + self._reserved_cost_usd + cost > self.max_cost_usd:
+                return True
+        return False
+
+    def settle(self, reservation: Reservation, metrics: EpisodeMetrics | None) -> None:
+        """
+        Account the finished episode. Without metrics (e.g. a cancelled
+        episode) the estimate is charged as if it had been spent.
+        """
+        estimate = reservation.estimate
+        self._reserved_tokens -= estimate.input_tokens + estimate.output_tokens
+        self._reserved_cost_usd -= reservation.cost_usd
+        if self._settled is not None:
+            self._settled.set()
+        if metrics is None:
+            self.spent_input_tokens += estimate.input_tokens
+            self.spent_output_tokens += estimate.output_tokens
+            self.spent_cost_usd += reservation.cost_usd
+            return
+
+        request_tokens = [
+            step.input_tokens + step.cache_read_input_tokens + step.cache_creation_input_tokens
+            for step in metrics.steps
+        ]
+        input_tokens = sum(request_tokens)
+        output_tokens = sum(step.output_tokens for step in metrics.steps)
+        self.spent_input_tokens += input_tokens
+        self.spent_output_tokens += output_tokens
+        if self.pricing is not None:
+            self.spent_cost_usd += sum(
+                self.pricing.cost(
+                    input_tokens=step.input_tokens,
+                    output_tokens=step.output_tokens,
+                    cache_creation_input_tokens=step.cache_creation_input_tokens,
+                    cache_read_input_tokens=step.cache_read_input_tokens,
+                )
+                for step in metrics.steps
+            )
+        # Only the difference is settled against the per-minute budgets.
+        self._input_bucket.refund(estimate.input_tokens - input_tokens)
+        self._output_bucket.refund(estimate.output_tokens - output_tokens)
+
+        # Served-from-cache steps report the recorded usage, which is still a
+        # valid sample for calibration.
+        if request_tokens:
+            self.estimator.observe(estimate.raw_prompt_tokens, request_tokens[0])
+            self._episodes += 1
+            self._steps += len(request_tokens)
+            self._output_tokens += output_tokens
+            for previous, current in zip(request_tokens, request_tokens[1:]):
+                self._growth_tokens += max(0, current - previous)
+                self._growth_samples += 1
+
+    def describe(self) -> str:
+        text = (
+            f"spent {self.spent_input_tokens} input / {self.spent_output_tokens} output tokens, "
+            f"${self.spent_cost_usd:.4f}; estimator ratio {self.estimator.ratio:.2f}"
+        )
+        if self.stopped:
+            text += "; stopped at the spend cap"
+        return text
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from math import ceil
+from typing import Any
+
+
+# Rough average for mixed English / code text. Cyrillic and JSON-heavy payloads
+# tokenize denser, so treat the estimate as a lower bound for pacing purposes.
+CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate for a piece of text.
+    """
+    if not text:
+        return 0
+    return max(1, ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def estimate_payload_tokens(payload: Any) -> int:
+    """
+    Estimate the tokens needed to send an arbitrary request payload such as a
+    list of messages or tool definitions.
+    """
+    return estimate_tokens(json.dumps(payload, default=_to_jsonable, ensure_ascii=False))
+
+
+def split_by_tokens(lines: Sequence[str], max_tokens: int, *, overhead: int = 0) -> list[range]:
+    """
+    Split ``lines`` into consecutive chunks whose estimated tokens, plus
+    ``overhead`` for the text around each chunk (e.g. the prompt
+    instructions), stay within ``max_tokens``. Chunks are balanced rather
+    than filled greedily, so no chunk is much larger than the others; a
+    single line over the limit gets a chunk of its own.
+    """
+    room = max_tokens - overhead
+    if room <= 0:
+        raise ValueError(f"max_tokens ({max_tokens}) leaves no room beside the overhead ({overhead}).")
+    # Joined with newlines, so each line costs one more character.
+    costs = [(len(line) + 1) / CHARS_PER_TOKEN for line in lines]
+    target = sum(costs) / max(1, ceil(sum(costs) / room))
+    chunks: list[range] = []
+    start, size = 0, 0.0
+    for index, cost in enumerate(costs):
+        if index > start and size + cost > room:
+            chunks.append(range(start, index))
+            start, size = index, 0.0
+        size += cost
+        if size >= target:
+            chunks.append(range(start, index + 1))
+            start, size = index + 1, 0.0
+    if start < len(costs):
+        chunks.append(range(start, len(costs)))
+    return chunks
+
+
+def _to_jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return str(value)